@@ -0,0 +1,66 @@
+import argparse
+import io
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from jaolang_interpreter import ENGINES, Parser, execute
+
+# a mesma conta sobre um montao inteirao: elemento a elemento num
+# vai_rodando_ae, ou com uma operação sobre o montão inteiro (NumPy)
+PROGRAMS = {
+    "laço": """<<
+    inteirao n vira {n}
+    montao inteirao v vira faixa_ae(n)
+    montao inteirao w vira enche_ae(n, 0)
+    inteirao total vira 0
+    inteirao acima vira 0
+    inteirao i vira 0
+    vai_rodando_ae i < n <<
+        w[i] vira v[i] * 3 - v[i] / 2 + 1
+        total vira total + w[i]
+        se_liga_jao w[i] > n << acima vira acima + 1 >>
+        i vira i + 1
+    >>
+    mostra_ae(total)
+    mostra_ae(acima)
+    mostra_ae(maior_ae(w))
+>>""",
+    "vetorizado": """<<
+    inteirao n vira {n}
+    montao inteirao v vira faixa_ae(n)
+    montao inteirao w vira v * 3 - v / 2 + 1
+    mostra_ae(soma_ae(w))
+    mostra_ae(conta_ae(w > n))
+    mostra_ae(maior_ae(w))
+>>""",
+}
+
+
+def timed(source, engine):
+    ast = Parser.run(source)
+    out = io.StringIO()
+    start = time.perf_counter()
+    execute(ast, engine, output=out)
+    return time.perf_counter() - start, out.getvalue()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="montao: laço elemento a elemento vs operações vetorizadas")
+    parser.add_argument("-n", "--elements", type=int, default=10_000_000)
+    parser.add_argument("--engines", nargs="+", choices=ENGINES, default=["tree", "closure"])
+    args = parser.parse_args()
+
+    print(f"{args.elements} elementos")
+    for engine in args.engines:
+        loop, out_loop = timed(PROGRAMS["laço"].format(n=args.elements), engine)
+        vector, out_vector = timed(PROGRAMS["vetorizado"].format(n=args.elements), engine)
+        if out_loop != out_vector:
+            raise SystemExit(f"{engine}: saídas diferentes")
+        print(f"{engine:>8}  laço {loop:>8.2f}s  vetorizado {vector:>8.3f}s  ({loop / vector:,.0f}x)", flush=True)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,70 @@
+import argparse
+import gc
+import importlib.util
+import os
+import random
+import sys
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+import jaolang_interpreter
+from differential import ProgramGenerator
+
+
+def load_version(path):
+    # outra versão do interpretador (ex.: git show HEAD~1:jaolang_interpreter.py > velho.py)
+    spec = importlib.util.spec_from_file_location("jaolang_comparado", path)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+def make_source(programs, seed):
+    # programas aleatórios do differential lado a lado, cada um num bloco
+    rnd = random.Random(seed)
+    parts = [ProgramGenerator(random.Random(rnd.random())).program() for _ in range(programs)]
+    return "<<\n" + "\n".join(parts) + "\n>>"
+
+
+def measure(module, source, repeat):
+    best = None
+    for _ in range(repeat):
+        gc.collect()
+        start = time.perf_counter()
+        ast = module.Parser.run(source)
+        seconds = time.perf_counter() - start
+        best = seconds if best is None else min(best, seconds)
+        del ast
+    gc.collect()
+    tracemalloc.start()
+    try:
+        ast = module.Parser.run(source)
+        module.prepare(ast)
+        size, _ = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return module.count_nodes(ast), size, best
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Memória por nó da AST (já analisada) e tempo de parse")
+    parser.add_argument("-p", "--programs", type=int, default=300, help="programas aleatórios no fonte")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("-r", "--repeat", type=int, default=3, help="parses por medida (vale o melhor)")
+    parser.add_argument("--compare", metavar="ARQUIVO", nargs="+", default=[],
+                        help="outras versões de jaolang_interpreter.py para comparar")
+    args = parser.parse_args()
+
+    source = make_source(args.programs, args.seed)
+    print(f"fonte: {len(source) / 1024:.0f} KB")
+    versions = [("atual", jaolang_interpreter)] + [(path, load_version(path)) for path in args.compare]
+    for label, module in versions:
+        nodes, size, seconds = measure(module, source, args.repeat)
+        print(f"{label:>20}  {nodes:>9} nós  {size / nodes:>6.1f} MB por 1M nós  "
+              f"parse {seconds:.3f}s ({nodes / seconds / 1e6:.2f}M nós/s)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,163 @@
+import argparse
+import asyncio
+import io
+import json
+import os
+import socketserver
+import subprocess
+import sys
+import threading
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from jaolang_interpreter import Parser, execute, execute_async, prepare
+
+# sessão interativa: lê quantas rodadas, e em cada uma lê um número, faz um
+# pouco de conta e responde com a soma até ali
+PROGRAM = """<<
+    inteirao n vira escuta_ae_jao() 0
+    inteirao s vira 0
+    inteirao t vira 0
+    inteirao i vira 0
+    inteirao j vira 0
+    vai_rodando_ae i < n <<
+        s vira s + escuta_ae_jao() 0
+        j vira 0
+        vai_rodando_ae j < {work} <<
+            se_liga_jao j - (j / 2) * 2 == 0 << t vira t + j >>
+            j vira j + 1
+        >>
+        mostra_ae(s)
+        i vira i + 1
+    >>
+>>"""
+
+
+def serve_async(ast, ready):
+    # um event loop, uma corrotina por conexão
+    async def session(reader, writer):
+        try:
+            await execute_async(ast, reader, writer, analyzed=True)
+        except Exception as e:
+            writer.write(f"Erro: {e}\n".encode())
+        writer.close()
+
+    async def main():
+        server = await asyncio.start_server(session, "127.0.0.1", 0, backlog=4096)
+        ready(server.sockets[0].getsockname()[1])
+        # roda até o processo principal fechar o stdin
+        await asyncio.get_running_loop().run_in_executor(None, sys.stdin.read)
+        server.close()
+
+    asyncio.run(main())
+
+
+def serve_threads(ast, ready):
+    # o jeito síncrono: uma thread por conexão, escuta_ae_jao bloqueando no socket
+    class Session(socketserver.StreamRequestHandler):
+        def handle(self):
+            out = io.TextIOWrapper(self.wfile, encoding="utf-8")
+            try:
+                execute(ast, "tree", analyzed=True, output=out,
+                        stdin=io.TextIOWrapper(self.rfile, encoding="utf-8"))
+            except Exception as e:
+                out.write(f"Erro: {e}\n")
+            out.flush()
+
+    class Server(socketserver.ThreadingTCPServer):
+        daemon_threads = True
+        request_queue_size = 4096
+
+    server = Server(("127.0.0.1", 0), Session)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    ready(server.server_address[1])
+    sys.stdin.read()
+    server.shutdown()
+
+
+def serve(mode, work):
+    ast = Parser.run(PROGRAM.format(work=work))
+    prepare(ast)
+    start = []
+
+    def ready(port):
+        start.append(time.process_time())
+        print(port, flush=True)
+
+    (serve_async if mode == "async" else serve_threads)(ast, ready)
+    # CPU do servidor durante a carga (sem a inicialização)
+    print(json.dumps({"cpu": time.process_time() - start[0]}), flush=True)
+
+
+async def client(port, sessions, concurrency, rounds):
+    limit = asyncio.Semaphore(concurrency)
+    latencies = []
+
+    async def session(k):
+        async with limit:
+            reader, writer = await asyncio.open_connection("127.0.0.1", port)
+            writer.write(f"{rounds}\n".encode())
+            total = 0
+            for r in range(rounds):
+                value = (k * 31 + r) % 100
+                total += value
+                start = time.perf_counter()
+                writer.write(f"{value}\n".encode())
+                line = await reader.readline()
+                latencies.append(time.perf_counter() - start)
+                if line != f"{total}\n".encode():
+                    raise SystemExit(f"sessão {k}: resposta {line!r}, esperado {total}")
+            writer.close()
+            await writer.wait_closed()
+
+    await asyncio.gather(*(session(k) for k in range(sessions)))
+    latencies.sort()
+    return latencies
+
+
+def measure(mode, args):
+    server = subprocess.Popen([sys.executable, os.path.abspath(__file__), "--serve", mode,
+                               "--work", str(args.work)],
+                              stdin=subprocess.PIPE, stdout=subprocess.PIPE, text=True)
+    try:
+        port = int(server.stdout.readline())
+        start = time.perf_counter()
+        latencies = asyncio.run(client(port, args.sessions, args.concurrency, args.rounds))
+        seconds = time.perf_counter() - start
+        server.stdin.close()
+        cpu = json.loads(server.stdout.readline())["cpu"]
+    finally:
+        server.kill()
+        server.wait()
+    p99 = latencies[int(len(latencies) * 0.99)]
+    print(f"{mode:>8} {seconds:>8.2f}s {args.sessions / seconds:>10.0f} {cpu:>8.2f}s "
+          f"{args.sessions / cpu:>12.0f} {p99 * 1000:>9.1f}ms", flush=True)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Sessões interativas simultâneas: execute_async num "
+                                                 "event loop vs uma thread por conexão")
+    parser.add_argument("-n", "--sessions", type=int, default=2_000)
+    parser.add_argument("-c", "--concurrency", type=int, default=500,
+                        help="sessões abertas ao mesmo tempo")
+    parser.add_argument("--rounds", type=int, default=20, help="linhas trocadas por sessão")
+    parser.add_argument("--work", type=int, default=200, help="voltas do laço interno por rodada")
+    parser.add_argument("--modes", nargs="+", choices=["async", "threads"], default=["async", "threads"])
+    parser.add_argument("--serve", choices=["async", "threads"], help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.serve:
+        serve(args.serve, args.work)
+        return
+    # o servidor roda num processo à parte (um núcleo); sessões por núcleo =
+    # sessões / CPU gasta pelo servidor
+    print(f"{args.sessions} sessões, {args.concurrency} simultâneas, {args.rounds} rodadas, "
+          f"laço interno de {args.work}")
+    print(f"{'modo':>8} {'tempo':>9} {'sessões/s':>10} {'CPU':>9} {'sessões/núcleo':>12} {'p99':>11}")
+    for mode in args.modes:
+        measure(mode, args)
+
+
+if __name__ == "__main__":
+    main()
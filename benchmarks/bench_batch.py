@@ -0,0 +1,57 @@
+import argparse
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+INTERPRETER = os.path.join(ROOT, "jaolang_interpreter.py")
+
+# scripts pequenos, como os do lote noturno: quem domina é a inicialização
+PROGRAM = """<<
+    inteirao i vira 0
+    inteirao soma vira {k}
+    vai_rodando_ae i < 50 <<
+        soma vira soma + i
+        i vira i + 1
+    >>
+    mostra_ae("script {k}: " + soma)
+>>"""
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Um processo por script vs --batch com workers aquecidos")
+    parser.add_argument("-s", "--scripts", type=int, default=200)
+    parser.add_argument("-j", "--jobs", type=int, nargs="+", default=[1, 2, 4])
+    parser.add_argument("--engine", default="tree")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        scripts = os.path.join(tmp, "scripts")
+        os.makedirs(scripts)
+        for k in range(args.scripts):
+            with open(os.path.join(scripts, f"s{k:05}.jao"), "w", encoding="utf-8") as f:
+                f.write(PROGRAM.format(k=k))
+        env = dict(os.environ, JAOLANG_CACHE_DIR=os.path.join(tmp, "cache"))
+
+        start = time.perf_counter()
+        for name in sorted(os.listdir(scripts)):
+            subprocess.run([sys.executable, INTERPRETER, os.path.join(scripts, name),
+                            "--engine", args.engine], env=env, check=True, stdout=subprocess.DEVNULL)
+        single = time.perf_counter() - start
+        print(f"{'processo por script':>20}  {single:>7.2f}s  {args.scripts / single:>8.1f} scripts/s")
+
+        for jobs in args.jobs:
+            start = time.perf_counter()
+            subprocess.run([sys.executable, INTERPRETER, "--batch", scripts, "-j", str(jobs),
+                            "--engine", args.engine, "--summary", os.path.join(tmp, "resumo.jsonl")],
+                           env=env, check=True, stderr=subprocess.DEVNULL)
+            seconds = time.perf_counter() - start
+            print(f"{f'--batch -j {jobs}':>20}  {seconds:>7.2f}s  {args.scripts / seconds:>8.1f} scripts/s"
+                  f"  ({single / seconds:.1f}x)")
+    print(f"(CPUs disponíveis: {os.cpu_count()})")
+
+
+if __name__ == "__main__":
+    main()
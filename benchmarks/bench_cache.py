@@ -0,0 +1,66 @@
+import argparse
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+INTERPRETER = os.path.join(ROOT, "jaolang_interpreter.py")
+sys.path.insert(0, ROOT)
+
+from bench_tokenizer import make_source
+from jaolang_interpreter import load_program
+
+SIZES = [10_000, 100_000, 1_000_000]
+
+
+def startup(script, env, extra, runs):
+    # menor tempo de parede de várias execuções completas do interpretador
+    best = float("inf")
+    for _ in range(runs):
+        start = time.perf_counter()
+        subprocess.run([sys.executable, INTERPRETER, script, *extra], env=env, check=True,
+                       stdout=subprocess.DEVNULL)
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def load(script, use_cache, runs):
+    # só a carga (ler + parse + análise, ou ler do cache), dentro do processo
+    best = float("inf")
+    for _ in range(runs):
+        start = time.perf_counter()
+        load_program(script, use_cache)
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Tempo de inicialização com e sem o cache de AST")
+    parser.add_argument("-r", "--runs", type=int, default=5)
+    parser.add_argument("--max-size", type=int, default=SIZES[-1])
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        env = dict(os.environ, JAOLANG_CACHE_DIR=os.path.join(tmp, "cache"))
+        os.environ["JAOLANG_CACHE_DIR"] = env["JAOLANG_CACHE_DIR"]
+        print("carga do programa (no processo) | execução completa (novo processo)")
+        for size in SIZES:
+            if size > args.max_size:
+                break
+            script = os.path.join(tmp, f"job_{size}.jao")
+            with open(script, "w", encoding="utf-8") as f:
+                f.write(make_source(size))
+            cold_load = load(script, False, args.runs)
+            load_program(script, True)   # popula o cache
+            warm_load = load(script, True, args.runs)
+            cold = startup(script, env, ["--no-cache"], args.runs)
+            warm = startup(script, env, [], args.runs)
+            print(f"{size:>10} bytes  frio {cold_load * 1000:>8.1f} ms  quente {warm_load * 1000:>8.1f} ms"
+                  f"  {cold_load / warm_load:>5.2f}x | frio {cold * 1000:>8.1f} ms"
+                  f"  quente {warm * 1000:>8.1f} ms  {cold / warm:>5.2f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,84 @@
+import argparse
+import importlib.util
+import io
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+import jaolang_interpreter
+from jaolang_interpreter import ENGINES, Optimizer, analyze
+
+# muitas chamadas pequenas (expandidas pelo otimizador) e uma recursão (que
+# continua chamada e passa pelo cache da chamada)
+PROGRAM = """<<
+    faz_ae quadrado(x inteirao) inteirao << devolve_ae x * x >>
+    faz_ae soma3(a inteirao, b inteirao, c inteirao) inteirao << devolve_ae a + b + c >>
+    faz_ae dist(x inteirao, y inteirao) inteirao << devolve_ae quadrado(x) + quadrado(y) >>
+    faz_ae fib(n inteirao) inteirao <<
+        se_liga_jao n < 2 << devolve_ae n >>
+        devolve_ae fib(n - 1) + fib(n - 2)
+    >>
+    inteirao i vira 0
+    inteirao total vira 0
+    vai_rodando_ae i < {n} <<
+        total vira total + soma3(quadrado(i), dist(i, 3), 1) - quadrado(i)
+        i vira i + 1
+    >>
+    mostra_ae(total)
+    mostra_ae(fib({fib}))
+>>"""
+
+
+def load_version(path):
+    # outra versão do interpretador (ex.: git show HEAD~1:jaolang_interpreter.py > velho.py)
+    spec = importlib.util.spec_from_file_location("jaolang_comparado", path)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+def timed(module, source, engine, inline=True):
+    ast = module.Parser.run(source)
+    if module is jaolang_interpreter:
+        analyze(ast)
+        Optimizer(inline).run(ast)
+    else:
+        module.prepare(ast)
+    out = io.StringIO()
+    start = time.perf_counter()
+    module.execute(ast, engine, analyzed=True, output=out)
+    return time.perf_counter() - start, out.getvalue()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Programa cheio de chamadas: cache da chamada e expansão de funções pequenas")
+    parser.add_argument("-n", "--iterations", type=int, default=200_000)
+    parser.add_argument("--fib", type=int, default=22)
+    parser.add_argument("--engines", nargs="+", choices=ENGINES, default=["tree", "closure", "stack"])
+    parser.add_argument("--compare", metavar="ARQUIVO", nargs="+", default=[],
+                        help="outras versões de jaolang_interpreter.py para comparar")
+    args = parser.parse_args()
+
+    source = PROGRAM.format(n=args.iterations, fib=args.fib)
+    others = [(os.path.basename(path), load_version(path)) for path in args.compare]
+    print(f"{args.iterations} voltas, fib({args.fib})")
+    for engine in args.engines:
+        plain, out_plain = timed(jaolang_interpreter, source, engine, inline=False)
+        inlined, out_inlined = timed(jaolang_interpreter, source, engine)
+        if out_plain != out_inlined:
+            raise SystemExit(f"{engine}: saídas diferentes")
+        cells = []
+        for label, module in others:
+            seconds, out = timed(module, source, engine)
+            if out != out_inlined:
+                raise SystemExit(f"{engine}/{label}: saídas diferentes")
+            cells.append(f"{label} {seconds:.2f}s")
+        print(f"{engine:>8}  " + "  ".join(cells + [f"sem expandir {plain:.2f}s",
+                                                     f"expandindo {inlined:.2f}s ({plain / inlined:.1f}x)"]),
+              flush=True)
+
+
+if __name__ == "__main__":
+    main()
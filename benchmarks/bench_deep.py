@@ -0,0 +1,93 @@
+import argparse
+import io
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from jaolang_interpreter import OutputSink, Parser, StackEvaluator, SymbolTable, nesting, prepare
+
+# entradas fundas: cada forma cresce só em profundidade
+SHAPES = {
+    "soma": lambda d: "<< inteirao x vira 1 mostra_ae(" + " + ".join(["x"] * d) + ") >>",
+    "parenteses": lambda d: "<< inteirao x vira 1 mostra_ae(" + "(x + " * d + "x" + ")" * d + ") >>",
+    "unario": lambda d: "<< inteirao x vira 1 mostra_ae(" + "-" * d + "x) >>",
+    "blocos": lambda d: "<< inteirao x vira 0 " + "<< " * d + "x vira x + 1 " + ">> " * d + "mostra_ae(x) >>",
+    "ifs": lambda d: ("<< inteirao x vira 0 " + "se_liga_jao x == 0 << " * d + "x vira 7 "
+                      + ">> " * d + "mostra_ae(x) >>"),
+}
+
+# programas rasos, para medir o custo do motor sem recursão no caso comum
+WORKLOADS = {
+    "laco": """<<
+        inteirao i vira 0
+        inteirao s vira 0
+        vai_rodando_ae i < {n} <<
+            s vira s + i * 2
+            i vira i + 1
+        >>
+        mostra_ae(s)
+    >>""",
+    "recursao": """<<
+        faz_ae f(n inteirao) inteirao <<
+            se_liga_jao n < 1 << devolve_ae 0 >>
+            devolve_ae 1 + f(n - 1)
+        >>
+        inteirao i vira 0
+        vai_rodando_ae i < {n} / 100 <<
+            mostra_ae(f(100))
+            i vira i + 1
+        >>
+    >>""",
+}
+
+
+def run_tree(ast):
+    # o tree-walker direto, sem a troca automática do execute()
+    ast.Evaluate(SymbolTable(output=OutputSink(io.StringIO())))
+
+def run_stack(ast):
+    StackEvaluator(OutputSink(io.StringIO())).run(ast)
+
+def timed(func, *args):
+    start = time.perf_counter()
+    try:
+        func(*args)
+    except RecursionError:
+        return None
+    return time.perf_counter() - start
+
+def show(seconds):
+    return f"{'RecursionError':>14}" if seconds is None else f"{seconds * 1000:>12.1f}ms"
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Parser e avaliador sem recursão vs tree-walker recursivo")
+    parser.add_argument("-d", "--depths", type=int, nargs="+", default=[100, 1000, 10_000, 100_000])
+    parser.add_argument("--shapes", nargs="+", choices=SHAPES, default=list(SHAPES))
+    parser.add_argument("-n", "--iterations", type=int, default=200_000,
+                        help="tamanho dos programas rasos (voltas do laço, chamadas)")
+    args = parser.parse_args()
+
+    print(f"{'forma':>10} {'nível':>8} {'profundidade':>12} {'parse':>14} {'tree':>14} {'stack':>14}")
+    for shape in args.shapes:
+        for depth in args.depths:
+            source = SHAPES[shape](depth)
+            start = time.perf_counter()
+            ast = Parser.run(source)
+            parsed = time.perf_counter() - start
+            # sem otimizar, senão a dobra de constantes achata parte das formas
+            prepare(ast, optimize=False)
+            print(f"{shape:>10} {depth:>8} {nesting(ast):>12} {show(parsed)} "
+                  f"{show(timed(run_tree, ast))} {show(timed(run_stack, ast))}")
+
+    for name, program in WORKLOADS.items():
+        ast = Parser.run(program.format(n=args.iterations))
+        prepare(ast)
+        tree, stack = timed(run_tree, ast), timed(run_stack, ast)
+        print(f"{name:>10}  tree {show(tree)}  stack {show(stack)}  ({stack / tree:.2f}x)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,106 @@
+import argparse
+import contextlib
+import io
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from jaolang_interpreter import ENGINES, Parser, execute
+
+# programas com laços quentes; {n} é o número de iterações
+PROGRAMS = {
+    "soma": """<<
+    inteirao i vira 0
+    inteirao soma vira 0
+    vai_rodando_ae i < {n} <<
+        soma vira soma + i
+        i vira i + 1
+    >>
+    mostra_ae(soma)
+>>""",
+    "aninhado": """<<
+    inteirao i vira 0
+    inteirao pares vira 0
+    repete_ate_jao <<
+        se_liga_jao (i - (i / 2) * 2) == 0 <<
+            pares vira pares + 1
+        >> se_nao_jao <<
+            pares vira pares - 0
+        >>
+        i vira i + 1
+    >> quando i < {n}
+    mostra_ae("pares: " + pares)
+>>""",
+    # código gerado costuma vir cheio de constantes; o otimizador dobra tudo
+    "constantes": """<<
+    inteirao i vira 0
+    falae s vira ""
+    vai_rodando_ae i < {n} <<
+        se_liga_jao (1 < 2) && !eh_nada <<
+            s vira "linha " + (2 * 3 - 1) + eh_tudo
+        >> se_nao_jao <<
+            s vira "nunca"
+        >>
+        se_liga_jao eh_nada << mostra_ae("morto") >>
+        i vira i + (10 / 5 - 1)
+    >>
+    mostra_ae(s)
+>>""",
+    # uma chamada por volta: o frame da função vem do pool de frames
+    "chamadas": """<<
+    faz_ae quadrado(x inteirao) inteirao <<
+        inteirao y vira x * x
+        devolve_ae y
+    >>
+    inteirao i vira 0
+    inteirao soma vira 0
+    vai_rodando_ae i < {n} <<
+        soma vira soma + quadrado(i)
+        i vira i + 1
+    >>
+    mostra_ae(soma)
+>>""",
+    # recursão de cauda com {n} níveis: sem o trampolim estouraria a pilha
+    "cauda": """<<
+    faz_ae soma_ate(n inteirao, acc inteirao) inteirao <<
+        se_liga_jao n < 1 << devolve_ae acc >>
+        devolve_ae soma_ate(n - 1, acc + n)
+    >>
+    mostra_ae(soma_ate({n}, 0))
+>>""",
+}
+
+
+def run(source, engine, optimize=True):
+    ast = Parser.run(source)
+    out = io.StringIO()
+    start = time.perf_counter()
+    with contextlib.redirect_stdout(out):
+        execute(ast, engine, optimize=optimize)
+    return time.perf_counter() - start, out.getvalue()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compara os motores de execução em laços quentes")
+    parser.add_argument("-n", "--iterations", type=int, default=1_000_000,
+                        help="iterações de cada laço (ex.: 10000000)")
+    parser.add_argument("--engines", nargs="+", choices=ENGINES, default=list(ENGINES))
+    parser.add_argument("--no-opt", action="store_true", help="desliga o otimizador de AST")
+    args = parser.parse_args()
+
+    for name, template in PROGRAMS.items():
+        source = template.format(n=args.iterations)
+        base_time, base_out = None, None
+        for engine in args.engines:
+            seconds, out = run(source, engine, not args.no_opt)
+            if base_out is None:
+                base_time, base_out = seconds, out
+            elif out != base_out:
+                raise SystemExit(f"{name}: saída do motor '{engine}' difere de '{args.engines[0]}'")
+            print(f"{name:>12} {engine:>8} {seconds:>9.3f}s  {base_time / seconds:>6.2f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,57 @@
+import argparse
+import io
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from jaolang_interpreter import ENGINES, Parser, execute, prepare
+
+# laços que refazem as mesmas contas a cada volta: a condição com
+# "limite * 2 + offset", invariantes no corpo e subexpressões repetidas
+PROGRAM = """<<
+    inteirao limite vira {n}
+    inteirao offset vira 3
+    inteirao escala vira 7
+    inteirao i vira 0
+    inteirao total vira 0
+    vai_rodando_ae i < limite * 2 + offset <<
+        total vira total + (escala * offset + 1) * (escala * offset + 1) - i / 2
+        se_liga_jao (i + escala * offset) > limite && (i + escala * offset) < limite * 3 <<
+            total vira total + escala * escala - offset
+        >>
+        i vira i + 1
+    >>
+    mostra_ae(total)
+>>"""
+
+
+def timed(source, engine, hoist):
+    ast = Parser.run(source)
+    prepare(ast, hoist=hoist)
+    out = io.StringIO()
+    start = time.perf_counter()
+    execute(ast, engine, analyzed=True, output=out)
+    return time.perf_counter() - start, out.getvalue()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Invariantes fora dos laços e subexpressões "
+                                                 "compartilhadas, ligadas e desligadas")
+    parser.add_argument("-n", "--iterations", type=int, default=200_000)
+    parser.add_argument("--engines", nargs="+", choices=ENGINES, default=list(ENGINES))
+    args = parser.parse_args()
+
+    source = PROGRAM.format(n=args.iterations)
+    print(f"{args.iterations * 2 + 3} voltas")
+    for engine in args.engines:
+        plain, out_plain = timed(source, engine, hoist=False)
+        hoisted, out_hoisted = timed(source, engine, hoist=True)
+        if out_plain != out_hoisted:
+            raise SystemExit(f"{engine}: saídas diferentes")
+        print(f"{engine:>8}  sem {plain:.2f}s  com {hoisted:.2f}s ({plain / hoisted:.1f}x)", flush=True)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,96 @@
+import argparse
+import contextlib
+import io
+import os
+import sys
+import tempfile
+import threading
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from jaolang_interpreter import ENGINES, InputSource, Parser, execute, prepare
+
+# soma n leituras numéricas intercaladas com n leituras de palavras (viram string)
+PROGRAM = """<<
+    inteirao i vira 0
+    inteirao soma vira 0
+    falae ultima vira ""
+    vai_rodando_ae i < {n} <<
+        soma vira soma + escuta_ae_jao() 0
+        ultima vira escuta_ae_jao() 0
+        i vira i + 1
+    >>
+    mostra_ae(soma + " " + ultima)
+>>"""
+
+
+class InputPerLine(InputSource):
+    # comportamento antigo: input() e int() com except a cada leitura
+    def scan(self):
+        val = input()
+        try:
+            return int(val)
+        except:
+            return val
+
+
+def make_input(n):
+    return "".join(f"{i % 1000}\nlinha{i}\n" for i in range(n))
+
+
+def feed(fd, data):
+    with os.fdopen(fd, "wb") as f:
+        f.write(data)
+
+
+def run_pipe(ast, engine, data, source):
+    # o programa lê de um pipe de verdade, alimentado por outra thread
+    rfd, wfd = os.pipe()
+    writer = threading.Thread(target=feed, args=(wfd, data))
+    writer.start()
+    saved = sys.stdin
+    sys.stdin = os.fdopen(rfd, "r", encoding="utf-8")
+    try:
+        return timed(ast, engine, source())
+    finally:
+        sys.stdin.close()
+        sys.stdin = saved
+        writer.join()
+
+
+def timed(ast, engine, stdin):
+    out = io.StringIO()
+    start = time.perf_counter()
+    with contextlib.redirect_stdout(out):
+        execute(ast, engine, analyzed=True, stdin=stdin)
+    return time.perf_counter() - start, out.getvalue()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Custo de escuta_ae_jao: input() por linha vs InputSource")
+    parser.add_argument("-n", "--reads", type=int, default=1_000_000,
+                        help="voltas do laço (cada volta lê duas linhas)")
+    parser.add_argument("--engines", nargs="+", choices=ENGINES, default=["closure", "python"])
+    args = parser.parse_args()
+
+    data = make_input(args.reads).encode()
+    with tempfile.NamedTemporaryFile(suffix=".txt", delete=False) as f:
+        f.write(data)
+    try:
+        for engine in args.engines:
+            ast = Parser.run(PROGRAM.format(n=args.reads))
+            prepare(ast)
+            before, out_before = run_pipe(ast, engine, data, InputPerLine)
+            after, out_after = run_pipe(ast, engine, data, InputSource)
+            mapped, out_mapped = timed(ast, engine, InputSource.from_path(f.name))
+            if not out_before == out_after == out_mapped:
+                raise SystemExit(f"{engine}: saídas diferentes")
+            print(f"{engine:>8}  input() {before:>7.2f}s  blocos {after:>7.2f}s ({before / after:.2f}x)"
+                  f"  mmap {mapped:>7.2f}s ({before / mapped:.2f}x)")
+    finally:
+        os.unlink(f.name)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,62 @@
+import argparse
+import io
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from jaolang_interpreter import ENGINES, Parser, execute
+
+# laços de contador: "soma" e "afim" só acumulam (forma fechada), "corpo" tem
+# um se_liga_jao no meio (o contador anda num range, o corpo roda a cada volta)
+LOOPS = {
+    "soma": "s vira s + i",
+    "afim": "s vira s + 3 * i - n  t vira t + 2",
+    "corpo": "se_liga_jao i - (i / 2) * 2 == 0 << s vira s + i >> se_nao_jao << t vira t + 1 >>",
+}
+
+PROGRAM = """<<
+    inteirao n vira {n}
+    inteirao s vira 0
+    inteirao t vira 0
+    inteirao i vira 0
+    vai_rodando_ae i < n <<
+        {body}
+        i vira i + 1
+    >>
+    mostra_ae(s)
+    mostra_ae(t)
+>>"""
+
+
+def timed(source, engine, optimize):
+    # sem o otimizador o laço não é reconhecido e roda volta a volta
+    ast = Parser.run(source)
+    out = io.StringIO()
+    start = time.perf_counter()
+    execute(ast, engine, optimize=optimize, output=out)
+    return time.perf_counter() - start, out.getvalue()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="vai_rodando_ae de contador: laço comum vs laço contado")
+    parser.add_argument("-n", "--iterations", type=int, default=10_000_000)
+    parser.add_argument("--loops", nargs="+", choices=LOOPS, default=list(LOOPS))
+    parser.add_argument("--engines", nargs="+", choices=ENGINES, default=["tree", "closure"])
+    args = parser.parse_args()
+
+    print(f"{args.iterations} voltas")
+    for name in args.loops:
+        source = PROGRAM.format(n=args.iterations, body=LOOPS[name])
+        for engine in args.engines:
+            plain, out_plain = timed(source, engine, False)
+            counted, out_counted = timed(source, engine, True)
+            if out_plain != out_counted:
+                raise SystemExit(f"{name}/{engine}: saídas diferentes")
+            print(f"{name:>6} {engine:>8}  comum {plain:>8.3f}s  contado {counted:>10.6f}s"
+                  f"  ({plain / counted:,.1f}x)", flush=True)
+
+
+if __name__ == "__main__":
+    main()
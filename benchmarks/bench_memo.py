@@ -0,0 +1,59 @@
+import argparse
+import io
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from jaolang_interpreter import ENGINES, Parser, execute, memoize, prepare
+
+# fib ingênua: o número de chamadas cresce exponencialmente sem o cache
+PROGRAM = """<<
+    faz_ae fib(n inteirao) inteirao <<
+        se_liga_jao n < 2 << devolve_ae n >>
+        devolve_ae fib(n - 1) + fib(n - 2)
+    >>
+    inteirao i vira 0
+    inteirao soma vira 0
+    vai_rodando_ae i < {calls} <<
+        soma vira soma + fib({n})
+        i vira i + 1
+    >>
+    mostra_ae(soma)
+>>"""
+
+
+def timed(source, engine, memo, size):
+    ast = Parser.run(source)
+    if memo:
+        memoize(ast, ["fib"], size)
+    prepare(ast)
+    out = io.StringIO()
+    memos = {}
+    start = time.perf_counter()
+    execute(ast, engine, analyzed=True, output=out, memos=memos)
+    return time.perf_counter() - start, out.getvalue(), memos
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Custo de uma função recursiva com e sem lembra_ae")
+    parser.add_argument("-n", type=int, default=22, help="argumento de fib")
+    parser.add_argument("-c", "--calls", type=int, default=3, help="chamadas a fib(n) no programa")
+    parser.add_argument("--memo-size", type=int, default=1024)
+    parser.add_argument("--engines", nargs="+", choices=ENGINES, default=list(ENGINES))
+    args = parser.parse_args()
+
+    source = PROGRAM.format(n=args.n, calls=args.calls)
+    for engine in args.engines:
+        plain, out_plain, _ = timed(source, engine, False, args.memo_size)
+        memo, out_memo, memos = timed(source, engine, True, args.memo_size)
+        if out_plain != out_memo:
+            raise SystemExit(f"{engine}: saídas diferentes")
+        cache, = memos.values()
+        print(f"{engine:>8}  sem cache {plain:>8.3f}s  lembra_ae {memo * 1000:>8.2f} ms"
+              f"  {plain / memo:>8.0f}x  ({cache.hits} acerto(s), {cache.misses} falha(s))")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,63 @@
+import argparse
+import os
+import sys
+import threading
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from jaolang_interpreter import ENGINES, OutputSink, Parser, execute
+
+PROGRAM = """<<
+    inteirao i vira 0
+    vai_rodando_ae i < {n} <<
+        mostra_ae(i)
+        i vira i + 1
+    >>
+>>"""
+
+
+class PrintPerLine(OutputSink):
+    # comportamento antigo: um print() por valor
+    def line(self, text):
+        print(text, file=self.stream or sys.stdout)
+
+
+def drain(fd):
+    while os.read(fd, 1 << 20):
+        pass
+
+
+def run(source, engine, sink):
+    # a saída vai para um pipe de verdade, esvaziado por outra thread
+    rfd, wfd = os.pipe()
+    reader = threading.Thread(target=drain, args=(rfd,))
+    reader.start()
+    stream = os.fdopen(wfd, "w", encoding="utf-8")
+    try:
+        ast = Parser.run(source)
+        start = time.perf_counter()
+        execute(ast, engine, output=sink(stream))
+        seconds = time.perf_counter() - start
+    finally:
+        stream.close()
+        reader.join()
+        os.close(rfd)
+    return seconds
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Custo de mostra_ae: print() por linha vs OutputSink")
+    parser.add_argument("-n", "--lines", type=int, default=10_000_000)
+    parser.add_argument("--engines", nargs="+", choices=ENGINES, default=["closure", "python"])
+    args = parser.parse_args()
+
+    source = PROGRAM.format(n=args.lines)
+    for engine in args.engines:
+        before = run(source, engine, PrintPerLine)
+        after = run(source, engine, OutputSink)
+        print(f"{engine:>8}  print() {before:>8.2f}s  buffer {after:>8.2f}s  {before / after:>5.2f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,51 @@
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from jaolang_interpreter import ENGINES, Interpreter, run_many
+
+# programas independentes e pequenos, como os jobs de um servidor
+PROGRAM = """<<
+    inteirao i vira 0
+    inteirao soma vira {k}
+    vai_rodando_ae i < {n} <<
+        soma vira soma + i * 2
+        i vira i + 1
+    >>
+    mostra_ae("job {k}: " + soma)
+>>"""
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Vazão agregada do run_many por número de workers")
+    parser.add_argument("-p", "--programs", type=int, default=64)
+    parser.add_argument("-n", "--iterations", type=int, default=20_000, help="voltas do laço de cada programa")
+    parser.add_argument("-w", "--workers", type=int, nargs="+", default=[1, 2, 4, 8])
+    parser.add_argument("--engine", choices=ENGINES, default="closure")
+    args = parser.parse_args()
+
+    programs = [PROGRAM.format(k=k, n=args.iterations) for k in range(args.programs)]
+
+    interpreter = Interpreter(args.engine)
+    start = time.perf_counter()
+    expected = [interpreter.run_capture(source) for source in programs]
+    seconds = time.perf_counter() - start
+    print(f"{'sequencial':>10}  {'-':>3}  {args.programs / seconds:>8.1f} programas/s")
+
+    for processes in (False, True):
+        for workers in args.workers:
+            start = time.perf_counter()
+            results = run_many(programs, workers, args.engine, processes=processes)
+            seconds = time.perf_counter() - start
+            if results != expected:
+                raise SystemExit("run_many devolveu saídas diferentes da execução sequencial")
+            kind = "processos" if processes else "threads"
+            print(f"{kind:>10}  {workers:>3}  {args.programs / seconds:>8.1f} programas/s")
+    print(f"(CPUs disponíveis: {os.cpu_count()})")
+
+
+if __name__ == "__main__":
+    main()
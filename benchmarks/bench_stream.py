@@ -0,0 +1,82 @@
+import argparse
+import os
+import sys
+import tempfile
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from jaolang_interpreter import OutputSink, Parser, execute, execute_stream, prepare
+
+# script "gerado": muitos comandos de topo parecidos, sem declarar nomes novos
+HEADER = "<<\ninteirao s vira 0\ninteirao i vira 0\n"
+STATEMENT = """s vira (s + {k} * 3 - i) / 2
+se_liga_jao s > {k} << s vira s - {k} >> se_nao_jao << i vira i + 1 >>
+vai_rodando_ae i < {k} << i vira i + 1 >>
+mostra_ae("passo {k}: " + s)
+"""
+
+
+def write_script(path, statements):
+    with open(path, "w", encoding="utf-8") as f:
+        f.write(HEADER)
+        for k in range(statements):
+            f.write(STATEMENT.replace("{k}", str(k)))
+        f.write(">>\n")
+
+
+def run_whole(path, engine, out):
+    # caminho normal: lê o arquivo todo, monta a AST inteira e só então executa
+    with open(path, encoding="utf-8") as f:
+        source = f.read()
+    ast = Parser.run(source)
+    prepare(ast)
+    execute(ast, engine, analyzed=True, output=OutputSink(out))
+
+
+def run_stream(path, engine, out):
+    with open(path, encoding="utf-8") as f:
+        execute_stream(f, engine, output=OutputSink(out))
+
+
+def measure(func, path, engine):
+    with open(os.devnull, "w") as out:
+        start = time.perf_counter()
+        func(path, engine, out)
+        seconds = time.perf_counter() - start
+        tracemalloc.start()
+        try:
+            func(path, engine, out)
+            _, peak = tracemalloc.get_traced_memory()
+        finally:
+            tracemalloc.stop()
+    return seconds, peak
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Memória de pico e tempo: AST inteira vs --stream")
+    parser.add_argument("-n", "--statements", type=int, nargs="+", default=[1_000, 10_000, 30_000],
+                        help="grupos de comandos de topo no script gerado")
+    parser.add_argument("--engine", choices=["tree", "stack"], default="tree")
+    args = parser.parse_args()
+
+    print(f"{'comandos':>9} {'fonte':>9}  {'inteira':>20}  {'stream':>20}")
+    for statements in args.statements:
+        fd, path = tempfile.mkstemp(suffix=".jao")
+        os.close(fd)
+        try:
+            write_script(path, statements)
+            size = os.path.getsize(path)
+            whole, whole_peak = measure(run_whole, path, args.engine)
+            stream, stream_peak = measure(run_stream, path, args.engine)
+        finally:
+            os.unlink(path)
+        print(f"{statements * 4:>9} {size / 2**20:>7.1f}MB  "
+              f"{whole_peak / 2**20:>8.1f}MB {whole:>8.2f}s  "
+              f"{stream_peak / 2**20:>8.1f}MB {stream:>8.2f}s  "
+              f"({whole_peak / stream_peak:.0f}x menos memória)")
+
+
+if __name__ == "__main__":
+    main()
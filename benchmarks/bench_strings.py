@@ -0,0 +1,54 @@
+import argparse
+import io
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from jaolang_interpreter import ENGINES, Parser, execute
+
+# relatório montado com "s vira s + ..." dentro do laço e mostrado no fim
+PROGRAM = """<<
+    falae relatorio vira ""
+    inteirao i vira 0
+    vai_rodando_ae i < {n} <<
+        relatorio vira relatorio + "linha " + i + ": " + (i * i) + "\\n"
+        i vira i + 1
+    >>
+    mostra_ae(relatorio)
+>>"""
+
+
+def timed(n, engine, optimize):
+    # sem o otimizador cada volta copia a string inteira
+    ast = Parser.run(PROGRAM.format(n=n))
+    out = io.StringIO()
+    start = time.perf_counter()
+    execute(ast, engine, optimize=optimize, output=out)
+    return time.perf_counter() - start, out.getvalue()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Concatenação repetida num laço: cópia a cada volta vs lista de pedaços")
+    parser.add_argument("-n", "--appends", type=int, nargs="+", default=[10_000, 100_000, 1_000_000])
+    parser.add_argument("--plain-max", type=int, default=100_000,
+                        help="maior n medido sem o otimizador (o custo é quadrático)")
+    parser.add_argument("--engines", nargs="+", choices=ENGINES, default=list(ENGINES))
+    args = parser.parse_args()
+
+    print(f"{'n':>9} {'motor':>8} {'tamanho':>10} {'comum':>10} {'pedaços':>10}")
+    for n in args.appends:
+        for engine in args.engines:
+            built, out_built = timed(n, engine, True)
+            plain = "-"
+            if n <= args.plain_max:
+                seconds, out_plain = timed(n, engine, False)
+                if out_plain != out_built:
+                    raise SystemExit(f"{engine}/{n}: saídas diferentes")
+                plain = f"{seconds:.2f}s"
+            print(f"{n:>9} {engine:>8} {len(out_built) / 2**20:>8.1f}MB {plain:>10} {built:>9.2f}s", flush=True)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,85 @@
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from jaolang_interpreter import Tokenizer
+
+# trecho representativo: palavras reservadas, identificadores, números, strings e comentários
+SNIPPET = """
+  // laço de soma gerado
+  inteirao contador_{i} vira 0
+  falae rotulo_{i} vira "linha {i} do relatorio"
+  verdade_ou_farsa ok_{i} vira eh_tudo && (contador_{i} < 1000000)
+  vai_rodando_ae (contador_{i} < 10) <<
+      contador_{i} vira contador_{i} + 1 * 2 - 3 / 4
+      mostra_ae(rotulo_{i} + contador_{i})
+  >>
+"""
+
+SIZES = [1_000, 10_000, 100_000, 1_000_000, 10_000_000, 50_000_000]
+
+
+def make_source(size):
+    parts = ["<<"]
+    total = 2
+    i = 0
+    while total < size:
+        chunk = SNIPPET.format(i=i)
+        parts.append(chunk)
+        total += len(chunk)
+        i += 1
+    parts.append(">>")
+    return "".join(parts)
+
+
+def count_tokens(source):
+    tokenizer = Tokenizer(source)
+    count = 0
+    while tokenizer.actual.type != "EOF":
+        tokenizer.selectNext()
+        count += 1
+    return count
+
+
+def measure(source, min_time):
+    # repete entradas pequenas até acumular tempo suficiente para medir
+    runs = 0
+    start = time.perf_counter()
+    while True:
+        tokens = count_tokens(source)
+        runs += 1
+        elapsed = time.perf_counter() - start
+        if elapsed >= min_time:
+            return tokens, elapsed / runs
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Vazão do tokenizer em entradas sintéticas")
+    parser.add_argument("--max-size", type=int, default=SIZES[-1],
+                        help="maior tamanho de entrada em bytes (padrão: 50 MB)")
+    parser.add_argument("--min-time", type=float, default=0.5,
+                        help="tempo mínimo de medição por tamanho, em segundos")
+    args = parser.parse_args()
+
+    print(f"{'tamanho':>12} {'tokens':>12} {'tempo (s)':>10} {'MB/s':>8} {'ns/byte':>8}")
+    per_byte = []
+    for size in SIZES:
+        if size > args.max_size:
+            break
+        source = make_source(size)
+        tokens, seconds = measure(source, args.min_time)
+        ns = seconds * 1e9 / len(source)
+        per_byte.append(ns)
+        print(f"{len(source):>12} {tokens:>12} {seconds:>10.4f} "
+              f"{len(source) / seconds / 1e6:>8.2f} {ns:>8.1f}")
+
+    # escala linear => custo por byte aproximadamente constante
+    if len(per_byte) > 1:
+        print(f"custo por byte (maior / menor entrada): {per_byte[-1] / per_byte[0]:.2f}x")
+
+
+if __name__ == "__main__":
+    main()
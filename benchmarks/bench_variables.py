@@ -0,0 +1,76 @@
+import argparse
+import contextlib
+import io
+import os
+import sys
+import timeit
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from jaolang_interpreter import SymbolTable, Parser, execute, new_frame
+
+
+def nested_program(depth, n):
+    # variáveis do programa principal lidas dentro de 'depth' blocos aninhados
+    open_blocks = "<< " * depth
+    close_blocks = " >>" * depth
+    return f"""<<
+    inteirao total vira 0
+    inteirao passo vira 3
+    inteirao i vira 0
+    {open_blocks}
+        vai_rodando_ae i < {n} <<
+            total vira total + passo
+            i vira i + 1
+        >>
+    {close_blocks}
+    mostra_ae(total)
+>>"""
+
+
+def lookup_micro(depth, number):
+    # busca isolada: SymbolTable.get subindo 'depth' pais x índice no frame
+    st = SymbolTable()
+    st.declare("x", "int", 1)
+    for _ in range(depth):
+        st = SymbolTable(st)
+    frame = new_frame(None, 2)
+    frame[1] = 1
+    before = timeit.timeit(lambda: st.get("x"), number=number)
+    after = timeit.timeit(lambda: frame[1], number=number)
+    return before, after
+
+
+def run_program(source, engine):
+    ast = Parser.run(source)
+    out = io.StringIO()
+    with contextlib.redirect_stdout(out):
+        seconds = timeit.timeit(lambda: execute(ast, engine), number=1)
+    return seconds, out.getvalue()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Acesso a variáveis em blocos aninhados")
+    parser.add_argument("--depths", type=int, nargs="+", default=[0, 4, 16, 64])
+    parser.add_argument("-n", "--iterations", type=int, default=200_000)
+    args = parser.parse_args()
+
+    print("busca isolada (1M acessos)")
+    print(f"{'profundidade':>12} {'SymbolTable':>12} {'frame':>8}")
+    for depth in args.depths:
+        before, after = lookup_micro(depth, 1_000_000)
+        print(f"{depth:>12} {before:>11.3f}s {after:>7.3f}s")
+
+    print(f"\nprograma com {args.iterations} iterações")
+    print(f"{'profundidade':>12} {'tree':>9} {'closure':>9} {'ganho':>7}")
+    for depth in args.depths:
+        source = nested_program(depth, args.iterations)
+        tree, out_tree = run_program(source, "tree")
+        closure, out_closure = run_program(source, "closure")
+        if out_tree != out_closure:
+            raise SystemExit(f"profundidade {depth}: saídas diferentes")
+        print(f"{depth:>12} {tree:>8.3f}s {closure:>8.3f}s {tree / closure:>6.2f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,516 @@
+import argparse
+import asyncio
+import contextlib
+import io
+import os
+import random
+import subprocess
+import sys
+import tempfile
+import types
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+sys.path.insert(0, ROOT)
+
+from jaolang_interpreter import (ENGINES, Parser, Profiler, execute, execute_async, load_program,
+                                 numpy, prepare)
+
+# o interpretador original, antes do backlog: só o tree-walker, sem análise
+# estática nem otimizador (e sem funções no parser)
+BASELINE = "3b85d07"
+
+TYPE_KEYWORDS = {"int": "inteirao", "string": "falae", "bool": "verdade_ou_farsa"}
+TYPES = list(TYPE_KEYWORDS)
+
+
+# Gera programas aleatórios bem tipados (com uma pitada opcional de erros),
+# restritos ao que todos os motores aceitam.
+class ProgramGenerator:
+    def __init__(self, rnd, error_rate=0.0):
+        self.rnd = rnd
+        self.error_rate = error_rate
+        self.count = 0
+        self.functions = 0
+        self.returns = []   # tipo de retorno das funções sendo geradas
+        self.mistyped = False   # trocou o tipo de alguma expressão
+
+    def fresh(self):
+        self.count += 1
+        return f"v{self.count}"
+
+    def expr(self, env, typ, depth=0):
+        rnd = self.rnd
+        if rnd.random() < self.error_rate:
+            wrong = rnd.choice(["int", "string", "bool"])
+            self.mistyped = self.mistyped or wrong != typ
+            typ = wrong
+        names = [name for name, t in env if t == typ]
+        funcs = [(name, t) for name, t in env if type(t) is tuple and t[1] == typ]
+        if funcs and depth <= 3 and rnd.random() < 0.15:
+            return self.call(env, *rnd.choice(funcs))
+        if depth > 3 or rnd.random() < 0.3:
+            if names and rnd.random() < 0.6:
+                return rnd.choice(names)
+            if typ == "int":
+                return str(rnd.randint(0, 20))
+            if typ == "string":
+                return '"' + rnd.choice(["a", "b", "xy", "", " z"]) + '"'
+            return rnd.choice(["eh_tudo", "eh_nada"])
+        if typ == "int":
+            c = rnd.random()
+            if c < 0.15:
+                return "-" + self.expr(env, "int", depth + 1)
+            if c < 0.2:
+                return "+" + self.expr(env, "int", depth + 1)
+            op = rnd.choice(["+", "-", "*", "/"])
+            if op == "/":
+                return f"({self.expr(env, 'int', depth + 1)} / {rnd.randint(1, 5)})"
+            return f"({self.expr(env, 'int', depth + 1)} {op} {self.expr(env, 'int', depth + 1)})"
+        if typ == "string":
+            left = rnd.choice(["int", "string", "bool"])
+            right = "string" if left != "string" or rnd.random() < 0.5 else rnd.choice(["int", "bool"])
+            if rnd.random() < 0.5:
+                left, right = right, left
+            return f"({self.expr(env, left, depth + 1)} + {self.expr(env, right, depth + 1)})"
+        c = rnd.random()
+        if c < 0.15:
+            return "!" + self.expr(env, "bool", depth + 1)
+        if c < 0.5:
+            op = rnd.choice(["&&", "||"])
+            return f"({self.expr(env, 'bool', depth + 1)} {op} {self.expr(env, 'bool', depth + 1)})"
+        op = rnd.choice(["<", ">", "=="])
+        typ = rnd.choice(["int", "string"] + (["bool"] if op == "==" else []))
+        return f"({self.expr(env, typ, depth + 1)} {op} {self.expr(env, typ, depth + 1)})"
+
+    def call(self, env, name, func):
+        params, _, recursive = func
+        args = [self.expr(env, typ, 3) for _, typ in params]
+        if recursive:
+            # a recursão desce pelo primeiro argumento; fica rasa para caber na pilha
+            args[0] = str(self.rnd.randint(0, 6))
+        return f"{name}({', '.join(args)})"
+
+    def function(self, env, depth):
+        # faz_ae com parâmetros, devolve_ae no meio (inclusive em laços) e, às
+        # vezes, recursão pelo primeiro parâmetro: na cauda ou não
+        rnd = self.rnd
+        name = self.fresh()
+        ret = rnd.choice(TYPES + ["void"])
+        recursive = rnd.random() < 0.4
+        params = [(self.fresh(), "int" if recursive and i == 0 else rnd.choice(TYPES))
+                  for i in range(rnd.randint(1 if recursive else 0, 3))]
+        func = (tuple(params), ret, recursive)
+        signature = ", ".join(f"{pname} {TYPE_KEYWORDS[typ]}" for pname, typ in params)
+        header = f"faz_ae {name}({signature})" + ("" if ret == "void" else " " + TYPE_KEYWORDS[ret])
+
+        if not recursive and ret != "void" and rnd.random() < 0.3:
+            # só "devolve_ae expr" com os parâmetros: o otimizador expande na chamada
+            env.append((name, func))
+            return f"{header} << devolve_ae {self.expr(list(params), ret, 1)} >>"
+        inner = [(pname, typ) for pname, typ in params] + list(env)
+        self.returns.append(ret)
+        lines = []
+        counter = params[0][0] if recursive else None
+        if recursive and ret != "void":
+            lines.append(f"se_liga_jao {counter} < 1 << devolve_ae {self.expr(inner, ret, 2)} >>")
+        # o parâmetro da recursão não pode ser reatribuído no corpo
+        body = self.block(inner, depth + 1, frozenset([counter] if recursive else []))
+        lines.append(body[3:-3])
+        if recursive:
+            args = [f"{counter} - 1"] + [self.expr(inner, typ, 3) for _, typ in params[1:]]
+            call = f"{name}({', '.join(args)})"
+            if ret == "void":
+                lines.append(f"se_liga_jao {counter} > 0 << {call} >>")
+            elif ret == "int" and rnd.random() < 0.5:
+                lines.append(f"devolve_ae 1 + {call}")
+            else:
+                lines.append(f"devolve_ae {call}")
+        elif ret != "void":
+            lines.append("devolve_ae " + self.expr(inner, ret))
+        self.returns.pop()
+        env.append((name, func))
+        return header + " <<\n" + "\n".join(lines) + "\n>>"
+
+    def block(self, env, depth, counters, size=None):
+        env = list(env)
+        size = size if size is not None else self.rnd.randint(1, 5)
+        lines = [self.statement(env, depth, counters) for _ in range(size)]
+        return "<<\n" + "\n".join(lines) + "\n>>"
+
+    def loop_body(self, env, depth, counters, counter):
+        body = self.block(env, depth + 1, counters | {counter})
+        return body[:-2] + f"{counter} vira {counter} + 1\n>>"
+
+    def statement(self, env, depth, counters):
+        rnd = self.rnd
+        c = rnd.random()
+        # corpos de laço repetem, então declarações ali só aparecem por engano
+        if env and not counters and depth <= 1 and self.functions < 4 and rnd.random() < 0.06:
+            self.functions += 1
+            return self.function(env, depth)
+        if self.returns and self.returns[-1] != "void" and rnd.random() < 0.05:
+            return f"se_liga_jao {self.expr(env, 'bool')} << devolve_ae {self.expr(env, self.returns[-1])} >>"
+        if not env or (c < 0.25 and not (counters and rnd.random() < 0.9)):
+            typ = rnd.choice(["int", "string", "bool"])
+            name = self.fresh()
+            line = f"{TYPE_KEYWORDS[typ]} {name}"
+            if rnd.random() < 0.8:
+                line += " vira " + self.expr(env, typ)
+            env.append((name, typ))
+            return line
+        if c < 0.45:
+            voids = [(name, t) for name, t in env if type(t) is tuple and t[1] == "void"]
+            if voids and rnd.random() < 0.3:
+                return self.call(env, *rnd.choice(voids))
+            return f"mostra_ae({self.expr(env, rnd.choice(['int', 'string', 'bool']))})"
+        if c < 0.6:
+            targets = [(name, t) for name, t in env if name not in counters and type(t) is not tuple]
+            if not targets:
+                return "mostra_ae(1)"
+            name, typ = rnd.choice(targets)
+            return f"{name} vira {self.expr(env, typ)}"
+        if depth > 2:
+            return f"mostra_ae({self.expr(env, 'int')})"
+        if c < 0.72:
+            line = f"se_liga_jao {self.expr(env, 'bool')} {self.block(env, depth + 1, counters)}"
+            if rnd.random() < 0.5:
+                line += f" se_nao_jao {self.block(env, depth + 1, counters)}"
+            return line
+        if c < 0.9:
+            counter = self.fresh()
+            env.append((counter, "int"))
+            body = self.loop_body(env, depth, counters, counter)
+            limit = rnd.randint(0, 4)
+            if c < 0.82:
+                return f"inteirao {counter} vira 0\nvai_rodando_ae {counter} < {limit} {body}"
+            return f"inteirao {counter} vira 0\nrepete_ate_jao {body} quando {counter} < {limit}"
+        if c < 0.95:
+            return self.block(env, depth + 1, counters)
+        # escuta_ae_jao() consome o token seguinte, daí o 0 extra
+        if rnd.random() < 0.5:
+            name = self.fresh()
+            env.append((name, "int"))
+            return f"inteirao {name} vira escuta_ae_jao() 0"
+        return "mostra_ae(escuta_ae_jao() 0)"
+
+    def program(self):
+        return self.block([], 0, frozenset(), self.rnd.randint(3, 12))
+
+
+# "async" é o execute_async, com a entrada num asyncio.StreamReader;
+# "no-hoist" é o tree sem tirar invariantes dos laços nem reaproveitar
+# subexpressões; "profile" é o tree com o --profile medindo cada nó
+MODES = ENGINES + ("async", "no-hoist", "profile")
+
+# programas fixos que já pegaram diferenças, rodados junto com o exemplo.jao
+REGRESSIONS = [
+    # laço comum (passo i * 2) e laço de contador no mesmo programa: o --profile
+    # roda o CountedLoop como While e não pode cair no próprio wrapper
+    ("laços misturados no --profile", """<<
+    inteirao i vira 1
+    vai_rodando_ae i < 100 << i vira i * 2 >>
+    inteirao j vira 0
+    inteirao s vira 0
+    vai_rodando_ae j < 10 << mostra_ae(j) s vira s + j j vira j + 1 >>
+    mostra_ae(i + s)
+>>"""),
+    # atribuir ao nome de uma função é erro semântico em todos os motores
+    # (antes o tree quebrava na chamada e a expansão devolvia o valor velho)
+    ("atribuição ao nome de uma função", """<<
+    faz_ae f() inteirao << devolve_ae 2 >>
+    se_liga_jao eh_nada << f vira 5 >>
+    mostra_ae(f())
+>>"""),
+    # nem quando a chamada seria expandida no lugar pelo otimizador
+    ("atribuição a uma função expandida", """<<
+    faz_ae dobro(x inteirao) inteirao << devolve_ae x * 2 >>
+    mostra_ae(dobro(1))
+    dobro vira 7
+    mostra_ae(dobro(1))
+>>"""),
+    # chamadas expandidas no lugar, inclusive uma dentro da outra e com o
+    # parâmetro com o mesmo nome de uma variável de fora
+    ("funções expandidas no lugar", """<<
+    faz_ae dobro(x inteirao) inteirao << devolve_ae x * 2 >>
+    faz_ae junta(a falae, n inteirao) falae << devolve_ae a + n + a >>
+    inteirao x vira 5
+    mostra_ae(dobro(x + 1) + dobro(dobro(x)))
+    mostra_ae(junta("-", dobro(3)))
+    mostra_ae(x)
+>>""", ("32\n-6-\n5\n", None)),
+    ("lembra_ae recursiva", """<<
+    lembra_ae faz_ae fib(n inteirao) inteirao <<
+        se_liga_jao n < 2 << devolve_ae n >>
+        devolve_ae fib(n - 1) + fib(n - 2)
+    >>
+    mostra_ae(fib(60))
+>>""", ("1548008755920\n", None)),
+    # uma função chama outra declarada mais abaixo no mesmo bloco
+    ("recursão mútua", """<<
+    faz_ae par(n inteirao) verdade_ou_farsa <<
+        se_liga_jao n == 0 << devolve_ae eh_tudo >>
+        devolve_ae impar(n - 1)
+    >>
+    faz_ae impar(n inteirao) verdade_ou_farsa <<
+        se_liga_jao n == 0 << devolve_ae eh_nada >>
+        devolve_ae par(n - 1)
+    >>
+    mostra_ae(par(10))
+    mostra_ae(impar(7))
+    <<
+        faz_ae conta(n inteirao) inteirao << devolve_ae ajuda(n) + 1 >>
+        faz_ae ajuda(n inteirao) inteirao << se_liga_jao n > 0 << devolve_ae conta(n - 1) >> devolve_ae 0 >>
+        mostra_ae(conta(5))
+    >>
+>>""", ("true\ntrue\n6\n", None)),
+    # ... mas chamá-la antes do faz_ae rodar é o mesmo erro em todos os motores
+    ("chamada antes da declaração", """<<
+    faz_ae a() inteirao << devolve_ae b() + 1 >>
+    mostra_ae(1)
+    mostra_ae(a())
+    faz_ae b() inteirao << devolve_ae 1 >>
+>>""", ("1\n", "Exception: Variável ou função 'b' não encontrada.")),
+    # strings montadas em lista de pedaços: variável de fora da função, saída
+    # do laço por devolve_ae e laços aninhados montando a mesma variável
+    ("concatenação em laço", """<<
+    falae s vira "a"
+    faz_ae f(n inteirao) inteirao <<
+        falae t vira "<"
+        inteirao i vira 0
+        vai_rodando_ae i < n <<
+            s vira s + i
+            t vira t + i + ","
+            se_liga_jao i == 2 << devolve_ae i >>
+            i vira i + 1
+        >>
+        mostra_ae(t + ">")
+        devolve_ae 0 - 1
+    >>
+    mostra_ae(f(2))
+    mostra_ae(f(5))
+    mostra_ae(s)
+    inteirao j vira 0
+    inteirao k vira 0
+    vai_rodando_ae j < 3 <<
+        k vira 0
+        vai_rodando_ae k < 2 << s vira s + j + k k vira k + 1 >>
+        s vira s + ";"
+        j vira j + 1
+    >>
+    mostra_ae(s)
+>>""", ("<0,1,>\n-1\n2\na01012\na010120001;1011;2021;\n", None)),
+]
+
+# montões: as contas são do NumPy em todos os motores, então eles concordam
+# até quando o int64 dá a volta. Por isso todos vêm com a saída esperada
+OVERFLOW = "Exception: Inteiro não cabe num montao inteirao (64 bits)."
+ARRAY_REGRESSIONS = [
+    # soma_ae passa de 64 bits como o inteirao escalar
+    ("soma_ae além de 64 bits", """<<
+    inteirao m vira 9223372036854775807
+    montao inteirao v vira enche_ae(3, m)
+    mostra_ae(soma_ae(v))
+    mostra_ae(soma_ae(v) == m * 3)
+>>""", ("27670116110564327421\ntrue\n", None)),
+    # as contas vetorizadas que estouram são erro, não dão a volta
+    ("montão estourando em +", """<<
+    montao inteirao v vira enche_ae(2, 9223372036854775807)
+    mostra_ae(v - 1)
+    mostra_ae(v + 1)
+>>""", ("[9223372036854775806, 9223372036854775806]\n", OVERFLOW)),
+    ("montão estourando em *", """<<
+    montao inteirao v vira faixa_ae(2) * 3037000499
+    mostra_ae(v * v)
+    v vira faixa_ae(2) * 3037000500
+    mostra_ae(v * v)
+>>""", ("[0, 9223372030926249001]\n", OVERFLOW)),
+    ("montão estourando em - unário", """<<
+    montao inteirao v vira enche_ae(2, -9223372036854775807 - 1)
+    mostra_ae(v / 2)
+    mostra_ae(-v)
+>>""", ("[-4611686018427387904, -4611686018427387904]\n", OVERFLOW)),
+]
+
+# --memo: as funções listadas precisam passar pelo cache em todos os motores,
+# inclusive as pequenas que o otimizador expandiria no lugar
+MEMO_REGRESSIONS = [
+    ("--memo numa função expandível", """<<
+    faz_ae dobro(x inteirao) inteirao << devolve_ae x * 2 >>
+    inteirao i vira 0
+    inteirao s vira 0
+    vai_rodando_ae i < 5 << s vira s + dobro(3) i vira i + 1 >>
+    mostra_ae(s)
+>>""", ["dobro"]),
+]
+
+
+async def run_async(source, stdin):
+    reader = asyncio.StreamReader()
+    reader.feed_data(stdin.encode())
+    reader.feed_eof()
+    await execute_async(Parser.run(source), reader)
+
+
+def run(source, engine, stdin):
+    out = io.StringIO()
+    saved = sys.stdin
+    sys.stdin = io.StringIO(stdin)
+    try:
+        with contextlib.redirect_stdout(out):
+            if engine == "async":
+                asyncio.run(run_async(source, stdin))
+            elif engine == "no-opt":
+                ast = Parser.run(source)
+                prepare(ast, optimize=False)
+                execute(ast, "tree", analyzed=True)
+            elif engine == "no-hoist":
+                ast = Parser.run(source)
+                prepare(ast, hoist=False)
+                execute(ast, "tree", analyzed=True)
+            elif engine == "profile":
+                ast = Parser.run(source)
+                prepare(ast)
+                Profiler(source).run(ast)
+            else:
+                execute(Parser.run(source), engine)
+        error = None
+    except Exception as e:
+        error = f"{type(e).__name__}: {e}"
+    finally:
+        sys.stdin = saved
+    return out.getvalue(), error
+
+
+def load_baseline(rev):
+    # o jaolang_interpreter.py de rev, direto do git; None sem git ou sem a revisão
+    try:
+        source = subprocess.run(["git", "-C", ROOT, "show", f"{rev}:jaolang_interpreter.py"],
+                                capture_output=True, text=True, check=True).stdout
+    except (OSError, subprocess.CalledProcessError):
+        return None
+    module = types.ModuleType("jaolang_baseline")
+    exec(compile(source, f"{rev}:jaolang_interpreter.py", "exec"), module.__dict__)
+    return module
+
+
+def run_baseline(module, source, stdin):
+    out = io.StringIO()
+    saved = sys.stdin
+    sys.stdin = io.StringIO(stdin)
+    try:
+        with contextlib.redirect_stdout(out):
+            module.Parser.run(source).Evaluate(module.SymbolTable())
+        error = None
+    except Exception as e:
+        error = f"{type(e).__name__}: {e}"
+    finally:
+        sys.stdin = saved
+    return out.getvalue(), error
+
+
+def compare(label, source, stdin, engines, baseline=None):
+    # a referência é o tree sem otimizador: um erro do otimizador aparece em
+    # todos os motores e só uma execução sem ele o pega. Um erro da análise
+    # também aparece no no-opt, então o original (baseline), quando roda o
+    # programa até o fim, é comparado com ele
+    expected = run(source, "no-opt", stdin)
+    failures = 0
+    if baseline is not None:
+        original = run_baseline(baseline, source, stdin)
+        if original[1] is None and original != expected:
+            failures += 1
+            print(f"DIVERGÊNCIA em {label} (no-opt x original {BASELINE}):\n{source}")
+            print(f"  original: {original!r}\n  no-opt:   {expected!r}")
+    for engine in engines:
+        got = run(source, engine, stdin)
+        if got != expected:
+            failures += 1
+            print(f"DIVERGÊNCIA em {label} ({engine}):\n{source}")
+            print(f"  no-opt:   {expected!r}\n  {engine}: {got!r}")
+    return failures
+
+
+def check(label, source, expected, engines, baseline=None):
+    # regressão escrita à mão: compara os motores e, quando vem com a saída
+    # esperada, também a referência (um erro da análise aparece em todos)
+    failures = 0
+    if expected is not None:
+        got = run(source, "no-opt", "")
+        if got != expected:
+            failures += 1
+            print(f"SAÍDA ERRADA em {label}:\n{source}")
+            print(f"  esperado: {expected!r}\n  no-opt:   {got!r}")
+    return failures + compare(label, source, "", engines, baseline)
+
+
+def check_memo(label, source, names, engines):
+    # pelo mesmo caminho do --memo na linha de comando
+    expected = run(source, "no-opt", "")
+    with tempfile.NamedTemporaryFile("w", suffix=".jao", delete=False, encoding="utf-8") as f:
+        f.write(source)
+    failures = 0
+    for engine in engines:
+        if engine not in ENGINES:
+            continue
+        out = io.StringIO()
+        memos = {}
+        try:
+            ast, _ = load_program(f.name, use_cache=False, memo=names)
+            execute(ast, engine, analyzed=True, output=out, memos=memos)
+            got = out.getvalue(), None
+        except Exception as e:
+            got = out.getvalue(), f"{type(e).__name__}: {e}"
+        used = sorted(cache.name for cache in memos.values() if cache.hits or cache.misses)
+        if got != expected or used != sorted(names):
+            failures += 1
+            print(f"DIVERGÊNCIA em {label} ({engine}, --memo {','.join(names)}):\n{source}")
+            print(f"  no-opt:   {expected!r}\n  {engine}: {got!r}, caches usados: {used}")
+    os.unlink(f.name)
+    return failures
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compara a saída dos motores com o tree-walker "
+                                                 "sem otimizador")
+    parser.add_argument("-n", "--programs", type=int, default=500, help="programas aleatórios")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--errors", type=float, default=0.003,
+                        help="chance de trocar o tipo de uma expressão (gera erros semânticos)")
+    parser.add_argument("--engines", nargs="+", choices=MODES,
+                        default=list(MODES))
+    parser.add_argument("--no-baseline", action="store_true",
+                        help=f"não compara com o interpretador original ({BASELINE})")
+    args = parser.parse_args()
+
+    baseline = None if args.no_baseline else load_baseline(BASELINE)
+    if baseline is None and not args.no_baseline:
+        print(f"sem o original {BASELINE} no git: comparando só com o no-opt")
+
+    with open(os.path.join(ROOT, "exemplo.jao"), encoding="utf-8") as f:
+        failures = compare("exemplo.jao", f.read(), "", args.engines, baseline)
+    for label, source, *expected in REGRESSIONS:
+        failures += check(label, source, expected[0] if expected else None, args.engines, baseline)
+    for label, source, names in MEMO_REGRESSIONS:
+        failures += check_memo(label, source, names, args.engines)
+    regressions = len(REGRESSIONS) + len(MEMO_REGRESSIONS)
+    if numpy is not None:
+        for label, source, expected in ARRAY_REGRESSIONS:
+            failures += check(label, source, expected, args.engines, baseline)
+        regressions += len(ARRAY_REGRESSIONS)
+
+    for i in range(args.programs):
+        rnd = random.Random(args.seed * 1_000_003 + i)
+        generator = ProgramGenerator(rnd, args.errors)
+        source = generator.program()
+        stdin = "\n".join(rnd.choice(["1", "42", "abc", "-3", " 7 "]) for _ in range(50)) + "\n"
+        # o original não checa tipos: roda até o fim um erro de tipo que não executa
+        failures += compare(f"programa {i}", source, stdin, args.engines,
+                            None if generator.mistyped else baseline)
+
+    print(f"{args.programs + 1 + regressions} programas, {failures} divergência(s)")
+    if failures:
+        raise SystemExit(1)
+
+
+if __name__ == "__main__":
+    main()
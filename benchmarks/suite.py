@@ -0,0 +1,332 @@
+import argparse
+import io
+import json
+import os
+import platform
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+sys.path.insert(0, ROOT)
+
+from jaolang_interpreter import ENGINES, Parser, Tokenizer, execute, prepare
+
+# cargas representativas; cada uma devolve (fonte, linhas da entrada padrão)
+# com o tamanho multiplicado por --scale. Nenhuma usa comentários nem "-"
+# unário, então as que não têm funções, escuta_ae_jao nem lembra_ae também
+# passam pelo parser flex/bison
+
+LEXICO = """
+  inteirao contador_{i} vira {i} * 3 - (20 / 4)
+  falae rotulo_{i} vira "linha {i} do relatorio " + contador_{i}
+  verdade_ou_farsa ok_{i} vira eh_tudo && (contador_{i} < 1000000) || eh_nada
+"""
+
+
+def lexico(scale):
+    # fonte gerado grande, com pouca execução: o custo é tokenizar e analisar
+    n = 5_000 * scale
+    return "<<" + "".join(LEXICO.format(i=i) for i in range(n)) + "mostra_ae(contador_0)\n>>", None
+
+
+def laco(scale):
+    # laço de inteiros com um se_liga_jao no corpo (não vira forma fechada)
+    return f"""<<
+    inteirao n vira {100_000 * scale}
+    inteirao s vira 0
+    inteirao t vira 0
+    inteirao i vira 0
+    vai_rodando_ae i < n <<
+        se_liga_jao i - (i / 3) * 3 == 0 << s vira s + i * 2 >> se_nao_jao << t vira t + 1 >>
+        i vira i + 1
+    >>
+    mostra_ae(s)
+    mostra_ae(t)
+>>""", None
+
+
+def strings(scale):
+    return f"""<<
+    falae relatorio vira ""
+    inteirao i vira 0
+    vai_rodando_ae i < {50_000 * scale} <<
+        relatorio vira relatorio + "linha " + i + ": " + (i * i) + "|"
+        i vira i + 1
+    >>
+    mostra_ae(relatorio)
+>>""", None
+
+
+def aninhado(scale):
+    # blocos e expressões fundos dentro de um laço
+    depth = 100
+    expr = "i" + " + 1)" * depth
+    body = "x vira " + "(" * depth + expr + "\n"
+    for level in range(depth):
+        body = f"se_liga_jao i > {level} << {body} >> se_nao_jao << y vira y + 1 >>\n"
+    return f"""<<
+    inteirao x vira 0
+    inteirao y vira 0
+    inteirao i vira 0
+    vai_rodando_ae i < {1_000 * scale} <<
+        {body}
+        i vira i + 1
+    >>
+    mostra_ae(x)
+    mostra_ae(y)
+>>""", None
+
+
+def recursao(scale):
+    # chamadas sem lembra_ae: fib ingênuo e uma recursão de cauda comprida
+    return f"""<<
+    faz_ae fib(n inteirao) inteirao <<
+        se_liga_jao n < 2 << devolve_ae n >>
+        devolve_ae fib(n - 1) + fib(n - 2)
+    >>
+    faz_ae conta(n inteirao, acc inteirao) inteirao <<
+        se_liga_jao n == 0 << devolve_ae acc >>
+        devolve_ae conta(n - 1, acc + n)
+    >>
+    inteirao k vira 0
+    vai_rodando_ae k < {scale} <<
+        mostra_ae(fib(20))
+        mostra_ae(conta(20000, 0))
+        k vira k + 1
+    >>
+>>""", None
+
+
+def saida(scale):
+    return f"""<<
+    inteirao i vira 0
+    vai_rodando_ae i < {100_000 * scale} <<
+        mostra_ae("linha " + i)
+        i vira i + 1
+    >>
+>>""", None
+
+
+def entrada(scale):
+    n = 100_000 * scale
+    return f"""<<
+    inteirao n vira escuta_ae_jao() 0
+    inteirao s vira 0
+    inteirao i vira 0
+    vai_rodando_ae i < n <<
+        s vira s + escuta_ae_jao() 0
+        i vira i + 1
+    >>
+    mostra_ae(s)
+>>""", [str(n)] + [str(i * 7 % 1000) for i in range(n)]
+
+
+WORKLOADS = {
+    "lexico": lexico,
+    "laco": laco,
+    "strings": strings,
+    "aninhado": aninhado,
+    "recursao": recursao,
+    "saida": saida,
+    "entrada": entrada,
+}
+
+PHASES = ("tokens", "parse", "analise", "execucao")
+MIN_PEAK = 2**20
+
+
+def tokenize(source):
+    tokenizer = Tokenizer(source)
+    while tokenizer.actual.type != "EOF":
+        tokenizer.selectNext()
+
+
+def run_phases(source, stdin, engine, clock):
+    # uma passada pelo pipeline; clock(fase, função) mede e devolve o resultado.
+    # "parse" inclui o tokenizer (o parser puxa os tokens sob demanda)
+    clock("tokens", lambda: tokenize(source))
+    ast = clock("parse", lambda: Parser.run(source))
+    clock("analise", lambda: prepare(ast))
+    out = io.StringIO()
+    clock("execucao", lambda: execute(ast, engine, analyzed=True, output=out, stdin=stdin))
+    return out.getvalue()
+
+
+def measure(source, stdin, engine, warmup, repeat):
+    times = {phase: [] for phase in PHASES}
+
+    def timed(phase, func):
+        start = time.perf_counter()
+        result = func()
+        times[phase].append(time.perf_counter() - start)
+        return result
+
+    def traced(phase, func):
+        tracemalloc.reset_peak()
+        base = tracemalloc.get_traced_memory()[0]
+        result = func()
+        peaks[phase] = tracemalloc.get_traced_memory()[1] - base
+        return result
+
+    for _ in range(warmup):
+        run_phases(source, stdin, engine, lambda phase, func: func())
+    for _ in range(repeat):
+        output = run_phases(source, stdin, engine, timed)
+    # memória numa passada à parte: o tracemalloc deixa tudo bem mais lento
+    peaks = {}
+    tracemalloc.start()
+    try:
+        run_phases(source, stdin, engine, traced)
+    finally:
+        tracemalloc.stop()
+    return {
+        phase: {"min": min(times[phase]), "mediana": statistics.median(times[phase]),
+                "pico": peaks[phase]}
+        for phase in PHASES
+    }, output
+
+
+class CParser:
+    # o front end flex/bison do repositório, compilado numa pasta temporária.
+    # Com flex e bison instalados, regenera os fontes a partir de jaolang.l e
+    # jaolang.y; senão usa o lex.yy.c e o jaolang.tab.c já gerados
+    def __init__(self, folder):
+        self.folder = folder
+        self.binary = None
+        self.startup = 0.0
+        compiler = shutil.which("cc") or shutil.which("gcc")
+        if compiler is None:
+            self.reason = "sem compilador C"
+            return
+        sources = ["main.c", "jaolang.tab.c", "lex.yy.c"]
+        for name in sources + ["jaolang.tab.h", "jaolang.l", "jaolang.y"]:
+            shutil.copy(os.path.join(ROOT, name), folder)
+        try:
+            if shutil.which("flex") and shutil.which("bison"):
+                subprocess.run(["bison", "-d", "jaolang.y"], cwd=folder, check=True, capture_output=True)
+                subprocess.run(["flex", "jaolang.l"], cwd=folder, check=True, capture_output=True)
+            binary = os.path.join(folder, "jaoparse")
+            subprocess.run([compiler, "-O2", "-w", "-o", binary] + sources,
+                           cwd=folder, check=True, capture_output=True)
+        except subprocess.CalledProcessError as e:
+            self.reason = "falha ao compilar: " + e.stderr.decode(errors="replace").strip()[:200]
+            return
+        self.binary = binary
+        self.reason = None
+        # tempo de subir o processo, descontado de cada medida
+        self.startup = min(self.parse_once("<< inteirao x vira 1 >>") for _ in range(5))
+
+    def parse_once(self, source):
+        start = time.perf_counter()
+        result = subprocess.run([self.binary], input=source.encode(), capture_output=True)
+        seconds = time.perf_counter() - start
+        # fora do subconjunto da gramática do bison: sem medida
+        if result.returncode != 0 or b"Erro" in result.stdout + result.stderr:
+            return None
+        return seconds
+
+    def measure(self, source, warmup, repeat):
+        for _ in range(warmup):
+            if self.parse_once(source) is None:
+                return None
+        times = [self.parse_once(source) for _ in range(repeat)]
+        if None in times:
+            return None
+        return {"min": max(min(times) - self.startup, 0.0),
+                "mediana": max(statistics.median(times) - self.startup, 0.0)}
+
+
+def compare(results, baseline, threshold, min_time):
+    # regressão = fase mais lenta (pelo mínimo das repetições) ou com pico de
+    # memória maior que o da base além do limite. Fases rápidas demais na base
+    # oscilam mais que o limite e ficam de fora, assim como picos pequenos
+    regressions = []
+    for name, phases in results["cargas"].items():
+        old_phases = baseline["cargas"].get(name)
+        if old_phases is None:
+            continue
+        for phase, new in phases.items():
+            old = old_phases.get(phase)
+            if old is None:
+                continue
+            if old["min"] >= min_time and new["min"] > old["min"] * (1 + threshold):
+                regressions.append((name, phase, "tempo", old["min"], new["min"]))
+            if old["pico"] >= MIN_PEAK and new["pico"] > old["pico"] * (1 + threshold):
+                regressions.append((name, phase, "memória", old["pico"], new["pico"]))
+    return regressions
+
+
+def show(name, phases, c_time):
+    cells = " ".join(f"{phases[phase]['min']:>9.4f}s {phases[phase]['pico'] / 2**20:>7.1f}MB"
+                     for phase in PHASES)
+    c_cell = "-" if c_time is None else f"{c_time['min']:.4f}s"
+    print(f"{name:>9} {cells} {c_cell:>10}", flush=True)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Suíte de cargas JaoLang: tempo e memória por fase, comparados com uma base")
+    parser.add_argument("--workloads", nargs="+", choices=WORKLOADS, default=list(WORKLOADS))
+    parser.add_argument("--scale", type=int, default=1, help="multiplica o tamanho de todas as cargas")
+    parser.add_argument("--engine", choices=ENGINES, default="tree")
+    parser.add_argument("--warmup", type=int, default=1)
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--json", metavar="ARQUIVO", help="grava os resultados (serve de base depois)")
+    parser.add_argument("--baseline", metavar="ARQUIVO", help="compara com resultados gravados antes com --json")
+    parser.add_argument("--threshold", type=float, default=0.10,
+                        help="piora relativa que conta como regressão (padrão: 0.10 = 10%%)")
+    parser.add_argument("--min-time", type=float, default=0.005,
+                        help="fases mais rápidas que isso na base não são comparadas (ruído)")
+    parser.add_argument("--no-c", action="store_true", help="não mede o parser flex/bison")
+    args = parser.parse_args()
+
+    results = {
+        "python": platform.python_version(),
+        "maquina": platform.machine(),
+        "motor": args.engine,
+        "escala": args.scale,
+        "repeticoes": args.repeat,
+        "cargas": {},
+        "parser_c": {},
+    }
+    with tempfile.TemporaryDirectory() as folder:
+        c_parser = None if args.no_c else CParser(folder)
+        if c_parser is not None and c_parser.reason:
+            print(f"parser C: {c_parser.reason}")
+        cells = " ".join(f"{phase:>19}" for phase in PHASES)
+        print(f"motor {args.engine}, escala {args.scale}, mínimo de {args.repeat} repetições (tempo e pico)")
+        print(f"{'carga':>9} {cells} {'bison':>10}")
+        for name in args.workloads:
+            source, stdin = WORKLOADS[name](args.scale)
+            phases, _ = measure(source, stdin, args.engine, args.warmup, args.repeat)
+            c_time = None
+            if c_parser is not None and c_parser.binary:
+                c_time = c_parser.measure(source, args.warmup, args.repeat)
+            results["cargas"][name] = phases
+            results["parser_c"][name] = c_time
+            show(name, phases, c_time)
+
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2, ensure_ascii=False)
+            f.write("\n")
+
+    if args.baseline:
+        with open(args.baseline, encoding="utf-8") as f:
+            baseline = json.load(f)
+        if (baseline.get("motor"), baseline.get("escala")) != (args.engine, args.scale):
+            raise SystemExit("base medida com outro motor ou outra escala")
+        regressions = compare(results, baseline, args.threshold, args.min_time)
+        for name, phase, what, old, new in regressions:
+            print(f"REGRESSÃO {name}/{phase} ({what}): {old:.4g} -> {new:.4g} ({new / old - 1:+.0%})")
+        if regressions:
+            raise SystemExit(1)
+        print(f"sem regressões acima de {args.threshold:.0%} em relação a {args.baseline}")
+
+
+if __name__ == "__main__":
+    main()
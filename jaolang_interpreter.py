@@ -1,292 +1,1181 @@
+import argparse
+import asyncio
+import atexit
+import codecs
+import copy
+import gc
+import hashlib
+import io
+import json
+import mmap
+import os
+import pickle
+import re
 import sys
+import tempfile
+import time
+from array import array
+from bisect import bisect_right
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from operator import itemgetter
+from types import GeneratorType
 
-class Token:
-    def __init__(self, type_, value):
-        self.type = type_
-        self.value = value
+try:
+    import numpy
+except ImportError:   # só os montões (montao) precisam do NumPy
+    numpy = None
 
 class SymbolTable:
-    def __init__(self, parent=None):
-        self.table = {}
+    def __init__(self, parent=None, output=None, input_source=None, memos=None):
+        self.table = {}   # nome -> [valor, tipo, é função]
         self.parent = parent
+        # entrada/saída da execução, frames reaproveitáveis das chamadas e caches
+        # das funções lembra_ae: os escopos filhos herdam da raiz
+        if parent is not None:
+            self.output = parent.output
+            self.input_source = parent.input_source
+            self.pools = parent.pools
+            self.memos = parent.memos
+        else:
+            self.output = output or OUTPUT
+            self.input_source = input_source or INPUT
+            self.pools = {}
+            self.memos = {} if memos is None else memos
 
     def declare(self, key, type_, value=None, is_func=False):
         if key in self.table:
             raise Exception(f"Variável ou função '{key}' já declarada.")
-        self.table[key] = {"type": type_, "value": value, "is_func": is_func}
+        self.table[key] = [value, type_, is_func]
 
     def get(self, key):
-        if key in self.table:
-            return self.table[key]["value"], self.table[key]["type"], self.table[key].get("is_func", False)
-        elif self.parent:
-            return self.parent.get(key)
+        # sobe pelos escopos num laço: blocos aninhados não gastam pilha do Python
+        st = self
+        while st is not None:
+            entry = st.table.get(key)
+            if entry is not None:
+                return entry[0], entry[1], entry[2]
+            st = st.parent
         raise Exception(f"Variável ou função '{key}' não encontrada.")
 
+    def entry(self, key):
+        # a lista [valor, tipo, é função] do nome (None se não existe), para quem
+        # lê e escreve a mesma variável muitas vezes sem subir os escopos
+        st = self
+        while st is not None:
+            entry = st.table.get(key)
+            if entry is not None:
+                return entry
+            st = st.parent
+        return None
+
     def set(self, key, value, type_):
-        if key in self.table:
-            if self.table[key]["type"] != type_:
-                raise Exception(f"Tipo incompatível: '{type_}' != '{self.table[key]['type']}'")
-            self.table[key]["value"] = value
-            return
-        elif self.parent:
-            self.parent.set(key, value, type_)
-            return
+        st = self
+        while st is not None:
+            entry = st.table.get(key)
+            if entry is not None:
+                if entry[1] != type_:
+                    raise Exception(f"Tipo incompatível: '{type_}' != '{entry[1]}'")
+                entry[0] = value
+                return
+            st = st.parent
         raise Exception(f"Variável '{key}' não declarada.")
 
 
+class OutputSink:
+    # saída de mostra_ae/Println: junta as linhas num buffer e escreve em blocos,
+    # em vez de um print() (e uma escrita no pipe) por valor. stream None usa o
+    # sys.stdout do momento da escrita, então redirect_stdout continua valendo
+    def __init__(self, stream=None, max_lines=8192):
+        self.stream = stream
+        self.max_lines = max_lines
+        self.lines = []
+
+    def line(self, text):
+        lines = self.lines
+        lines.append(text)
+        if len(lines) >= self.max_lines:
+            self.flush()
+
+    def flush(self):
+        stream = self.stream or sys.stdout
+        if self.lines:
+            stream.write("\n".join(self.lines) + "\n")
+            self.lines = []
+        stream.flush()
+
+# saída atual; execute() troca e descarrega no fim (inclusive em erro). Quem usa
+# os motores direto conta com o atexit para não perder o que ficou no buffer
+OUTPUT = OutputSink()
+atexit.register(OUTPUT.flush)
+
+
+# candidatos a int(): sinal, dígitos (com '_') e espaços nas pontas
+INT_CANDIDATE_RE = re.compile(r"\s*[+-]?\d[\d_]*\s*")
+
+def scan_value(text):
+    # mesmo resultado do int(val) com fallback para string, mas sem exceção no
+    # caminho comum: só tenta int() em quem tem cara de número
+    if text.isdecimal() or INT_CANDIDATE_RE.fullmatch(text):
+        try:
+            return int(text)
+        except ValueError:   # '1__2', número com dígitos demais
+            pass
+    return text
+
+
+class InputSource:
+    # entrada de escuta_ae_jao: lê em blocos grandes e entrega as linhas de um
+    # buffer, em vez de um input() por leitura. A fonte pode ser um stream de
+    # texto (None = sys.stdin), um arquivo mapeado em memória (from_path) ou uma
+    # lista de linhas já prontas
+    def __init__(self, stream=None, lines=None, chunk_size=1 << 16):
+        self.stream = stream
+        self.chunk_size = chunk_size
+        self.lines = list(reversed(lines)) if lines is not None else []  # pop() no fim
+        self.partial = ""     # começo de linha que ainda não terminou
+        self.pending_cr = ""  # '\r' no fim do bloco: pode ser metade de um '\r\n'
+        self.eof = lines is not None
+        self.read = None
+        self.decode = None
+        self.translate = False
+        self.output = None    # saída descarregada antes de esperar por entrada
+
+    @classmethod
+    def from_path(cls, path, encoding="utf-8"):
+        with open(path, "rb") as f:
+            try:
+                data = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+            except ValueError:   # arquivo vazio não pode ser mapeado
+                data = io.BytesIO()
+        source = cls()
+        source.read = data.read
+        source.decode = codecs.getincrementaldecoder(encoding)().decode
+        return source
+
+    def open(self):
+        stream = self.stream if self.stream is not None else sys.stdin
+        raw = getattr(stream, "buffer", None)
+        if raw is not None and hasattr(raw, "read1"):
+            # stdin de verdade: lê bytes do que estiver disponível (read1 não
+            # espera encher o bloco, então pipes interativos continuam funcionando)
+            self.read = raw.read1
+            self.decode = codecs.getincrementaldecoder(stream.encoding or "utf-8")(
+                stream.errors or "strict").decode
+            # o stdin do Python só traduz '\r\n'/'\r' no Windows; no POSIX o '\r' fica
+            self.translate = os.name == "nt"
+        else:
+            self.read = stream.read
+
+    def refill(self):
+        if self.eof:
+            return False
+        (self.output or OUTPUT).flush()   # o que foi mostrado aparece antes de esperar a entrada
+        if self.read is None:
+            self.open()
+        while not self.lines:
+            chunk = self.read(self.chunk_size)
+            if self.decode is None:
+                text = chunk
+            else:
+                text = self.decode(chunk, not chunk)
+                if self.translate:
+                    text = self.pending_cr + text
+                    self.pending_cr = ""
+                    if chunk and text.endswith("\r"):
+                        text, self.pending_cr = text[:-1], "\r"
+                    if "\r" in text:
+                        text = text.replace("\r\n", "\n").replace("\r", "\n")
+            if not chunk:
+                self.eof = True
+                if self.partial:
+                    self.lines.append(self.partial)
+                    self.partial = ""
+                return bool(self.lines)
+            parts = (self.partial + text).split("\n")
+            self.partial = parts.pop()
+            parts.reverse()
+            self.lines = parts
+        return True
+
+    def readline(self):
+        if not self.lines and not self.refill():
+            raise EOFError("EOF when reading a line")
+        return self.lines.pop()
+
+    def scan(self):
+        if not self.lines and not self.refill():
+            raise EOFError("EOF when reading a line")
+        return scan_value(self.lines.pop())
+
+# entrada atual; execute() instala uma nova a cada execução
+INPUT = InputSource()
+
+
 class Node:
-    def __init__(self, value, children=None):
+    # base dos nós da AST. Cada construção tem a própria classe, todas com
+    # __slots__ (nada de __dict__ por nó) e filhos numa tupla (a vazia é
+    # compartilhada pelas folhas). value é o literal, o nome ou, nos comandos,
+    # o tipo da construção ("BLOCK", "IF", ...); um Node puro só aparece como
+    # o tipo declarado num VarDecl
+    __slots__ = ("value", "children", "static_type", "pos")
+
+    def __init__(self, value, children=()):
         self.value = value
-        self.children = children or []
+        self.children = tuple(children)
+        self.static_type = None   # preenchido pelo TypeChecker
+        self.pos = None   # deslocamento no fonte do token que abre o nó (SourceMap dá linha/coluna)
+
+    def Evaluate(self, st):
+        return None
+
+class Block(Node):
+    # scope_slots: faixa de slots de um bloco aninhado; frame_size: slots do
+    # frame do programa (só no bloco de fora). Os dois vêm do Resolver
+    __slots__ = ("scope_slots", "frame_size")
+
+    def __init__(self, stmts):
+        super().__init__("BLOCK", stmts)
 
     def Evaluate(self, st):
-        if self.value == "BLOCK":
-            for child in self.children:
-                res = child.Evaluate( SymbolTable(st) if child.value=="BLOCK" else st )
+        for child in self.children:
+            res = child.Evaluate( SymbolTable(st) if type(child) is Block else st )
 
-                # se algum filho devolveu algo (foi um RETURN em qualquer profundidade),
-                # propague imediatamente
-                if res is not None:
-                    return res
-            return None
+            # se algum filho devolveu algo (foi um RETURN em qualquer profundidade),
+            # propague imediatamente; o valor de uma chamada usada como comando
+            # é descartado
+            if res is not None and type(child) is not FuncCall:
+                return res
+        return None
 
-        if self.value == "PRINT":
-            val, typ = self.children[0].Evaluate(st)
-            # booleanos em minúscula
-            if typ == "bool":
-                print("true" if val else "false")
-            else:
-                print(val)
-            return None
+class VarRef(Node):
+    # uso de uma variável (ou o nome no VarDecl/Assign); binding vem do Resolver
+    __slots__ = ("binding",)
 
-        if self.value == "ASSIGN":
-            varName = self.children[0].value
-            val, typ = self.children[1].Evaluate(st)
-            st.set(varName, val, typ)
-            return None
+    def Evaluate(self, st):
+        val, typ, _ = st.get(self.value)   # ignora is_func
+        return val, typ
 
-        if self.value == "VAR_DECL":
-            varName = self.children[0].value
-            varType = self.children[1].value
-            if len(self.children) == 3:
-                val, valType = self.children[2].Evaluate(st)
-                if varType != valType:
-                    raise Exception("Tipo da atribuição incompatível com declaração.")
-                st.declare(varName, varType, val)
-            else:
-                default = 0 if varType == "int" else "" if varType == "string" else False
-                st.declare(varName, varType, default)
-            return None
+class Print(Node):
+    __slots__ = ()
+
+    def __init__(self, expr):
+        super().__init__("PRINT", (expr,))
+
+    def Evaluate(self, st):
+        val, typ = self.children[0].Evaluate(st)
+        # booleanos em minúscula
+        if typ == "bool":
+            st.output.line("true" if val else "false")
+        else:
+            st.output.line(to_str(val, typ))
+        return None
+
+class Assign(Node):
+    __slots__ = ("binding",)
+
+    def __init__(self, target, expr):
+        super().__init__("ASSIGN", (target, expr))
+
+    def Evaluate(self, st):
+        varName = self.children[0].value
+        val, typ = self.children[1].Evaluate(st)
+        st.set(varName, val, typ)
+        return None
+
+class Append(Assign):
+    # "s vira s + a + b" (s falae) num laço que não lê s em nenhum outro lugar:
+    # o Optimizer troca o Assign por este nó e põe s em builders do laço.
+    # Enquanto o laço roda, a variável guarda uma lista de pedaços e os
+    # pedaços entram com to_str, como na concatenação (todos ou nenhum, se um
+    # deles falhar). Fora desse laço é um Assign comum
+    __slots__ = ("pieces",)
+
+    def __init__(self, assign, pieces):
+        super().__init__(*assign.children)
+        self.static_type = assign.static_type
+        self.pos = assign.pos
+        self.binding = assign.binding
+        self.pieces = pieces
+
+    def Evaluate(self, st):
+        entry = st.entry(self.children[0].value)
+        if entry is None or type(entry[0]) is not list:
+            return Assign.Evaluate(self, st)
+        parts = entry[0]
+        parts.extend([to_str(*piece.Evaluate(st)) for piece in self.pieces])
+        return None
+
+def build_strings(st, builders, loop):
+    # roda o laço com as variáveis de builders (nós Append) guardando listas de
+    # pedaços e junta cada uma uma vez só na saída, mesmo com erro ou
+    # devolve_ae. Se um laço de fora já abriu a lista, ele é quem junta
+    cells = []
+    for append in builders:
+        entry = st.entry(append.children[0].value)
+        if entry is not None and type(entry[0]) is str:
+            entry[0] = [entry[0]]
+            cells.append(entry)
+    try:
+        return loop(st)
+    finally:
+        for entry in cells:
+            entry[0] = "".join(entry[0])
+
+class VarDecl(Node):
+    # filhos: nome, tipo e o valor inicial opcional; slot e fresh vêm do Resolver
+    __slots__ = ("slot", "fresh")
+
+    def __init__(self, children):
+        super().__init__("VAR_DECL", children)
+
+    def Evaluate(self, st):
+        varName = self.children[0].value
+        varType = self.children[1].value
+        if len(self.children) == 3:
+            val, valType = self.children[2].Evaluate(st)
+            if varType != valType:
+                raise Exception("Tipo da atribuição incompatível com declaração.")
+            st.declare(varName, varType, val)
+        else:
+            default = DEFAULTS[varType]
+            st.declare(varName, varType, default)
+        return None
+
+class If(Node):
+    __slots__ = ()
+
+    def __init__(self, cond, then_blk, else_blk=None):
+        super().__init__("IF", (cond, then_blk) if else_blk is None else (cond, then_blk, else_blk))
+
+    def Evaluate(self, st):
+        cond, typ = self.children[0].Evaluate(st)
+        if typ != "bool":
+            raise Exception("Condicional do IF precisa ser bool.")
+        if cond:
+            return self.children[1].Evaluate(st)
+        elif len(self.children) == 3:
+            return self.children[2].Evaluate(st)
+        return None
+
+class While(Node):
+    # vai_rodando_ae; builders vem do Optimizer (ver Append)
+    __slots__ = ("builders",)
+
+    def __init__(self, cond, body):
+        super().__init__("FOR", (cond, body))
+        self.builders = ()
+
+    def Evaluate(self, st):
+        if self.builders:
+            return build_strings(st, self.builders, self.iterate)
+        return self.iterate(st)
 
-        if self.value == "IF":
+    def iterate(self, st):
+        while True:
             cond, typ = self.children[0].Evaluate(st)
             if typ != "bool":
-                raise Exception("Condicional do IF precisa ser bool.")
-            if cond:
-                return self.children[1].Evaluate(st)
-            elif len(self.children) == 3:
-                return self.children[2].Evaluate(st)
-            return None
+                raise Exception("Condicional do FOR precisa ser bool.")
+            if not cond:
+                break
+            res = self.children[1].Evaluate(st)
+            if res is not None:
+                return res   # devolve_ae dentro do laço sai da função
+        return None
 
-        if self.value == "FOR":
-            while True:
-                cond, typ = self.children[0].Evaluate(st)
-                if typ != "bool":
-                    raise Exception("Condicional do FOR precisa ser bool.")
-                if not cond:
-                    break
-                self.children[1].Evaluate(st)
-        
-        if self.value == "REPEAT":
-            block, cond = self.children
-            while True:
-                block.Evaluate(st)
-                c, t = cond.Evaluate(st)
-                if t != "bool":
-                    raise Exception("Condicional do REPEAT precisa ser bool.")
-                if not c:
-                    break
+class CountedLoop(While):
+    # vai_rodando_ae de contador inteiro, reconhecido pelo Optimizer: condição
+    # "i < limite" (ou "i > limite"), "i vira i + passo" no fim do corpo e
+    # nenhuma outra escrita em i nem nos nomes do limite. O limite é avaliado
+    # uma vez só e o contador anda num range. Quando o corpo só acumula
+    # ("s vira s + expressão afim em i"), nem o range roda: sums guarda, para
+    # cada Assign, (coeficiente de i, [(VarRef invariante, coeficiente)],
+    # constante) e as somas saem em forma fechada. Os filhos são os do While,
+    # então os outros motores e passes o tratam como um laço comum
+    __slots__ = ("counter", "limit", "step", "sums")
+
+    def __init__(self, loop, counter, limit, step, sums):
+        super().__init__(*loop.children)
+        self.static_type = loop.static_type
+        self.pos = loop.pos
+        self.counter = counter
+        self.limit = limit
+        self.step = step
+        self.sums = sums
+
+    def Evaluate(self, st):
+        if self.builders:
+            return build_strings(st, self.builders, self.counted)
+        return self.counted(st)
+
+    def counted(self, st):
+        counter = st.entry(self.counter)
+        targets = [] if self.sums is None else [st.entry(assign.children[0].value)
+                                                for assign, _, _, _ in self.sums]
+        if counter is None or None in targets:
+            return self.iterate(st)   # o laço comum dá o erro certo
+        start = counter[0]
+        limit, _ = self.limit.Evaluate(st)
+        values = range(start, limit, self.step)
+        count = len(values)
+
+        if self.sums is not None:
+            if count:
+                # soma dos valores de i nas voltas: count*start + passo*(0+1+...+count-1)
+                total = count * start + self.step * (count * (count - 1) // 2)
+                for target, (_, per_counter, terms, const) in zip(targets, self.sums):
+                    invariant = const
+                    for var, coef in terms:
+                        invariant += coef * var.Evaluate(st)[0]
+                    target[0] += per_counter * total + count * invariant
+            counter[0] = start + count * self.step
             return None
 
-        if self.value == "SCAN":
-            val = input()
-            try:
-                return int(val), "int"
-            except:
-                return val, "string"
+        stmts = self.children[1].children[:-1]   # o incremento fica por conta do range
+        for value in values:
+            counter[0] = value
+            for stmt in stmts:
+                res = stmt.Evaluate( SymbolTable(st) if type(stmt) is Block else st )
+                if res is not None and type(stmt) is not FuncCall:
+                    return res   # devolve_ae dentro do laço sai da função
+        counter[0] = start + count * self.step
+        return None
+
+class Repeat(Node):
+    # repete_ate_jao … quando
+    __slots__ = ()
 
-        if isinstance(self.value, str) and not self.children:
-            val, typ, _ = st.get(self.value)   # ignora is_func
-            return val, typ
+    def __init__(self, body, cond):
+        super().__init__("REPEAT", (body, cond))
 
+    def Evaluate(self, st):
+        block, cond = self.children
+        while True:
+            res = block.Evaluate(st)
+            if res is not None:
+                return res
+            c, t = cond.Evaluate(st)
+            if t != "bool":
+                raise Exception("Condicional do REPEAT precisa ser bool.")
+            if not c:
+                break
+        return None
+
+# expressões reaproveitadas (ver Optimizer.hoist_loop e Optimizer.share): cada
+# Shared guarda o valor da expressão filha numa variável temporária, key na
+# tabela de símbolos (nunca é um nome da JaoLang) e slot no frame da função
+# (ou do programa) que a contém; os Cached da mesma expressão só leem
+class Shared(Node):
+    __slots__ = ("key", "slot")
+
+    def __init__(self, expr, key, slot):
+        super().__init__("SHARED", (expr,))
+        self.static_type = expr.static_type
+        self.pos = expr.pos
+        self.key = key
+        self.slot = slot
+
+    def Evaluate(self, st):
+        val, typ = self.children[0].Evaluate(st)
+        st.table[self.key] = [val, typ, False]
+        return val, typ
+
+class Cached(Node):
+    __slots__ = ("key", "slot")
+
+    def __init__(self, shared, pos):
+        super().__init__("CACHED")
+        self.static_type = shared.static_type
+        self.pos = pos
+        self.key = shared.key
+        self.slot = shared.slot
+
+    def Evaluate(self, st):
+        entry = st.entry(self.key)
+        return entry[0], entry[1]
+
+class Hoist(Node):
+    # comando posto antes de um laço: calcula uma vez as expressões (Shared)
+    # que não mudam de uma volta para outra
+    __slots__ = ()
+
+    def __init__(self, shared):
+        super().__init__("HOIST", shared)
+
+    def Evaluate(self, st):
+        for shared in self.children:
+            shared.Evaluate(st)
         return None
 
+class Scan(Node):
+    __slots__ = ()
+
+    def __init__(self):
+        super().__init__("SCAN")
+
+    def Evaluate(self, st):
+        val = st.input_source.scan()
+        return val, "int" if type(val) is int else "string"
+
 class IntVal(Node):
+    __slots__ = ()
+
     def Evaluate(self, st):
         return self.value, "int"
 
 class BoolVal(Node):
+    __slots__ = ()
+
     def Evaluate(self, st):
         return self.value, "bool"
 
 class StringVal(Node):
+    __slots__ = ()
+
     def Evaluate(self, st):
         return self.value, "string"
 
 def to_str(val, typ):
     if typ == "bool":
         return "true" if val else "false"
+    if typ in ARRAY_TYPES:
+        return array_str(val)
     return str(val)
 
+# montões: arrays do NumPy de uma dimensão (int64 ou bool), passados por
+# referência como as listas do Python. Tipo do montão -> tipo do elemento
+ARRAY_TYPES = {"int[]": "int", "bool[]": "bool"}
+ELEMENT_CLASSES = {"int[]": int, "bool[]": bool}
+
+def require_numpy():
+    if numpy is None:
+        raise Exception("montao precisa do NumPy (pip install numpy).")
+
+def array_str(val):
+    if val.dtype == bool:
+        return "[" + ", ".join(["true" if item else "false" for item in val.tolist()]) + "]"
+    return "[" + ", ".join(map(str, val.tolist())) + "]"
+
+def check_index(arr, i):
+    if type(i) is not int:
+        raise Exception("Índice de montao precisa ser int.")
+    if not 0 <= i < len(arr):
+        raise Exception(f"Índice {i} fora do montao (tamanho {len(arr)}).")
+
+def array_index(arr, i):
+    check_index(arr, i)
+    return arr[i].item()
+
+def array_store(arr, i, val):
+    check_index(arr, i)
+    typ = type_of(arr)
+    if type(val) is not ELEMENT_CLASSES[typ]:
+        raise Exception(f"Tipo incompatível: '{type_of(val)}' != '{ARRAY_TYPES[typ]}'")
+    try:
+        arr[i] = val
+    except OverflowError:
+        raise Exception("Inteiro não cabe num montao inteirao (64 bits).")
+
+def array_slice(arr, start, stop):
+    # cópia, não uma view: mudar a fatia não muda o montão de origem
+    if type(start) is not int or type(stop) is not int:
+        raise Exception("Índice de montao precisa ser int.")
+    if not 0 <= start <= stop <= len(arr):
+        raise Exception(f"Fatia [{start}:{stop}] fora do montao (tamanho {len(arr)}).")
+    return arr[start:stop].copy()
+
+# operador -> (tipo dos elementos que ele aceita, tipo do elemento do
+# resultado); None aceita qualquer um, desde que igual dos dois lados
+ARRAY_OPS = {
+    "+": ("int", "int"), "-": ("int", "int"), "*": ("int", "int"), "/": ("int", "int"),
+    "<": ("int", "bool"), ">": ("int", "bool"), "==": (None, "bool"),
+    "&&": ("bool", "bool"), "||": ("bool", "bool"),
+}
+ARRAY_UFUNCS = {} if numpy is None else {
+    "+": numpy.add, "-": numpy.subtract, "*": numpy.multiply, "/": numpy.floor_divide,
+    "<": numpy.less, ">": numpy.greater, "==": numpy.equal,
+    "&&": numpy.logical_and, "||": numpy.logical_or,
+}
+
+# o int64 do NumPy dá a volta calado; o inteirao escalar não tem limite.
+# operador -> elementos em que o resultado deu a volta (o resultado já
+# calculado, com os mesmos operandos)
+INT64_MIN = -2 ** 63
+ARRAY_OVERFLOWS = {
+    # o resultado com o sinal trocado em relação ao que os operandos dão
+    "+": lambda l, r, res: ((l ^ res) & (r ^ res)) < 0,
+    "-": lambda l, r, res: ((l ^ r) & (l ^ res)) < 0,
+    # desfazer a conta não volta ao operando; min * -1 é o único caso em que volta
+    "*": lambda l, r, res: ((r != 0) & (res // numpy.where(r == 0, 1, r) != l))
+                           | ((l == INT64_MIN) & (r == -1)) | ((l == -1) & (r == INT64_MIN)),
+    "/": lambda l, r, res: (l == INT64_MIN) & (r == -1),
+}
+
+def vectorized(op, ltype, rtype):
+    # a operação roda elemento a elemento (montão com montão do mesmo tamanho
+    # ou com escalar); '+' com string continua sendo concatenação
+    return ((ltype in ARRAY_TYPES or rtype in ARRAY_TYPES)
+            and not (op == "+" and "string" in (ltype, rtype)))
+
+def array_op_type(op, ltype, rtype):
+    # tipo do resultado de uma operação vetorizada, None se os tipos não servem
+    need, result = ARRAY_OPS[op]
+    lelem = ARRAY_TYPES.get(ltype, ltype)
+    relem = ARRAY_TYPES.get(rtype, rtype)
+    if lelem != relem or need is not None and lelem != need:
+        return None
+    return result + "[]"
+
+def array_binop(op, lval, ltype, rval, rtype):
+    typ = array_op_type(op, ltype, rtype)
+    if typ is None:
+        raise Exception(f"Operação '{op}' inválida entre '{ltype}' e '{rtype}'.")
+    if ltype in ARRAY_TYPES and rtype in ARRAY_TYPES and len(lval) != len(rval):
+        raise Exception(f"Montões de tamanhos diferentes ({len(lval)} e {len(rval)}).")
+    if op == "/" and not numpy.all(rval):
+        raise Exception("Divisão por zero.")
+    try:
+        with numpy.errstate(all="ignore"):
+            result = ARRAY_UFUNCS[op](lval, rval)
+            wrapped = op in ARRAY_OVERFLOWS and ARRAY_OVERFLOWS[op](lval, rval, result).any()
+    except OverflowError:
+        wrapped = True
+    if wrapped:
+        raise Exception("Inteiro não cabe num montao inteirao (64 bits).")
+    return result, typ
+
+def array_negate(arr):
+    # -min é o próprio min em int64
+    if len(arr) and arr.min() == INT64_MIN:
+        raise Exception("Inteiro não cabe num montao inteirao (64 bits).")
+    return numpy.negative(arr)
+
+def array_extreme(arr, pick, name):
+    if not len(arr):
+        raise Exception(f"'{name}' de montao vazio.")
+    return pick(arr).item()
+
+def array_sum(arr):
+    # a soma em int64 só é exata se não tem como passar do limite; senão
+    # soma com os ints do Python, que é o que o inteirao escalar faria
+    if not len(arr) or max(-int(arr.min()), int(arr.max())) <= (2 ** 63 - 1) // len(arr):
+        return int(arr.sum())
+    return sum(arr.tolist())
+
+def array_range(size):
+    # 0, 1, ..., size - 1
+    if size < 0:
+        raise Exception("Tamanho de montao negativo.")
+    return numpy.arange(size, dtype=numpy.int64)
+
+def array_fill(size, fill):
+    if size < 0:
+        raise Exception("Tamanho de montao negativo.")
+    return numpy.full(size, fill, dtype=bool if type(fill) is bool else numpy.int64)
+
+# funções embutidas dos montões: nome -> (função, {tipos dos argumentos: tipo do resultado})
+BUILTINS = {
+    "tamanho_ae": (len, {("int[]",): "int", ("bool[]",): "int"}),
+    "soma_ae": (array_sum, {("int[]",): "int"}),
+    "menor_ae": (lambda arr: array_extreme(arr, numpy.min, "menor_ae"), {("int[]",): "int"}),
+    "maior_ae": (lambda arr: array_extreme(arr, numpy.max, "maior_ae"), {("int[]",): "int"}),
+    "conta_ae": (lambda arr: int(numpy.count_nonzero(arr)), {("bool[]",): "int"}),
+    "faixa_ae": (array_range, {("int",): "int[]"}),
+    "enche_ae": (array_fill, {("int", "int"): "int[]", ("int", "bool"): "bool[]"}),
+}
+
+def apply_builtin(name, values, types):
+    func, signatures = BUILTINS[name]
+    typ = signatures.get(types)
+    if typ is None:
+        raise Exception(f"Argumentos inválidos para '{name}': ({', '.join(map(str, types))}).")
+    try:
+        return func(*values), typ
+    except OverflowError:
+        raise Exception("Inteiro não cabe num montao inteirao (64 bits).")
+
+def call_builtin(name, *args):
+    return apply_builtin(name, args, tuple(map(type_of, args)))[0]
+
+# conversão para concatenação quando o tipo já é conhecido na compilação
+STR_CONVERTERS = {
+    "int": str,
+    "string": lambda val: val,
+    "bool": lambda val: "true" if val else "false",
+    "int[]": array_str,
+    "bool[]": array_str,
+}
+
+# valor de uma variável declarada sem valor inicial. O montão vazio é um só
+# (nada muda um montão de tamanho 0)
+DEFAULTS = {"int": 0, "string": "", "bool": False}
+if numpy is not None:
+    DEFAULTS["int[]"] = numpy.zeros(0, dtype=numpy.int64)
+    DEFAULTS["bool[]"] = numpy.zeros(0, dtype=bool)
+
+def eval_binop(op, lval, ltype, rval, rtype):
+    # '+' (concatena strings ou soma ints)
+    if op == "+":
+        if ltype=="string" or rtype=="string":
+            return to_str(lval, ltype) + to_str(rval, rtype), "string"
+        if ltype==rtype=="int":
+            return lval + rval, "int"
+        if vectorized(op, ltype, rtype):
+            return array_binop(op, lval, ltype, rval, rtype)
+        raise Exception("Operação '+' inválida para tipos diferentes.")
+
+    # '-' só em inteiros
+    elif op == "-":
+        if ltype==rtype=="int":
+            return lval - rval, "int"
+        if vectorized(op, ltype, rtype):
+            return array_binop(op, lval, ltype, rval, rtype)
+        raise Exception("Operação '-' requer inteiros.")
+
+    # '*' só em inteiros
+    elif op == "*":
+        if ltype==rtype=="int":
+            return lval * rval, "int"
+        if vectorized(op, ltype, rtype):
+            return array_binop(op, lval, ltype, rval, rtype)
+        raise Exception("Operação '*' requer inteiros.")
+
+    # '/' só em inteiros (e checa divisão por zero)
+    elif op == "/":
+        if ltype==rtype=="int":
+            if rval == 0:
+                raise Exception("Divisão por zero.")
+            return lval // rval, "int"
+        if vectorized(op, ltype, rtype):
+            return array_binop(op, lval, ltype, rval, rtype)
+        raise Exception("Operação '/' requer inteiros.")
+
+    # relacional '<' e '>'  
+    elif op in ("<",">"):
+        # ints OK
+        if ltype==rtype=="int":
+            return (lval < rval if op=="<" else lval > rval), "bool"
+        # strings lex order OK
+        if ltype==rtype=="string":
+            return (lval < rval if op=="<" else lval > rval), "bool"
+        if vectorized(op, ltype, rtype):
+            return array_binop(op, lval, ltype, rval, rtype)
+        raise Exception(f"Operação '{op}' requer inteiros ou strings.")
+
+    # igualdade '==' só entre mesmos tipos (com montão, elemento a elemento)
+    elif op == "==":
+        if ltype != rtype or ltype in ARRAY_TYPES:
+            if vectorized(op, ltype, rtype):
+                return array_binop(op, lval, ltype, rval, rtype)
+            raise Exception(f"Não é possível comparar '{ltype}' com '{rtype}'.")
+        return (lval == rval), "bool"
+
+    # '&&' / '||' só em booleanos
+    elif op in ("&&","||"):
+        if ltype==rtype=="bool":
+            return (lval and rval if op=="&&" else lval or rval), "bool"
+        if vectorized(op, ltype, rtype):
+            return array_binop(op, lval, ltype, rval, rtype)
+        raise Exception(f"Operação '{op}' requer booleanos.")
+
+    raise Exception(f"Operador desconhecido: {op}")
+
 class BinOp(Node):
+    __slots__ = ()
+
     def Evaluate(self, st):
         lval, ltype = self.children[0].Evaluate(st)
         rval, rtype = self.children[1].Evaluate(st)
-
-        # '+' (concatena strings ou soma ints)
-        if self.value == "+":
-            if ltype=="string" or rtype=="string":
-                return to_str(lval, ltype) + to_str(rval, rtype), "string"
-            if ltype==rtype=="int":
-                return lval + rval, "int"
-            raise Exception("Operação '+' inválida para tipos diferentes.")
-
-        # '-' só em inteiros
-        elif self.value == "-":
-            if ltype==rtype=="int":
-                return lval - rval, "int"
-            raise Exception("Operação '-' requer inteiros.")
-
-        # '*' só em inteiros
-        elif self.value == "*":
-            if ltype==rtype=="int":
-                return lval * rval, "int"
-            raise Exception("Operação '*' requer inteiros.")
-
-        # '/' só em inteiros (e checa divisão por zero)
-        elif self.value == "/":
-            if ltype==rtype=="int":
-                if rval == 0:
-                    raise Exception("Divisão por zero.")
-                return lval // rval, "int"
-            raise Exception("Operação '/' requer inteiros.")
-
-        # relacional '<' e '>'  
-        elif self.value in ("<",">"):
-            # ints OK
-            if ltype==rtype=="int":
-                return (lval < rval if self.value=="<" else lval > rval), "bool"
-            # strings lex order OK
-            if ltype==rtype=="string":
-                return (lval < rval if self.value=="<" else lval > rval), "bool"
-            raise Exception(f"Operação '{self.value}' requer inteiros ou strings.")
-
-        # igualdade '==' só entre mesmos tipos
-        elif self.value == "==":
-            if ltype != rtype:
-                raise Exception(f"Não é possível comparar '{ltype}' com '{rtype}'.")
-            return (lval == rval), "bool"
-
-        # '&&' / '||' só em booleanos
-        elif self.value in ("&&","||"):
-            if ltype==rtype=="bool":
-                return (lval and rval if self.value=="&&" else lval or rval), "bool"
-            raise Exception(f"Operação '{self.value}' requer booleanos.")
-
-        raise Exception(f"Operador desconhecido: {self.value}")
+        return eval_binop(self.value, lval, ltype, rval, rtype)
 
 class Return(Node):
+    __slots__ = ("tail",)
+
     def __init__(self, expr):
-        super().__init__("RETURN", [expr])
+        super().__init__("RETURN", (expr,))
+        self.tail = False   # o TypeChecker marca "devolve_ae f(...)" que pode virar TailCall
 
     def Evaluate(self, st):
+        if self.tail:
+            call = self.children[0]
+            func_node, env = call.callee(st)
+            enter = func_node.enter_typed if call.typed and func_node is call.target else func_node.enter
+            return TailCall(call.name, func_node, enter(env, call.children, st))
         return self.children[0].Evaluate(st)
 
+# chamada em posição de cauda (devolve_ae f(...)): em vez de empilhar mais uma
+# chamada do Python, o corpo devolve isto já com o frame da próxima função
+# montado, e quem chamou roda a próxima função no próprio laço. Todos os
+# motores usam (no transpilador, frame são os argumentos)
+class TailCall:
+    __slots__ = ("name", "func", "frame")
+
+    def __init__(self, name, func, frame):
+        self.name = name
+        self.func = func
+        self.frame = frame
+
+# entradas de cada cache de lembra_ae (muda com --memo-size)
+MEMO_SIZE = 1024
+
+class MemoCache:
+    # resultados de uma função lembra_ae, chaveados pelos valores dos argumentos;
+    # passando de size entradas, sai a usada há mais tempo (LRU)
+    __slots__ = ("name", "size", "entries", "hits", "misses")
+
+    def __init__(self, name, size):
+        self.name = name
+        self.size = size
+        self.entries = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key):
+        # None quando não está no cache (funções lembra_ae nunca são void)
+        result = self.entries.get(key)
+        if result is None:
+            self.misses += 1
+            return None
+        self.entries.move_to_end(key)
+        self.hits += 1
+        return result
+
+    def put(self, key, result):
+        entries = self.entries
+        entries[key] = result
+        if len(entries) > self.size:
+            entries.popitem(last=False)
+
+    def report(self):
+        return (f"lembra_ae {self.name}: {self.hits} acerto(s), {self.misses} falha(s), "
+                f"{len(self.entries)} de {self.size} entrada(s)")
+
+def memo_for(memos, func_node):
+    # cache da função nesta execução (cada execução tem o próprio dicionário)
+    cache = memos.get(func_node)
+    if cache is None:
+        cache = memos[func_node] = MemoCache(func_node.name, func_node.memo)
+    return cache
+
+def eval_unop(op, val, typ):
+    if op == "-":
+        if typ == "int[]": return array_negate(val), typ
+        if typ!="int": raise Exception("Unário '-' só em int.")
+        return -val, "int"
+    if op == "+":
+        return val, typ 
+    if op == "!":
+        if typ == "bool[]": return numpy.logical_not(val), typ
+        if typ!="bool": raise Exception("Unário '!' só em bool.")
+        return not val, "bool"
+    return val, typ
+
 class UnOp(Node):
+    __slots__ = ()
+
     def Evaluate(self, st):
         val, typ = self.children[0].Evaluate(st)
-        if self.value == "-":
-            if typ!="int": raise Exception("Unário '-' só em int.")
-            return -val, "int"
-        if self.value == "+":
-            return val, typ 
-        if self.value == "!":
-            if typ!="bool": raise Exception("Unário '!' só em bool.")
-            return not val, "bool"
-        return val, typ
+        return eval_unop(self.value, val, typ)
 
 class NoOp(Node):
+    __slots__ = ()
+
     def Evaluate(self, st):
         return None
 
 
 class FuncDec(Node):
+    # frame_size, slot e fresh vêm do Resolver
+    __slots__ = ("name", "params", "return_type", "pooled", "memo", "frame_size", "slot", "fresh")
+
     def __init__(self, name, params, return_type, body):
-        super().__init__("FUNC_DEC", [body])
+        super().__init__("FUNC_DEC", (body,))
         self.name = name
         self.params = params  # lista de tuplas: (nome, tipo)
         self.return_type = return_type
+        # sem funções declaradas dentro, nada guarda o escopo da chamada depois
+        # que ela termina: dá para reaproveitá-lo na próxima
+        self.pooled = not declares_functions(body)
+        self.memo = 0   # entradas do cache LRU quando marcada com lembra_ae
 
     def Evaluate(self, st):
-        st.declare(self.name, self.return_type, self, is_func=True)
+        # guarda a função junto com o escopo onde foi declarada (escopo léxico)
+        st.declare(self.name, self.return_type, (self, st), is_func=True)
+
+    def enter(self, env, arg_nodes, st):
+        # escopo da chamada, filho do escopo da declaração (não do de quem chama),
+        # com os argumentos avaliados em st
+        local = self.scope(env, len(arg_nodes), st)
+        for (pname, ptype), arg_expr in zip(self.params, arg_nodes):
+            arg_val, arg_type = arg_expr.Evaluate(st)
+            self.bind(local, pname, ptype, arg_val, arg_type)
+        return local
+
+    def enter_typed(self, env, arg_nodes, st):
+        # enter() de uma chamada com a assinatura já conferida (FuncCall.typed)
+        local = self.scope(env, len(arg_nodes), st)
+        table = local.table
+        for (pname, ptype), arg_expr in zip(self.params, arg_nodes):
+            table[pname] = [arg_expr.Evaluate(st)[0], ptype, False]
+        return local
+
+    def scope(self, env, nargs, st):
+        # escopo da chamada ainda sem os argumentos
+        if len(self.params) != nargs:
+            raise Exception("Número incorreto de argumentos.")
+        pool = st.pools.get(self) if self.pooled else None
+        if pool:
+            local = pool.pop()
+            local.parent = env
+            return local
+        return SymbolTable(env)
+
+    @staticmethod
+    def bind(local, pname, ptype, arg_val, arg_type):
+        if arg_type != ptype:
+            raise Exception(f"Tipo incompatível em argumento '{pname}': esperado {ptype}, recebido {arg_type}")
+        local.declare(pname, ptype, arg_val)
+
+    def leave(self, local):
+        if self.pooled:
+            local.table.clear()
+            local.parent = None
+            local.pools.setdefault(self, []).append(local)
+
+    def call(self, name, local):
+        # trampolim: chamadas em posição de cauda voltam como TailCall e rodam
+        # aqui mesmo, sem crescer a pilha do Python
+        func_node = self
+        while True:
+            result = func_node.children[0].Evaluate(local)
+            func_node.leave(local)
+            if type(result) is not TailCall:
+                return func_node.check_result(name, result)
+            name, func_node, local = result.name, result.func, result.frame
+
+    def memo_key(self, local):
+        # lembra_ae: a chave são os valores dos parâmetros já no escopo da chamada
+        return tuple(local.table[pname][0] for pname, _ in self.params)
+
+    def call_memo(self, name, local):
+        cache = memo_for(local.memos, self)
+        key = self.memo_key(local)
+        result = cache.get(key)
+        if result is not None:
+            self.leave(local)
+            return result
+        result = self.call(name, local)
+        cache.put(key, result)
+        return result
+
+    def check_result(self, name, result):
+        if isinstance(result, tuple):           # houve "return expr"
+            ret_val, ret_type = result
+
+            # função declarada void não pode retornar valor
+            if self.return_type == "void":
+                raise Exception(f"Função '{name}' é void — não pode retornar valor.")
+
+            # tipo incompatível
+            if ret_type != self.return_type:
+                raise Exception(f"Retorno de '{name}' incompatível "
+                                f"({ret_type} ≠ {self.return_type})")
+
+            return result                       # tudo certo
+
+        # não houve return explícito
+        if self.return_type != "void":
+            raise Exception(f"Função '{name}' deve retornar '{self.return_type}'.")
+
+        return None
 
 
 class FuncCall(Node):
+    # cache da chamada, preenchido pela análise: target é o FuncDec que o nome
+    # sempre resolve aqui (None se depende da execução), hops quantas tabelas
+    # de símbolos acima de st ele foi declarado e typed diz que aridade e tipos
+    # dos argumentos já foram conferidos. A entrada achada é conferida a cada
+    # chamada; se não for a do target, vale a busca completa
+    __slots__ = ("name", "binding", "target", "hops", "typed")
+
     def __init__(self, name, args):
         super().__init__("FUNC_CALL", args)
         self.name = name
+        self.target = None
+        self.hops = 0
+        self.typed = False
+
+    def callee(self, st):
+        target = self.target
+        if target is not None:
+            table = st
+            for _ in range(self.hops):
+                table = table.parent
+                if table is None:
+                    break
+            else:
+                entry = table.table.get(self.name)
+                if entry is not None and entry[2] and type(entry[0]) is tuple and entry[0][0] is target:
+                    return entry[0]
+        val, typ, is_func = st.get(self.name)
+        if not is_func or type(val) is not tuple:
+            raise Exception(f"'{self.name}' não é uma função.")
+        return val   # (FuncDec, escopo da declaração)
 
     def Evaluate(self, st):
 
         if self.name == "Println":
             for arg in self.children:
                 val, typ = arg.Evaluate(st)
-                print("true" if typ == "bool" else val)
+                st.output.line("true" if typ == "bool" else to_str(val, typ))
             return None
-        
-        val, typ, is_func = st.get(self.name)
-        if not is_func:
-            raise Exception(f"'{self.name}' não é uma função.")
-        func_node = val  # é um FuncDec
-        if len(func_node.params) != len(self.children):
-            raise Exception("Número incorreto de argumentos.")
-        
-        local_st = SymbolTable(st)
-        for (pname, ptype), arg_expr in zip(func_node.params, self.children):
-            arg_val, arg_type = arg_expr.Evaluate(st)
-            if arg_type != ptype:
-                raise Exception(f"Tipo incompatível em argumento '{pname}': esperado {ptype}, recebido {arg_type}")
-            local_st.declare(pname, ptype, arg_val)
-        
-        result = func_node.children[0].Evaluate(local_st)
 
-        # --- NOVO BLOCO DE VERIFICAÇÃO --------------------------
-        if isinstance(result, tuple):           # houve "return expr"
-            ret_val, ret_type = result
+        func_node, env = self.callee(st)
+        if self.typed and func_node is self.target:
+            local = func_node.enter_typed(env, self.children, st)
+        else:
+            local = func_node.enter(env, self.children, st)
+        if func_node.memo:
+            return func_node.call_memo(self.name, local)
+        return func_node.call(self.name, local)
 
-            # função declarada void não pode retornar valor
-            if func_node.return_type == "void":
-                raise Exception(f"Função '{self.name}' é void — não pode retornar valor.")
 
-            # tipo incompatível
-            if ret_type != func_node.return_type:
-                raise Exception(f"Retorno de '{self.name}' incompatível "
-                                f"({ret_type} ≠ {func_node.return_type})")
+# nós dos montões: apply recebe os (valor, tipo) dos filhos já avaliados, na
+# ordem, e é o mesmo no tree e no stack
+class Index(Node):
+    # v[i]
+    __slots__ = ()
 
-            return result                       # tudo certo
+    def __init__(self, array, index):
+        super().__init__("INDEX", (array, index))
 
-        # não houve return explícito
-        if func_node.return_type != "void":
-            raise Exception(f"Função '{self.name}' deve retornar '{func_node.return_type}'.")
+    def Evaluate(self, st):
+        return self.apply([child.Evaluate(st) for child in self.children])
+
+    def apply(self, values):
+        (arr, typ), (i, _) = values
+        return array_index(arr, i), ARRAY_TYPES[typ]
+
+class Slice(Node):
+    # v[início:fim], uma cópia
+    __slots__ = ()
+
+    def __init__(self, array, start, stop):
+        super().__init__("SLICE", (array, start, stop))
+
+    Evaluate = Index.Evaluate
+
+    def apply(self, values):
+        (arr, typ), (start, _), (stop, _) = values
+        return array_slice(arr, start, stop), typ
+
+class IndexAssign(Node):
+    # v[i] vira expr
+    __slots__ = ()
+
+    def __init__(self, array, index, expr):
+        super().__init__("INDEX_ASSIGN", (array, index, expr))
 
-        return None 
+    Evaluate = Index.Evaluate
+
+    def apply(self, values):
+        (arr, _), (i, _), (val, _) = values
+        array_store(arr, i, val)
+        return None
+
+class Builtin(Node):
+    # tamanho_ae(v), soma_ae(v), ...: value é o nome (ver BUILTINS)
+    __slots__ = ()
+
+    Evaluate = Index.Evaluate
+
+    def apply(self, values):
+        return apply_builtin(self.value, [val for val, _ in values], tuple(typ for _, typ in values))
 
 
 
 class Token:
-    def __init__(self, type_, value):
+    __slots__ = ("type", "value", "pos")
+
+    def __init__(self, type_, value, pos=0):
         self.type = type_
         self.value = value
+        self.pos = pos   # deslocamento no fonte (SourceMap dá linha/coluna)
+
+# palavras reservadas -> tipo do token, agrupadas pelo primeiro caractere
+# (a ordem dentro de cada grupo segue a ordem original de prioridade)
+KEYWORDS = {
+    "inteirao":         "T_INTEIRO",  # tipo inteiro
+    "falae":            "T_STRING",   # tipo string
+    "verdade_ou_farsa": "T_BOOL",     # tipo bool
+    "montao":           "T_ARRAY",    # montao inteirao / montao verdade_ou_farsa: array
+
+    "eh_tudo":          "T_TRUE",     # true
+    "eh_nada":          "T_FALSE",    # false
+
+    "mostra_ae":        "T_PRINT",    # print
+    "escuta_ae_jao":    "T_SCAN",     # scan
+
+    "se_liga_jao":      "T_IF",       # if
+    "se_nao_jao":       "T_ELSE",     # else
+
+    "vai_rodando_ae":   "T_FOR",      # for
+    "repete_ate_jao":   "T_REPEAT",   # repeat…when
+    "quando":           "T_WHEN",     # when (para o repeat)
+    "vira":             "T_ASSIGN",
+
+    "faz_ae":           "T_FUNC",     # declaração de função
+    "devolve_ae":       "T_RETURN",   # return
+    "lembra_ae":        "T_MEMO",     # anotação: função memoizada
+}
+KEYWORD_VALUES = {"eh_tudo": True, "eh_nada": False}
+TYPE_TOKENS = {"T_INTEIRO": "int", "T_STRING": "string", "T_BOOL": "bool"}
+
+KEYWORDS_BY_FIRST = {}
+for _kw, _typ in KEYWORDS.items():
+    KEYWORDS_BY_FIRST.setdefault(_kw[0], []).append(
+        (_kw, len(_kw), _typ, KEYWORD_VALUES.get(_kw, _kw)))
+
+SYMBOLS = {
+    "<<": "T_LBLOCK", ">>": "T_RBLOCK", "==": "T_EQ", "&&": "T_AND", "||": "T_OR",
+    '+': "PLUS", '-': "MINUS", '*': "MULT", '/': "DIV",
+    '=': "EQUAL", '(': "LPAR", ')': "RPAR", '{': "LB", '}': "RB",
+    '<': "LT", '>': "GT", '!': "NOT", ',': "COMMA",
+    '[': "LBRACKET", ']': "RBRACKET", ':': "COLON",
+}
+
+# espaços e comentários '//' são pulados de uma vez só
+NEWLINE_RE = re.compile(r"\n")
+SKIP_RE = re.compile(r"(?:\s+|//[^\n]*)*")
+
+# regex mestre: um match por token, direto na posição atual (sem fatiar o fonte)
+TOKEN_RE = re.compile(r"""
+    (?P<SYMBOL> << | >> | == | && | \|\| | [-+*/=(){}<>!,\[\]:] )
+  | (?P<STRING> "[^"]*" )
+  | (?P<INT> \d+ )
+  | (?P<WORD> \w+ )
+""", re.VERBOSE)
+
+class SourceMap:
+    # converte deslocamentos (Token.pos, Node.pos) em linha e coluna, a partir
+    # de 1. Tokens e nós guardam só o deslocamento para não pesar no parse
+    def __init__(self, source):
+        self.source = source
+        self.newlines = [m.start() for m in NEWLINE_RE.finditer(source)]
+
+    def locate(self, pos):
+        line = bisect_right(self.newlines, pos - 1)
+        start = self.newlines[line - 1] + 1 if line else 0
+        return line + 1, pos - start + 1
+
+    def line(self, pos):
+        return bisect_right(self.newlines, pos - 1) + 1
+
+    def text(self, line):
+        # conteúdo da linha (sem o '\n')
+        start = self.newlines[line - 2] + 1 if line > 1 else 0
+        end = self.newlines[line - 1] if line <= len(self.newlines) else len(self.source)
+        return self.source[start:end]
 
 class Tokenizer:
     def __init__(self, source):
@@ -296,400 +1185,4530 @@ class Tokenizer:
         self.selectNext()
 
     def selectNext(self):
-        while self.position < len(self.source) and self.source[self.position].isspace():
-            self.position += 1
+        source = self.source
+        pos = SKIP_RE.match(source, self.position).end()
+        self.position = pos
 
-        if self.position >= len(self.source):
-            self.actual = Token("EOF", None)
+        if pos >= len(source):
+            self.actual = Token("EOF", None, pos)
             return
 
-        s = self.source[self.position:]
+        m = TOKEN_RE.match(source, pos)
+        if m is None:
+            if source[pos] == '"':
+                raise Exception("String malformada.")
+            raise Exception(f"Caractere inválido: {source[pos]}")
 
-        if s.startswith("//"):
-            while self.position < len(self.source) and self.source[self.position] != '\n':
-                self.position += 1
-            self.selectNext()
-            return
+        kind = m.lastgroup
+        end = m.end()
 
-        keywords = [
-            "inteirao",         # tipo inteiro
-            "falae",            # tipo string
-            "verdade_ou_farsa", # tipo bool
-
-            "eh_tudo",          # true
-            "eh_nada",          # false
-
-            "mostra_ae",        # print
-            "escuta_ae_jao",    # scan
-
-            "se_liga_jao",      # if
-            "se_nao_jao",       # else
-
-            "vai_rodando_ae",   # for
-            "repete_ate_jao",   # repeat…when
-            "quando",           # when (para o repeat)
-            "vira",
-        ]
-        for kw in keywords:
-            if s.startswith(kw) and (len(s)==len(kw) or not s[len(kw)].isalnum()):
-                if kw == "inteirao":
-                    self.actual = Token("T_INTEIRO", kw)
-                elif kw == "falae":
-                    self.actual = Token("T_STRING", kw)
-                elif kw == "verdade_ou_farsa":
-                    self.actual = Token("T_BOOL", kw)
-                elif kw == "eh_tudo":
-                    self.actual = Token("T_TRUE", True)
-                elif kw == "eh_nada":
-                    self.actual = Token("T_FALSE", False)
-                elif kw == "mostra_ae":
-                    self.actual = Token("T_PRINT", kw)
-                elif kw == "escuta_ae_jao":
-                    self.actual = Token("T_SCAN", kw)
-                elif kw == "se_liga_jao":
-                    self.actual = Token("T_IF", kw)
-                elif kw == "se_nao_jao":
-                    self.actual = Token("T_ELSE", kw)
-                elif kw == "vai_rodando_ae":
-                    self.actual = Token("T_FOR", kw)
-                elif kw == "repete_ate_jao":
-                    self.actual = Token("T_REPEAT", kw)
-                elif kw == "quando":
-                    self.actual = Token("T_WHEN", kw)
-                elif kw == "vira":
-                    self.actual = Token("T_ASSIGN", kw)
-                self.position += len(kw)
+        if kind == "WORD":
+            # palavra reservada só fecha se o próximo caractere não for alfanumérico
+            for kw, size, typ, value in KEYWORDS_BY_FIRST.get(source[pos], ()):
+                if source.startswith(kw, pos):
+                    stop = pos + size
+                    if stop == len(source) or not source[stop].isalnum():
+                        self.actual = Token(typ, value, pos)
+                        self.position = stop
+                        return
+
+            first = source[pos]
+            if first.isalpha() or first == '_':
+                self.actual = Token("IDEN", sys.intern(m.group()), pos)
+                self.position = end
+                return
+            if first.isdigit():
+                # dígitos não-decimais (ex.: '²') seguem o caminho dos números
+                self.scanDigits(pos)
                 return
-                
+            raise Exception(f"Caractere inválido: {first}")
 
-        for op, name in {"<<":"T_LBLOCK", ">>":"T_RBLOCK", "==":"T_EQ", "&&":"T_AND", "||":"T_OR"}.items():
-            if s.startswith(op):
-                self.actual = Token(name, op)
-                self.position += len(op)
+        if kind == "SYMBOL":
+            text = m.group()
+            self.actual = Token(SYMBOLS[text], text, pos)
+        elif kind == "INT":
+            if end < len(source) and source[end].isdigit():
+                self.scanDigits(pos)
                 return
+            self.actual = Token("INT", int(m.group()), pos)
+        else:
+            self.actual = Token("STRING", source[pos + 1:end - 1], pos)
+        self.position = end
 
-        single = {
-            '+': "PLUS", '-': "MINUS", '*': "MULT", '/': "DIV",
-            '=': "EQUAL", '(': "LPAR", ')': "RPAR", '{': "LB", '}': "RB",
-            '<': "LT", '>': "GT", '!': "NOT", ',': "COMMA"
-        }
-        if self.source[self.position] in single:
-            self.actual = Token(single[self.source[self.position]], self.source[self.position])
-            self.position += 1
-            return
+    def scanDigits(self, pos):
+        # caminho lento para dígitos que não casam com \d (mantém o comportamento do int())
+        source = self.source
+        end = pos
+        while end < len(source) and source[end].isdigit():
+            end += 1
+        self.actual = Token("INT", int(source[pos:end]), pos)
+        self.position = end
 
-        if self.source[self.position] == '"':
-            self.position += 1
-            val = ""
-            while self.position < len(self.source) and self.source[self.position] != '"':
-                val += self.source[self.position]
-                self.position += 1
-            if self.position == len(self.source):
-                raise Exception("String malformada.")
-            self.position += 1  # fecha aspas
-            self.actual = Token("STRING", val)
-            return
+class StreamTokenizer(Tokenizer):
+    # Tokenizer sobre um stream de texto (modo stream): self.source guarda só uma
+    # janela do fonte, lida em blocos, que começa no deslocamento self.base. Um
+    # token que encosta no fim da janela pode continuar no próximo bloco, então
+    # a janela cresce e ele é lido de novo. Os tokens guardam o deslocamento
+    # absoluto no fonte
+    CHUNK = 1 << 16
 
-        if self.source[self.position].isdigit():
-            num = ""
-            while self.position < len(self.source) and self.source[self.position].isdigit():
-                num += self.source[self.position]
-                self.position += 1
-            self.actual = Token("INT", int(num))
-            return
+    def __init__(self, stream):
+        self.stream = stream
+        self.base = 0
+        self.eof = False
+        super().__init__("")
 
-        if self.source[self.position].isalpha() or self.source[self.position] == '_':
-            ident = ""
-            while (self.position < len(self.source) and
-                   (self.source[self.position].isalnum() or self.source[self.position] == '_')):
-                ident += self.source[self.position]
-                self.position += 1
-            self.actual = Token("IDEN", ident)
-            return
+    def fill(self, need):
+        # descarta o que já foi consumido e lê até ter need caracteres à frente
+        parts = [self.source[self.position:]]
+        size = len(parts[0])
+        self.base += self.position
+        self.position = 0
+        while size < need:
+            chunk = self.stream.read(max(self.CHUNK, need - size))
+            if not chunk:
+                self.eof = True
+                break
+            parts.append(chunk)
+            size += len(chunk)
+        self.source = "".join(parts)
+
+    def selectNext(self):
+        need = self.CHUNK
+        while True:
+            if not self.eof and len(self.source) - self.position < need:
+                self.fill(need)
+            start = self.position
+            try:
+                Tokenizer.selectNext(self)
+            except Exception:
+                # o erro pode ser do corte: string sem o '"' de fechamento ou
+                # símbolo de dois caracteres pela metade ('&' de '&&')
+                pos = SKIP_RE.match(self.source, start).end()
+                if self.eof or not (self.source.startswith('"', pos)
+                                    or pos >= len(self.source) - 1):
+                    raise
+            else:
+                if self.eof or self.position < len(self.source):
+                    self.actual.pos += self.base
+                    return
+            self.position = start
+            need *= 2
 
-        raise Exception(f"Caractere inválido: {self.source[self.position]}")
+# operadores binários: tipo do token -> (operador, precedência); todos associam
+# à esquerda. Os marcadores de '(' e de chamada na pilha do parser têm
+# precedência menor que qualquer operador, então as reduções param neles
+BINARY_OPS = {
+    "T_OR": ("||", 1),
+    "T_AND": ("&&", 2),
+    "LT": ("<", 3), "GT": (">", 3), "T_EQ": ("==", 3),
+    "PLUS": ("+", 4), "MINUS": ("-", 4),
+    "MULT": ("*", 5), "DIV": ("/", 5),
+}
+UNARY_OPS = {"PLUS": "+", "MINUS": "-", "NOT": "!"}
+UNARY = 6
+OPEN_PAREN = 0
+OPEN_CALL = -1
+OPEN_INDEX = -2
 
 class Parser:
+    # cada Parser tem o próprio tokenizer, então dá para analisar vários
+    # programas ao mesmo tempo (threads de um servidor, por exemplo).
+    # Nada aqui é recursivo: blocos aninhados ficam numa pilha explícita e as
+    # expressões são montadas por precedência de operadores (shunting-yard),
+    # então a profundidade da entrada só é limitada pela memória.
+    # code é o fonte inteiro ou um stream de texto (lido aos poucos)
+    def __init__(self, code):
+        self.tokenizer = Tokenizer(code) if isinstance(code, str) else StreamTokenizer(code)
+
     @staticmethod
     def run(code):
-        tokenizer = Tokenizer(code)
-        Parser.tokenizer = tokenizer
-        res = Parser.parseProgram()
-        if Parser.tokenizer.actual.type != "EOF":
+        parser = Parser(code)
+        res = parser.parseProgram()
+        if parser.tokenizer.actual.type != "EOF":
             raise Exception("Erro: tokens restantes após o fim.")
         return res
 
     @staticmethod
-    def parseBlock():
-        if Parser.tokenizer.actual.type != "T_LBLOCK":
+    def mark(node, token):
+        # posição do token que abre a construção (usada pelo --profile)
+        node.pos = token.pos
+        return node
+
+    def parseProgram(self):
+        return self.parseBlock()
+
+    def statements(self):
+        # comandos do bloco do programa, um a um, cada um assim que termina de
+        # ser lido (modo stream)
+        tokenizer = self.tokenizer
+        if tokenizer.actual.type != "T_LBLOCK":
             raise Exception("Esperado '<<'")
-        Parser.tokenizer.selectNext()        # consome <<
-        stmts = []
-        while Parser.tokenizer.actual.type != "T_RBLOCK":
-            stmts.append(Parser.parseStatement())
-        Parser.tokenizer.selectNext()        # consome >>
-        return Node("BLOCK", stmts)
+        tokenizer.selectNext()             # consome <<
+        while tokenizer.actual.type != "T_RBLOCK":
+            yield self.parseStatement()
+        tokenizer.selectNext()             # consome >>
+        if tokenizer.actual.type != "EOF":
+            raise Exception("Erro: tokens restantes após o fim.")
 
-    @staticmethod
-    def parseStatement():
-        t = Parser.tokenizer.actual.type
-
-        # 1) declaração de variável: inteirao|falae|verdade_ou_farsa ID vira expr?
-        if t in ("T_INTEIRO", "T_STRING", "T_BOOL"):
-            typ = t
-            Parser.tokenizer.selectNext()  # consome o tipo
-            if Parser.tokenizer.actual.type != "IDEN":
+    def parseBlock(self):
+        blocks = []
+        result = []
+        self.openBlock(blocks, result.append)
+        self.parseNested(blocks)
+        return result[0]
+
+    def parseStatement(self):
+        # um comando completo, com os blocos que ele abrir
+        blocks = []
+        result = []
+        token = self.tokenizer.actual
+        node = self.parseStatementAt(token, blocks, result.append)
+        if node is not None:
+            return self.mark(node, token)
+        self.parseNested(blocks)
+        return result[0]
+
+    def openBlock(self, blocks, finish):
+        # empilha um bloco << … >>; finish(bloco) roda quando ele fechar
+        token = self.tokenizer.actual
+        if token.type != "T_LBLOCK":
+            raise Exception("Esperado '<<'")
+        self.tokenizer.selectNext()        # consome <<
+        blocks.append((token, [], finish))
+
+    def parseNested(self, blocks):
+        # lê comandos para o bloco do topo até a pilha esvaziar
+        tokenizer = self.tokenizer
+        while blocks:
+            stmts = blocks[-1][1]
+            token = tokenizer.actual
+            if token.type == "T_RBLOCK":
+                start, stmts, finish = blocks.pop()
+                tokenizer.selectNext()     # consome >>
+                finish(self.mark(Block(stmts), start))
+                continue
+            node = self.parseStatementAt(token, blocks, stmts.append)
+            if node is not None:
+                node.pos = token.pos
+                stmts.append(node)
+
+    def parseStatementAt(self, token, blocks, emit):
+        # devolve o comando pronto ou, nas construções com bloco, None: aí o
+        # bloco é empilhado e emit(comando) roda quando ele (ou o último deles) fechar
+        t = token.type
+        done = lambda node: emit(self.mark(node, token))
+
+        # 1) declaração de variável: inteirao|falae|verdade_ou_farsa|montao … ID vira expr?
+        if t in ("T_INTEIRO", "T_STRING", "T_BOOL", "T_ARRAY"):
+            tipo_str = self.parseType()  # consome o tipo
+            if self.tokenizer.actual.type != "IDEN":
                 raise Exception("Esperado nome de variável após o tipo")
-            name = Parser.tokenizer.actual.value
-            Parser.tokenizer.selectNext()  # consome o identificador
+            name_token = self.tokenizer.actual
+            name = name_token.value
+            self.tokenizer.selectNext()  # consome o identificador
 
             # monta nó VAR_DECL: [nome, tipo_str, (expr)?]
-            tipo_str = {"T_INTEIRO":"int", "T_STRING":"string", "T_BOOL":"bool"}[typ]
-            children = [ Node(name), Node(tipo_str) ]
-            if Parser.tokenizer.actual.type == "T_ASSIGN":
-                Parser.tokenizer.selectNext()  # consome 'vira'
-                children.append(Parser.parseBExpression())
-            return Node("VAR_DECL", children)
+            children = [ self.mark(VarRef(name), name_token), self.mark(Node(tipo_str), token) ]
+            if self.tokenizer.actual.type == "T_ASSIGN":
+                self.tokenizer.selectNext()  # consome 'vira'
+                children.append(self.parseBExpression())
+            return VarDecl(children)
 
         # 2) repete_ate_jao << bloco >> quando (cond)
         elif t == "T_REPEAT":
-            Parser.tokenizer.selectNext()          # consome 'repete_ate_jao'
-            body = Parser.parseBlock()             # lê << … >>
-            if Parser.tokenizer.actual.type != "T_WHEN":
-                raise Exception("Esperado 'quando' após bloco do 'repete_ate_jao'")
-            Parser.tokenizer.selectNext()          # consome 'quando'
-            cond = Parser.parseBExpression()
-            return Node("REPEAT", [body, cond])
+            self.tokenizer.selectNext()          # consome 'repete_ate_jao'
+            def repeat(body):
+                if self.tokenizer.actual.type != "T_WHEN":
+                    raise Exception("Esperado 'quando' após bloco do 'repete_ate_jao'")
+                self.tokenizer.selectNext()      # consome 'quando'
+                done(Repeat(body, self.parseBExpression()))
+            self.openBlock(blocks, repeat)
 
         # 3) se_liga_jao cond << … >> [se_nao_jao << … >>]
         elif t == "T_IF":
-            Parser.tokenizer.selectNext()          # consome 'se_liga_jao'
-            cond = Parser.parseBExpression()
-            then_blk = Parser.parseBlock()
-            if Parser.tokenizer.actual.type == "T_ELSE":
-                Parser.tokenizer.selectNext()      # consome 'se_nao_jao'
-                else_blk = Parser.parseBlock()
-                return Node("IF", [cond, then_blk, else_blk])
-            return Node("IF", [cond, then_blk])
+            self.tokenizer.selectNext()          # consome 'se_liga_jao'
+            cond = self.parseBExpression()
+            def then(then_blk):
+                if self.tokenizer.actual.type == "T_ELSE":
+                    self.tokenizer.selectNext()  # consome 'se_nao_jao'
+                    self.openBlock(blocks, lambda else_blk: done(If(cond, then_blk, else_blk)))
+                else:
+                    done(If(cond, then_blk))
+            self.openBlock(blocks, then)
 
         # 4) vai_rodando_ae cond << … >>
         elif t == "T_FOR":
-            Parser.tokenizer.selectNext()          # consome 'vai_rodando_ae'
-            cond = Parser.parseBExpression()
-            blk = Parser.parseBlock()
-            return Node("FOR", [cond, blk])
+            self.tokenizer.selectNext()          # consome 'vai_rodando_ae'
+            cond = self.parseBExpression()
+            self.openBlock(blocks, lambda blk: done(While(cond, blk)))
 
         # 5) mostra_ae(expr)
         elif t == "T_PRINT":
-            Parser.tokenizer.selectNext()          # consome 'mostra_ae'
-            if Parser.tokenizer.actual.type != "LPAR":
+            self.tokenizer.selectNext()          # consome 'mostra_ae'
+            if self.tokenizer.actual.type != "LPAR":
                 raise Exception("Esperado '(' após 'mostra_ae'")
-            Parser.tokenizer.selectNext()
-            expr = Parser.parseBExpression()
-            if Parser.tokenizer.actual.type != "RPAR":
+            self.tokenizer.selectNext()
+            expr = self.parseBExpression()
+            if self.tokenizer.actual.type != "RPAR":
                 raise Exception("Esperado ')' após expressão de print")
-            Parser.tokenizer.selectNext()
-            return Node("PRINT", [expr])
+            self.tokenizer.selectNext()
+            return Print(expr)
 
-        # 6) identificador: atribuição (vira) ou chamada de função
+        # 6) identificador: atribuição (vira), no montão (nome[i] vira) ou chamada de função
         elif t == "IDEN":
-            name = Parser.tokenizer.actual.value
-            Parser.tokenizer.selectNext()
+            name = token.value
+            self.tokenizer.selectNext()
             # chamada de função: nome(arg, …)
-            if Parser.tokenizer.actual.type == "LPAR":
-                Parser.tokenizer.selectNext()
+            if self.tokenizer.actual.type == "LPAR":
+                self.tokenizer.selectNext()
                 args = []
-                if Parser.tokenizer.actual.type != "RPAR":
-                    args.append(Parser.parseBExpression())
-                    while Parser.tokenizer.actual.type == "COMMA":
-                        Parser.tokenizer.selectNext()
-                        args.append(Parser.parseBExpression())
-                if Parser.tokenizer.actual.type != "RPAR":
+                if self.tokenizer.actual.type != "RPAR":
+                    args.append(self.parseBExpression())
+                    while self.tokenizer.actual.type == "COMMA":
+                        self.tokenizer.selectNext()
+                        args.append(self.parseBExpression())
+                if self.tokenizer.actual.type != "RPAR":
                     raise Exception("Esperado ')' na chamada de função")
-                Parser.tokenizer.selectNext()
+                self.tokenizer.selectNext()
+                if name in BUILTINS:
+                    raise Exception(f"'{name}' devolve um valor: use numa expressão")
                 return FuncCall(name, args)
             # atribuição: nome vira expr
-            if Parser.tokenizer.actual.type == "T_ASSIGN":
-                Parser.tokenizer.selectNext()
-                return Node("ASSIGN", [Node(name), Parser.parseBExpression()])
+            if self.tokenizer.actual.type == "T_ASSIGN":
+                self.tokenizer.selectNext()
+                return Assign(self.mark(VarRef(name), token), self.parseBExpression())
+            # elemento do montão: nome[i] vira expr
+            if self.tokenizer.actual.type == "LBRACKET":
+                self.tokenizer.selectNext()
+                index = self.parseBExpression()
+                if self.tokenizer.actual.type != "RBRACKET":
+                    raise Exception("Esperado ']'")
+                self.tokenizer.selectNext()
+                if self.tokenizer.actual.type != "T_ASSIGN":
+                    raise Exception("Esperado 'vira' após o índice")
+                self.tokenizer.selectNext()
+                return IndexAssign(self.mark(VarRef(name), token), index, self.parseBExpression())
             raise Exception("Esperado 'vira' ou chamada de função após identificador")
 
         # 7) bloco aninhado: << … >>
         elif t == "T_LBLOCK":
-            return Parser.parseBlock()
+            self.openBlock(blocks, done)
+
+        # 8) faz_ae nome(param tipo, …) [tipo] << … >>
+        elif t == "T_FUNC":
+            name, params, return_type = self.parseFuncHeader()
+            self.openBlock(blocks, lambda body: done(FuncDec(name, params, return_type, body)))
+
+        # 9) devolve_ae expr
+        elif t == "T_RETURN":
+            self.tokenizer.selectNext()          # consome 'devolve_ae'
+            return Return(self.parseBExpression())
+
+        # 10) lembra_ae faz_ae …: função com cache dos resultados
+        elif t == "T_MEMO":
+            self.tokenizer.selectNext()          # consome 'lembra_ae'
+            if self.tokenizer.actual.type != "T_FUNC":
+                raise Exception("Esperado 'faz_ae' após 'lembra_ae'")
+            name, params, return_type = self.parseFuncHeader()
+            def memo(body):
+                func = FuncDec(name, params, return_type, body)
+                func.memo = MEMO_SIZE
+                done(func)
+            self.openBlock(blocks, memo)
 
         else:
             raise Exception(f"Token inesperado na instrução: {t}")
+        return None
 
-    @staticmethod
-    def parseBExpression():
-        node = Parser.parseBTerm()
-        while Parser.tokenizer.actual.type == "T_OR":
-            Parser.tokenizer.selectNext()
-            node = BinOp("||", [node, Parser.parseBTerm()])
-        return node
+    def parseBExpression(self):
+        # shunting-yard: operands guarda os operandos à esquerda de cada operador
+        # em ops, que também guarda unários e os marcadores de '(' e de chamada
+        # (com a lista de argumentos já lidos)
+        tokenizer = self.tokenizer
+        operands = []
+        ops = []
+        while True:
+            # 1) zero ou mais unários, depois a base
+            token = tokenizer.actual
+            while token.type in UNARY_OPS:
+                ops.append((UNARY, UNARY_OPS[token.type], token))
+                tokenizer.selectNext()
+                token = tokenizer.actual
 
-    @staticmethod
-    def parseBTerm():
-        node = Parser.parseRelExpression()
-        while Parser.tokenizer.actual.type == "T_AND":
-            Parser.tokenizer.selectNext()
-            node = BinOp("&&", [node, Parser.parseRelExpression()])
-        return node
+            t = token.type
+            if t == "INT":
+                node = IntVal(token.value)
+                tokenizer.selectNext()
+            elif t == "STRING":
+                node = StringVal(token.value)
+                tokenizer.selectNext()
+            elif t in ("T_TRUE", "T_FALSE"):
+                node = BoolVal(token.value)
+                tokenizer.selectNext()
+            elif t == "LPAR":
+                ops.append((OPEN_PAREN, None, token))
+                tokenizer.selectNext()
+                continue
+            elif t == "T_SCAN":
+                tokenizer.selectNext()        # consome escuta_ae_jao
+                if tokenizer.actual.type != "LPAR":
+                    raise Exception("Esperado '(' após escuta_ae_jao")
+                tokenizer.selectNext()
+                if tokenizer.actual.type != "RPAR":
+                    raise Exception("Esperado ')' após escuta_ae_jao(")
+                tokenizer.selectNext()
+                # consome também o token seguinte (comportamento histórico: daí o
+                # "escuta_ae_jao() 0" nos programas)
+                tokenizer.selectNext()
+                node = Scan()
+            elif t == "IDEN":
+                tokenizer.selectNext()
+                if tokenizer.actual.type == "LPAR":
+                    # chamada de função: os argumentos são lidos como subexpressões
+                    tokenizer.selectNext()
+                    if tokenizer.actual.type != "RPAR":
+                        ops.append((OPEN_CALL, [], token))
+                        continue
+                    tokenizer.selectNext()
+                    node = self.call(token.value, [])
+                else:
+                    node = VarRef(token.value)
+            else:
+                raise Exception(f"Token inesperado no fator: {t}")
+            node.pos = token.pos
 
-    @staticmethod
-    def parseRelExpression():
-        node = Parser.parseExpression()
-        while Parser.tokenizer.actual.type in ("LT", "GT", "T_EQ"):
-            op = Parser.tokenizer.actual.type
-            Parser.tokenizer.selectNext()
-            right = Parser.parseExpression()
-            op_map = {"LT":"<", "GT":">", "T_EQ":"=="}
-            node = BinOp(op_map[op], [node, right])
-        return node
+            # 2) operando pronto: indexa (v[i] liga mais forte que os unários),
+            # aplica os unários e decide pelo token seguinte
+            while True:
+                if tokenizer.actual.type == "LBRACKET":
+                    ops.append((OPEN_INDEX, [node], tokenizer.actual))
+                    tokenizer.selectNext()
+                    break                     # lê o índice
+                while ops and ops[-1][0] == UNARY:
+                    _, op, start = ops.pop()
+                    node = self.mark(UnOp(op, [node]), start)
 
-    @staticmethod
-    def parseExpression():
-        node = Parser.parseTerm()
-        while Parser.tokenizer.actual.type in ("PLUS", "MINUS"):
-            op = Parser.tokenizer.actual.type
-            Parser.tokenizer.selectNext()
-            node = BinOp("+" if op == "PLUS" else "-", [node, Parser.parseTerm()])
-        return node
+                token = tokenizer.actual
+                binary = BINARY_OPS.get(token.type)
+                if binary is not None:
+                    op, prec = binary
+                    while ops and ops[-1][0] >= prec:
+                        _, left_op, start = ops.pop()
+                        node = self.mark(BinOp(left_op, [operands.pop(), node]), start)
+                    operands.append(node)
+                    ops.append((prec, op, token))
+                    tokenizer.selectNext()
+                    break                     # próximo operando
 
-    @staticmethod
-    def parseTerm():
-        node = Parser.parseFactor()
-        while Parser.tokenizer.actual.type in ("MULT", "DIV"):
-            op = Parser.tokenizer.actual.type
-            Parser.tokenizer.selectNext()
-            node = BinOp("*" if op == "MULT" else "/", [node, Parser.parseFactor()])
-        return node
+                # fim de subexpressão: fecha os operadores até o marcador mais interno
+                while ops and ops[-1][0] > OPEN_PAREN:
+                    _, left_op, start = ops.pop()
+                    node = self.mark(BinOp(left_op, [operands.pop(), node]), start)
+                if not ops:
+                    return node               # o token atual fica para quem chamou
 
-    @staticmethod
-    def parseFactor():
-        # 1) consome zero ou mais unários
-        unaries = []
-        while Parser.tokenizer.actual.type in ("PLUS","MINUS","NOT"):
-            unaries.append(Parser.tokenizer.actual.type)
-            Parser.tokenizer.selectNext()
-
-        # 2) parsing base
-        token = Parser.tokenizer.actual
-        if token.type == "INT":
-            node = IntVal(token.value)
-        elif token.type == "STRING":
-            node = StringVal(token.value)
-        elif token.type in ("T_TRUE","T_FALSE"):
-            node = BoolVal(token.value)
-        elif token.type == "LPAR":
-            Parser.tokenizer.selectNext()
-            node = Parser.parseBExpression()
-            if Parser.tokenizer.actual.type != "RPAR":
-                raise Exception("Esperado ')'")
-            Parser.tokenizer.selectNext()  # consome ')'
-            # importante: já sai aqui, não faz selectNext de novo depois
-        elif token.type == "T_SCAN":
-            Parser.tokenizer.selectNext()        # consome escuta_ae_jao
-            if Parser.tokenizer.actual.type != "LPAR":
-                raise Exception("Esperado '(' após escuta_ae_jao")
-            Parser.tokenizer.selectNext()
-            if Parser.tokenizer.actual.type != "RPAR":
-                raise Exception("Esperado ')' após escuta_ae_jao(")
-            Parser.tokenizer.selectNext()
-            node = Node("SCAN", [])
-        elif token.type == "IDEN":
-            name = token.value
-            Parser.tokenizer.selectNext()
-            if Parser.tokenizer.actual.type == "LPAR":
-                # chamada de função
-                Parser.tokenizer.selectNext()
-                args = []
-                if Parser.tokenizer.actual.type != "RPAR":
-                    args.append(Parser.parseBExpression())
-                    while Parser.tokenizer.actual.type == "COMMA":
-                        Parser.tokenizer.selectNext()
-                        args.append(Parser.parseBExpression())
-                if Parser.tokenizer.actual.type != "RPAR":
+                kind, args, start = ops[-1]
+                if kind == OPEN_PAREN:
+                    if token.type != "RPAR":
+                        raise Exception("Esperado ')'")
+                    ops.pop()
+                    tokenizer.selectNext()    # consome ')'
+                    continue
+                args.append(node)
+                if kind == OPEN_INDEX:
+                    # v[i] ou v[início:fim]
+                    if token.type == "COLON" and len(args) == 2:
+                        tokenizer.selectNext()
+                        break                 # lê o fim da fatia
+                    if token.type != "RBRACKET":
+                        raise Exception("Esperado ']'")
+                    ops.pop()
+                    tokenizer.selectNext()    # consome ']'
+                    node = self.mark(Index(*args) if len(args) == 2 else Slice(*args), start)
+                    continue
+                if token.type == "COMMA":
+                    tokenizer.selectNext()
+                    break                     # próximo argumento
+                if token.type != "RPAR":
                     raise Exception("Esperado ')' na chamada de função")
-                Parser.tokenizer.selectNext()
-                node = FuncCall(name, args)
-            else:
-                node = Node(name)
-        else:
-            raise Exception(f"Token inesperado no fator: {token.type}")
-
-        # 3) só avança se ainda não fez isso acima (evita pular token extra)
-        if token.type not in ("LPAR", "SCAN", "IDEN"):
-            Parser.tokenizer.selectNext()
-
-        # 4) aninha unários
-        for u in reversed(unaries):
-            if u == "NOT":
-                node = UnOp("!", [node])
-            elif u == "MINUS":
-                node = UnOp("-", [node])
-            elif u == "PLUS":
-                node = UnOp("+", [node])
-        return node
+                ops.pop()
+                tokenizer.selectNext()        # consome ')'
+                node = self.mark(self.call(start.value, args), start)
 
-    
-    @staticmethod
-    def parseProgram():
-        return Parser.parseBlock()
-    
     @staticmethod
-    def parseFuncDeclaration():
-        Parser.tokenizer.selectNext()  # consome 'func'
+    def call(name, args):
+        # chamada numa expressão; os nomes de BUILTINS são as funções embutidas
+        if name in BUILTINS:
+            require_numpy()
+            return Builtin(name, args)
+        return FuncCall(name, args)
+
+    def parseType(self):
+        # consome um tipo (inteirao, falae, verdade_ou_farsa, montao inteirao ou
+        # montao verdade_ou_farsa) e devolve o nome dele; None se não há tipo aqui
+        tokenizer = self.tokenizer
+        if tokenizer.actual.type == "T_ARRAY":
+            require_numpy()
+            tokenizer.selectNext()           # consome 'montao'
+            element = TYPE_TOKENS.get(tokenizer.actual.type)
+            if element is None or element + "[]" not in ARRAY_TYPES:
+                raise Exception("Esperado inteirao ou verdade_ou_farsa após 'montao'")
+            tokenizer.selectNext()
+            return element + "[]"
+        typ = TYPE_TOKENS.get(tokenizer.actual.type)
+        if typ is not None:
+            tokenizer.selectNext()
+        return typ
+
+    def parseFuncHeader(self):
+        # faz_ae nome(param tipo, …) [tipo]; o corpo é lido por quem chamou
+        self.tokenizer.selectNext()  # consome 'faz_ae'
 
-        if Parser.tokenizer.actual.type != "IDEN":
+        if self.tokenizer.actual.type != "IDEN":
             raise Exception("Esperado nome da função")
-        name = Parser.tokenizer.actual.value
-        Parser.tokenizer.selectNext()
+        name = self.tokenizer.actual.value
+        if name in BUILTINS:
+            raise Exception(f"'{name}' é uma função embutida")
+        self.tokenizer.selectNext()
 
-        if Parser.tokenizer.actual.type != "LPAR":
+        if self.tokenizer.actual.type != "LPAR":
             raise Exception("Esperado '(' após nome da função")
-        Parser.tokenizer.selectNext()
+        self.tokenizer.selectNext()
 
         params = []
-        while Parser.tokenizer.actual.type != "RPAR":
-            if Parser.tokenizer.actual.type != "IDEN":
+        while self.tokenizer.actual.type != "RPAR":
+            if self.tokenizer.actual.type != "IDEN":
                 raise Exception("Esperado nome do parâmetro")
-            pname = Parser.tokenizer.actual.value
-            Parser.tokenizer.selectNext()
+            pname = self.tokenizer.actual.value
+            self.tokenizer.selectNext()
 
-            if Parser.tokenizer.actual.type != "IDEN":
+            ptype = self.parseType()
+            if ptype is None:
                 raise Exception("Esperado tipo do parâmetro")
-            ptype = Parser.tokenizer.actual.value
-            Parser.tokenizer.selectNext()
 
             params.append((pname, ptype))
 
-            if Parser.tokenizer.actual.type == "COMMA":
-                Parser.tokenizer.selectNext()
-            elif Parser.tokenizer.actual.type != "RPAR":
+            if self.tokenizer.actual.type == "COMMA":
+                self.tokenizer.selectNext()
+            elif self.tokenizer.actual.type != "RPAR":
                 raise Exception("Esperado ',' ou ')'")
 
-        Parser.tokenizer.selectNext()  # consome ')'
+        self.tokenizer.selectNext()  # consome ')'
+
+        return name, params, self.parseType() or "void"
+
+
+
+# classifica um nó pelo tipo de construção
+NODE_KINDS = {
+    IntVal: "INT", BoolVal: "BOOL", StringVal: "STRING",
+    BinOp: "BINOP", UnOp: "UNOP", Return: "RETURN", NoOp: "NOOP",
+    FuncDec: "FUNC_DEC", FuncCall: "FUNC_CALL",
+    Block: "BLOCK", Print: "PRINT", Assign: "ASSIGN", Append: "ASSIGN", VarDecl: "VAR_DECL",
+    If: "IF", While: "FOR", CountedLoop: "FOR", Repeat: "REPEAT", Scan: "SCAN", VarRef: "VAR",
+    Index: "INDEX", Slice: "SLICE", IndexAssign: "INDEX_ASSIGN", Builtin: "BUILTIN",
+    Shared: "SHARED", Cached: "CACHED", Hoist: "HOIST",
+}
 
-        if Parser.tokenizer.actual.type == "IDEN":
-            return_type = Parser.tokenizer.actual.value
-            Parser.tokenizer.selectNext()
+def node_kind(node):
+    return NODE_KINDS.get(type(node), "UNKNOWN")
+
+def can_return(node):
+    # só um RETURN (em qualquer profundidade, inclusive em laços) devolve valor
+    # para o bloco; o de uma chamada usada como comando é descartado
+    stack = [node]
+    while stack:
+        node = stack.pop()
+        kind = node_kind(node)
+        if kind == "RETURN":
+            return True
+        if kind in ("BLOCK", "IF", "FOR", "REPEAT"):
+            stack.extend(node.children)
+    return False
+
+def walk(visit, root, leave=None):
+    # percorre a AST sem recursão do Python. visit(nó) devolve o resultado do
+    # nó ou um gerador que pede cada filho com "resultado = yield filho" (e
+    # devolve o do nó no return); leave(nó, resultado), se dado, roda quando um
+    # nó termina e pode trocar o resultado. A pilha de geradores é explícita,
+    # então a profundidade da AST só é limitada pela memória
+    stack = []
+    push = stack.append
+    pop = stack.pop
+    node = root
+    while True:
+        value = visit(node)
+        if type(value) is GeneratorType:
+            gen = value
+            value = None
         else:
-            return_type = "void"
+            if leave is not None:
+                value = leave(node, value)
+            if not stack:
+                return value
+            gen, node = pop()
+        # retoma o gerador do pai com o resultado até ele pedir outro filho; se
+        # ele terminar, o resultado dele sobe para o avô, e assim por diante
+        while True:
+            try:
+                child = gen.send(value)
+            except StopIteration as stop:
+                value = stop.value
+                if leave is not None:
+                    value = leave(node, value)
+                if not stack:
+                    return value
+                gen, node = pop()
+            else:
+                push((gen, node))
+                node = child
+                break
 
-        body = Parser.parseBlock()
+def nesting(ast):
+    # profundidade da AST (só a raiz = 1)
+    deepest = 0
+    stack = [(ast, 1)]
+    while stack:
+        node, depth = stack.pop()
+        if depth > deepest:
+            deepest = depth
+        depth += 1
+        stack.extend((child, depth) for child in node.children)
+    return deepest
 
-        return FuncDec(name, params, return_type, body)
+def declares_functions(node):
+    stack = [node]
+    while stack:
+        node = stack.pop()
+        if type(node) is FuncDec:
+            return True
+        stack.extend(node.children)
+    return False
 
 
+# nomes dos tipos da JaoLang a partir do valor Python cru
+TYPE_NAMES = {bool: "bool", int: "int", str: "string"}
 
-def main():
-    if len(sys.argv) != 2: sys.exit(1)
-    source = open(sys.argv[1], encoding='utf-8').read()
-    ast = Parser.run(source)
-    st = SymbolTable()
-    ast.Evaluate(st)
+def type_of(val):
+    try:
+        return TYPE_NAMES[type(val)]
+    except KeyError:
+        return "bool[]" if val.dtype == bool else "int[]"   # montão (numpy.ndarray)
+
+
+# marca de slot ainda não declarado num frame
+UNSET = object()
+
+class Scope:
+    # escopo léxico em tempo de análise; os slots vêm do frame da função
+    # (ou do programa) que o contém
+    def __init__(self, parent, layout, cond_base, loop_base):
+        self.parent = parent
+        self.layout = layout          # [próximo slot livre, tamanho do frame]
+        self.cond_base = cond_base
+        self.loop_base = loop_base
+        self.names = {}               # nome -> [slot, tipo, definitiva, func]
+        self.start = layout[0]
+        self.end = layout[0]
+
+class Resolver:
+    # resolve cada identificador para candidatos (profundidade, slot): profundidade
+    # conta frames de função para cima, slot é o índice no frame (o 0 guarda o frame pai).
+    # Blocos aninhados não ganham frame próprio, só uma faixa de slots que é
+    # zerada ao sair. Mais de um candidato só aparece quando a declaração mais
+    # interna é condicional (dentro de se_liga_jao ou de laço)
+    def __init__(self):
+        self.errors = []
+        self.scope = None
+        self.cond_depth = 0
+        self.loop_depth = 0
+
+    def run(self, ast):
+        layout = [1, 1]
+        self.scope = Scope(None, layout, 0, 0)
+        walk(self.resolve, ast)
+        self.scope = None
+        ast.frame_size = layout[1]
+        return self.errors
+
+    def resolve(self, node):
+        # cada resolve_* é um gerador que pede os filhos ao walk com yield
+        method = getattr(self, "resolve_" + node_kind(node), None)
+        if method is not None:
+            return method(node)
+        return self.resolve_children(node) if node.children else None
+
+    def resolve_children(self, node):
+        for child in node.children:
+            yield child
+
+    def open_scope(self, layout=None):
+        if layout is None:
+            layout = self.scope.layout
+        self.scope = Scope(self.scope, layout, self.cond_depth, self.loop_depth)
+        return self.scope
+
+    def close_scope(self):
+        scope = self.scope
+        scope.layout[0] = scope.start   # irmãos reaproveitam os mesmos slots
+        self.scope = scope.parent
+        return scope
+
+    def entry(self, name, typ, definite, func):
+        scope = self.scope
+        old = scope.names.get(name)
+        if old is None:
+            layout = scope.layout
+            slot = layout[0]
+            layout[0] += 1
+            layout[1] = max(layout[1], layout[0])
+            scope.end = max(scope.end, layout[0])
+            scope.names[name] = [slot, typ, definite, func]
+            return slot, None
+        if old[1] != typ:
+            old[1] = None
+        old[2] = old[2] or definite
+        if func is not None:
+            old[3] = func
+        return old[0], old
+
+    def declare(self, node, name, typ, func=None):
+        scope = self.scope
+        definite = self.cond_depth == scope.cond_base
+        had = scope.names.get(name)
+        if had is not None and had[2] and definite:
+            self.errors.append(f"Variável ou função '{name}' já declarada.")
+        # slot garantidamente vazio: primeira declaração do nome no escopo, fora de laço
+        node.fresh = had is None and self.loop_depth == scope.loop_base
+        node.slot, _ = self.entry(name, typ, definite, func)
+
+    def lookup(self, name):
+        # candidatos do mais interno para fora, até achar uma declaração definitiva
+        candidates = []
+        scope = self.scope
+        depth = 0
+        while scope is not None:
+            entry = scope.names.get(name)
+            if entry is not None:
+                slot, typ, definite, func = entry
+                candidates.append((depth, slot, typ, definite, func))
+                if definite:
+                    break
+            if scope.parent is not None and scope.parent.layout is not scope.layout:
+                depth += 1
+            scope = scope.parent
+        return tuple(candidates)
+
+    def predeclare(self, node):
+        # da segunda volta em diante, um laço já enxerga o que o próprio corpo
+        # declarou no escopo atual; registra essas declarações como condicionais
+        # (na ordem do fonte, que decide os slots)
+        stack = [node]
+        while stack:
+            node = stack.pop()
+            kind = node_kind(node)
+            if kind == "VAR_DECL":
+                self.entry(node.children[0].value, node.children[1].value, False, None)
+            elif kind == "FUNC_DEC":
+                self.entry(node.name, node.return_type, False, node)
+            elif kind in ("BLOCK", "IF", "FOR", "REPEAT"):
+                stack.extend(child for child in reversed(node.children)
+                             if kind != "BLOCK" or node_kind(child) != "BLOCK")
+
+    def hoist_functions(self, node):
+        # as funções do bloco valem desde o começo dele, para uma chamar a outra
+        # declarada mais abaixo (recursão mútua). Entram como declarações
+        # condicionais, como no predeclare: até o faz_ae rodar a chamada cai no
+        # mesmo erro de execução de uma função declarada num se_liga_jao que não
+        # rodou. Nomes declarados mais de uma vez no escopo ficam de fora, para
+        # o declare acusar a repetição como sempre
+        counts = {}
+        stack = [node]
+        while stack:
+            item = stack.pop()
+            kind = node_kind(item)
+            if kind == "VAR_DECL":
+                name = item.children[0].value
+                counts[name] = counts.get(name, 0) + 1
+            elif kind == "FUNC_DEC":
+                counts[item.name] = counts.get(item.name, 0) + 1
+            elif kind in ("BLOCK", "IF", "FOR", "REPEAT"):
+                stack.extend(child for child in item.children
+                             if kind != "BLOCK" or node_kind(child) != "BLOCK")
+        for child in node.children:
+            if (node_kind(child) == "FUNC_DEC" and counts[child.name] == 1
+                    and child.name not in self.scope.names):
+                self.entry(child.name, child.return_type, False, child)
+
+    def resolve_body(self, node, loop=False):
+        self.cond_depth += 1
+        self.loop_depth += loop
+        yield node
+        self.loop_depth -= loop
+        self.cond_depth -= 1
+
+    def resolve_VAR(self, node):
+        node.binding = self.lookup(node.value)
+        if not node.binding:
+            self.errors.append(f"Variável ou função '{node.value}' não encontrada.")
+
+    def resolve_BLOCK(self, node):
+        self.hoist_functions(node)
+        for child in node.children:
+            if node_kind(child) == "BLOCK":
+                self.open_scope()
+                yield child
+                scope = self.close_scope()
+                child.scope_slots = (scope.start, scope.end)
+            else:
+                yield child
+
+    def resolve_ASSIGN(self, node):
+        yield node.children[1]
+        name = node.children[0].value
+        node.binding = self.lookup(name)
+        if not node.binding:
+            self.errors.append(f"Variável '{name}' não declarada.")
+
+    def resolve_VAR_DECL(self, node):
+        if len(node.children) == 3:
+            yield node.children[2]
+        self.declare(node, node.children[0].value, node.children[1].value)
+
+    def resolve_IF(self, node):
+        yield node.children[0]
+        for branch in node.children[1:]:
+            yield from self.resolve_body(branch)
+
+    def resolve_FOR(self, node):
+        self.predeclare(node.children[1])
+        yield node.children[0]
+        yield from self.resolve_body(node.children[1], loop=True)
+
+    def resolve_REPEAT(self, node):
+        self.predeclare(node.children[0])
+        # o corpo roda pelo menos uma vez, então suas declarações valem na condição
+        self.loop_depth += 1
+        yield node.children[0]
+        self.loop_depth -= 1
+        yield node.children[1]
+
+    def resolve_FUNC_DEC(self, node):
+        self.declare(node, node.name, node.return_type, node)
+        layout = [1, 1]
+        self.open_scope(layout)
+        for pname, ptype in node.params:
+            self.entry(pname, ptype, True, None)
+        yield node.children[0]
+        self.close_scope()
+        node.frame_size = layout[1]
+
+    def resolve_FUNC_CALL(self, node):
+        for child in node.children:
+            yield child
+        if node.name == "Println":
+            return
+        node.binding = self.lookup(node.name)
+        if not node.binding:
+            self.errors.append(f"Variável ou função '{node.name}' não encontrada.")
+        elif len(node.binding) == 1 and node.binding[0][3] and node.binding[0][4] is not None:
+            node.target = node.binding[0][4]
+            node.hops = self.hops(node.name)
+
+    def hops(self, name):
+        # quantos escopos acima do atual o nome foi declarado. O tree-walker cria
+        # uma tabela de símbolos por bloco aninhado e uma por chamada, como os
+        # Scope daqui, então a conta vale também para as tabelas
+        scope = self.scope
+        count = 0
+        while name not in scope.names:
+            scope = scope.parent
+            count += 1
+        return count
+
+
+class TypeChecker:
+    # análise de tipos depois do Resolver: resolve o tipo estático de cada
+    # expressão (node.static_type) e junta todos os erros antes de executar.
+    # None como tipo significa "só se sabe em tempo de execução" (ex.: escuta_ae_jao)
+    def __init__(self):
+        self.errors = []
+        self.functions = []   # pilha das funções sendo checadas (FuncDec)
+
+    def run(self, ast):
+        walk(self.check, ast, self.typed)
+        return self.errors
+
+    def error(self, msg):
+        self.errors.append(msg)
+
+    def check(self, node):
+        # os check_* de nós com filhos são geradores: pedem o tipo de cada
+        # filho ao walk com yield
+        return getattr(self, "check_" + node_kind(node))(node)
+
+    @staticmethod
+    def typed(node, typ):
+        node.static_type = typ
+        return typ
+
+    def binding_type(self, node):
+        types = {candidate[2] for candidate in node.binding}
+        return types.pop() if len(types) == 1 else None
+
+    def check_cond(self, node, construct):
+        typ = yield node
+        if typ is not None and typ != "bool":
+            self.error(f"Condicional do {construct} precisa ser bool.")
+
+    def check_children(self, node):
+        for child in node.children:
+            yield child
+        return None
+
+    def check_INT(self, node):
+        return "int"
+
+    def check_BOOL(self, node):
+        return "bool"
+
+    def check_STRING(self, node):
+        return "string"
+
+    def check_SCAN(self, node):
+        return None
+
+    def check_NOOP(self, node):
+        return None
+
+    check_UNKNOWN = check_NOOP
+    check_PRINT = check_children
+
+    def check_BLOCK(self, node):
+        for child in node.children:
+            if node_kind(child) == "FUNC_CALL":
+                # chamada usada como comando: o valor (ou a falta dele) é descartado
+                yield from self.check_call(child)
+                child.static_type = None
+            else:
+                yield child
+        return None
+
+    def check_VAR(self, node):
+        return self.binding_type(node)
+    def check_BINOP(self, node):
+        ltype = yield node.children[0]
+        rtype = yield node.children[1]
+        op = node.value
+        known = ltype is not None and rtype is not None
+
+        if vectorized(op, ltype, rtype):
+            return self.check_vectorized(op, ltype, rtype)
+
+        if op == "+":
+            if ltype == "string" or rtype == "string":
+                return "string"
+            if ltype == rtype == "int":
+                return "int"
+            if known:
+                self.error("Operação '+' inválida para tipos diferentes.")
+            return None
+
+        if op in ("-", "*", "/"):
+            if ltype not in (None, "int") or rtype not in (None, "int"):
+                self.error(f"Operação '{op}' requer inteiros.")
+            return "int"
+
+        if op in ("<", ">"):
+            if "bool" in (ltype, rtype) or (known and ltype != rtype):
+                self.error(f"Operação '{op}' requer inteiros ou strings.")
+            return "bool"
+
+        if op == "==":
+            if known and ltype != rtype:
+                self.error(f"Não é possível comparar '{ltype}' com '{rtype}'.")
+            return "bool"
+
+        if op in ("&&", "||"):
+            if ltype not in (None, "bool") or rtype not in (None, "bool"):
+                self.error(f"Operação '{op}' requer booleanos.")
+            return "bool"
+
+        self.error(f"Operador desconhecido: {op}")
+        return None
+
+    def check_vectorized(self, op, ltype, rtype):
+        # montão com montão ou escalar. Com um lado desconhecido, '+' pode ser
+        # concatenação; os outros operadores só servem se ele for do mesmo tipo
+        if ltype is None or rtype is None:
+            if op == "+":
+                return None
+            ltype = rtype = ltype or rtype
+        typ = array_op_type(op, ltype, rtype)
+        if typ is None:
+            self.error(f"Operação '{op}' inválida entre '{ltype}' e '{rtype}'.")
+        return typ
+
+    def check_UNOP(self, node):
+        typ = yield node.children[0]
+        if typ in ARRAY_TYPES:
+            if (node.value, typ) not in (("-", "int[]"), ("!", "bool[]"), ("+", "int[]"), ("+", "bool[]")):
+                self.error(f"Unário '{node.value}' inválido em '{typ}'.")
+            return typ
+        if node.value == "-":
+            if typ not in (None, "int"):
+                self.error("Unário '-' só em int.")
+            return "int"
+        if node.value == "!":
+            if typ not in (None, "bool"):
+                self.error("Unário '!' só em bool.")
+            return "bool"
+        return typ
+
+    def check_RETURN(self, node):
+        typ = yield node.children[0]
+        if not self.functions:
+            self.error("'devolve_ae' fora de função.")
+            return typ
+        func = self.functions[-1]
+        if func.return_type == "void":
+            self.error(f"Função '{func.name}' é void — não pode retornar valor.")
+        elif typ is not None and typ != func.return_type:
+            self.error(f"Retorno de '{func.name}' incompatível ({typ} ≠ {func.return_type})")
+        node.tail = self.is_tail_call(node.children[0], func)
+        return typ
+
+    def is_tail_call(self, call, func):
+        # "devolve_ae g(...)" dispensa o frame de quem chama quando toda função
+        # que g pode ser devolve o mesmo tipo: o retorno de g já passa pela
+        # checagem de g, e a de quem chama fica garantida aqui. Funções
+        # lembra_ae ficam de fora: o resultado delas precisa passar pelo cache
+        if node_kind(call) != "FUNC_CALL" or call.name == "Println" or not call.binding:
+            return False
+        return all(candidate[4] is not None and candidate[4].return_type == func.return_type
+                   and not candidate[4].memo for candidate in call.binding)
+
+
+    def check_ASSIGN(self, node):
+        val_type = yield node.children[1]
+        if any(func is not None for _, _, _, _, func in node.binding):
+            # o tipo guardado de uma função é o do retorno; atribuir a ela
+            # trocaria a função por um valor
+            self.error(f"'{node.children[0].value}' é uma função.")
+            return None
+        typ = self.binding_type(node)
+        if node.binding and typ is not None and val_type is not None and typ != val_type:
+            self.error(f"Tipo incompatível: '{val_type}' != '{typ}'")
+        return None
+
+    def check_VAR_DECL(self, node):
+        if len(node.children) == 3:
+            val_type = yield node.children[2]
+            if val_type is not None and val_type != node.children[1].value:
+                self.error("Tipo da atribuição incompatível com declaração.")
+        return None
+
+    def check_IF(self, node):
+        yield from self.check_cond(node.children[0], "IF")
+        for branch in node.children[1:]:
+            yield branch
+        return None
+
+    def check_FOR(self, node):
+        yield from self.check_cond(node.children[0], "FOR")
+        yield node.children[1]
+        return None
+
+    def check_REPEAT(self, node):
+        yield node.children[0]
+        yield from self.check_cond(node.children[1], "REPEAT")
+        return None
+
+    def check_FUNC_DEC(self, node):
+        self.functions.append(node)
+        yield node.children[0]
+        self.functions.pop()
+        return None
+
+    def check_FUNC_CALL(self, node):
+        typ = yield from self.check_call(node)
+        if typ == "void":
+            self.error(f"Função '{node.name}' é void e não devolve valor.")
+            return None
+        return typ
+
+    def check_array(self, typ):
+        if typ not in ARRAY_TYPES:
+            self.error("Indexação requer montao.")
+
+    def check_position(self, typ):
+        if typ not in (None, "int"):
+            self.error("Índice de montao precisa ser int.")
+
+    def check_INDEX(self, node):
+        typ = yield node.children[0]
+        self.check_array(typ)
+        self.check_position((yield node.children[1]))
+        return ARRAY_TYPES.get(typ)
+
+    def check_SLICE(self, node):
+        typ = yield node.children[0]
+        self.check_array(typ)
+        self.check_position((yield node.children[1]))
+        self.check_position((yield node.children[2]))
+        return typ if typ in ARRAY_TYPES else None
+
+    def check_INDEX_ASSIGN(self, node):
+        typ = yield node.children[0]
+        self.check_array(typ)
+        self.check_position((yield node.children[1]))
+        val_type = yield node.children[2]
+        element = ARRAY_TYPES.get(typ)
+        if element is not None and val_type is not None and val_type != element:
+            self.error(f"Tipo incompatível: '{val_type}' != '{element}'")
+        return None
+
+    def check_BUILTIN(self, node):
+        arg_types = []
+        for arg in node.children:
+            arg_types.append((yield arg))
+        signatures = BUILTINS[node.value][1]
+        if None not in arg_types:
+            typ = signatures.get(tuple(arg_types))
+            if typ is None:
+                self.error(f"Argumentos inválidos para '{node.value}': ({', '.join(arg_types)}).")
+            return typ
+        # algum argumento desconhecido: o tipo sai se todas as assinaturas que
+        # ainda servem devolvem o mesmo
+        results = {typ for types, typ in signatures.items() if len(types) == len(arg_types)
+                   and all(arg is None or arg == want for arg, want in zip(arg_types, types))}
+        if not results:
+            self.error(f"Argumentos inválidos para '{node.value}'.")
+        return results.pop() if len(results) == 1 else None
+
+    def check_call(self, node):
+        # tipo devolvido pela chamada ("void" incluído) ou None se desconhecido
+        arg_types = []
+        for arg in node.children:
+            arg_types.append((yield arg))
+        if node.name == "Println":
+            return "void"
+        if not node.binding:
+            return None
+
+        func = node.binding[0][4]
+        if func is None:
+            self.error(f"'{node.name}' não é uma função.")
+            return None
+        if len(func.params) != len(arg_types):
+            self.error("Número incorreto de argumentos.")
+            return None
+        for (pname, ptype), arg_type in zip(func.params, arg_types):
+            if arg_type is not None and arg_type != ptype:
+                self.error(f"Tipo incompatível em argumento '{pname}': esperado {ptype}, recebido {arg_type}")
+        # parâmetros repetidos dão erro só na execução (declare do segundo)
+        names = [pname for pname, _ in func.params]
+        node.typed = (node.target is func and len(set(names)) == len(names)
+                      and all(arg_type == ptype for (_, ptype), arg_type in zip(func.params, arg_types)))
+        return func.return_type
+
+
+class PurityChecker:
+    # lembra_ae só vale para funções puras, cujo resultado depende só dos
+    # argumentos: sem mostra_ae/Println/escuta_ae_jao, sem ler nem escrever
+    # variáveis de fora da função e sem chamar funções impuras. Usa os
+    # bindings do Resolver
+    def __init__(self):
+        self.reasons = {}     # FuncDec -> motivo da impureza (None se pura)
+        self.visiting = set()
+
+    def check(self, func):
+        # erros de uma função marcada com lembra_ae
+        if func.return_type == "void":
+            return [f"Função '{func.name}' não pode ser lembra_ae: é void."]
+        if any(typ in ARRAY_TYPES for typ in [func.return_type] + [ptype for _, ptype in func.params]):
+            # montões mudam no lugar: não servem de chave nem de resultado guardado
+            return [f"Função '{func.name}' não pode ser lembra_ae: usa montao."]
+        reason = self.reason(func)
+        if reason is not None:
+            return [f"Função '{func.name}' não pode ser lembra_ae: {reason}."]
+        return []
+
+    def reason(self, func):
+        if func in self.reasons:
+            return self.reasons[func]
+        if func in self.visiting:
+            return None   # recursão: a chamada a si mesma não decide nada
+        self.visiting.add(func)
+        reason = self.walk(func.children[0])
+        self.visiting.discard(func)
+        self.reasons[func] = reason
+        return reason
+
+    def walk(self, body):
+        # level: quantas funções aninhadas há entre o nó e a função analisada;
+        # binding com profundidade maior que isso aponta para fora dela
+        stack = [(body, 0)]
+        while stack:
+            node, level = stack.pop()
+            kind = node_kind(node)
+            if kind == "PRINT":
+                return "usa mostra_ae"
+            if kind == "SCAN":
+                return "usa escuta_ae_jao"
+            if kind == "FUNC_CALL" and node.name == "Println":
+                return "usa Println"
+            for depth, _, _, _, callee in getattr(node, "binding", ()):
+                if depth <= level:
+                    continue   # declarado dentro da função: o corpo já é percorrido aqui
+                if callee is not None:
+                    if kind == "FUNC_CALL" and self.reason(callee) is not None:
+                        return f"chama '{node.name}', que não é pura"
+                else:
+                    if kind == "ASSIGN":
+                        return f"escreve na variável de fora '{node.children[0].value}'"
+                    return f"lê a variável de fora '{node.value}'"
+            inner = level + 1 if kind == "FUNC_DEC" else level
+            stack.extend((child, inner) for child in node.children)
+        return None
+
+def check_memos(ast):
+    # erros de pureza de todas as funções marcadas com lembra_ae
+    checker = PurityChecker()
+    errors = []
+    stack = [ast]
+    while stack:
+        node = stack.pop()
+        if type(node) is FuncDec and node.memo:
+            errors += checker.check(node)
+        stack.extend(node.children)
+    return errors
+
+def analyze(ast):
+    # passes semânticos que rodam antes de qualquer motor
+    errors = Resolver().run(ast) + TypeChecker().run(ast)
+    if not errors:
+        errors = check_memos(ast)
+    if errors:
+        raise Exception(f"{len(errors)} erro(s) semântico(s):\n" + "\n".join(errors))
+    return ast
+
+class Analyzer:
+    # analyze() e o otimizador em partes, para o modo stream: cada comando do
+    # bloco do programa passa pelos mesmos passes assim que é lido, e o escopo
+    # do programa fica guardado no Resolver de um comando para o outro
+    def __init__(self, optimize=True, hoist=True):
+        self.resolver = Resolver()
+        self.resolver.scope = Scope(None, [1, 1], 0, 0)
+        self.checker = TypeChecker()
+        self.optimizer = Optimizer(hoist=hoist) if optimize else None
+
+    def statement(self, stmt):
+        # bloco só com o comando (ou com o que sobrou dele depois do
+        # otimizador), para rodar direto no escopo do programa
+        part = Block((stmt,))
+        walk(self.resolver.resolve, part)
+        walk(self.checker.check, part, self.checker.typed)
+        errors = self.resolver.errors + self.checker.errors
+        if not errors:
+            errors = check_memos(part)
+        if errors:
+            raise Exception(f"{len(errors)} erro(s) semântico(s):\n" + "\n".join(errors))
+        if self.optimizer is not None:
+            walk(self.optimizer.visit, part)
+            if self.optimizer.hoist:
+                self.optimizer.reuse(part, None)
+        return part
+
+def memoize(ast, names=(), size=MEMO_SIZE):
+    # --memo: marca como lembra_ae as funções com esses nomes e ajusta o tamanho
+    # do cache de todas as marcadas. Roda antes de prepare(): a análise checa a
+    # pureza delas e o otimizador não expande as chamadas no lugar
+    names = set(names)
+    found = set()
+    stack = [ast]
+    while stack:
+        node = stack.pop()
+        if type(node) is FuncDec and (node.memo or node.name in names):
+            found.add(node.name)
+            node.memo = size
+        stack.extend(node.children)
+    errors = [f"Função '{name}' não encontrada para --memo." for name in sorted(names - found)]
+    if errors:
+        raise Exception(f"{len(errors)} erro(s) semântico(s):\n" + "\n".join(errors))
+    return ast
+
+
+LITERAL_CLASSES = {"int": IntVal, "string": StringVal, "bool": BoolVal}
+LITERAL_TYPES = {IntVal: "int", StringVal: "string", BoolVal: "bool"}
+LITERAL_KINDS = ("INT", "STRING", "BOOL")
+# o que pode aparecer no corpo de uma função expandida na chamada, e até quantos nós
+INLINE_KINDS = LITERAL_KINDS + ("VAR", "BINOP", "UNOP", "BUILTIN", "INDEX", "SLICE")
+INLINE_NODES = 24
+
+def count_nodes(node):
+    count = 0
+    stack = [node]
+    while stack:
+        node = stack.pop()
+        count += 1
+        stack.extend(node.children)
+    return count
+
+class Optimizer:
+    # roda depois da análise (erros em código morto continuam sendo reportados):
+    # dobra subárvores de BinOp/UnOp só com literais usando as mesmas regras do
+    # eval_binop/eval_unop, corta ramos de IF e laços com condição constante,
+    # tira NoOps dos blocos, troca laços de contador por CountedLoop,
+    # concatenações em laço por Append e chamadas de funções pequenas pelo
+    # corpo delas (inline=False desliga só isso). O que levantaria erro
+    # (divisão por zero) fica como está, para falhar em tempo de execução como antes.
+    # No fim, reuse() tira dos laços as expressões invariantes e calcula uma
+    # vez só as subexpressões repetidas de cada comando (hoist=False desliga)
+    def __init__(self, inline=True, hoist=True):
+        self.inline = inline
+        self.hoist = hoist
+        self.temps = 0   # temporárias criadas (nomes $1, $2, ...)
+
+    def run(self, ast):
+        before = count_nodes(ast)
+        walk(self.visit, ast)
+        removed = before - count_nodes(ast)
+        if self.hoist:
+            self.reuse(ast, ast)
+        return removed
+
+    def visit(self, node):
+        # expressões devolvem o nó que as substitui; comandos, a lista de
+        # comandos que os substituem no bloco pai. Os visit_* são geradores que
+        # pedem os filhos já otimizados ao walk
+        kind = node_kind(node)
+        if kind == "NOOP":
+            return []
+        method = getattr(self, "visit_" + kind, None)
+        return node if method is None else method(node)
+
+    def visit_BINOP(self, node):
+        children = []
+        for child in node.children:
+            children.append((yield child))
+        node.children = tuple(children)
+        if all(node_kind(child) in LITERAL_KINDS for child in children):
+            return self.fold(node, node_kind(node))
+        return node
+
+    visit_UNOP = visit_BINOP
+
+    def visit_children(self, node):
+        children = []
+        for child in node.children:
+            children.append((yield child))
+        node.children = tuple(children)
+        return node
+
+    visit_INDEX = visit_SLICE = visit_BUILTIN = visit_children
+
+    def visit_FUNC_CALL(self, node):
+        yield from self.visit_children(node)
+        return self.expand(node) if self.inline else node
+
+    def visit_RETURN(self, node):
+        yield from self.visit_children(node)
+        # "devolve_ae f(...)" com f expandida deixa de ser chamada de cauda
+        node.tail = node.tail and node_kind(node.children[0]) == "FUNC_CALL"
+        return node
+
+    def visit_INDEX_ASSIGN(self, node):
+        yield from self.visit_children(node)
+        return [node]
+
+    def expand(self, call):
+        # troca a chamada pelo corpo da função quando ele é só "devolve_ae
+        # expr", com expr pequena, do tipo do retorno e sem chamadas (então a
+        # função não é recursiva) nem variáveis além dos parâmetros. A
+        # assinatura já foi conferida na análise (typed) e cada argumento entra
+        # no lugar do parâmetro: literais e variáveis quantas vezes o parâmetro
+        # aparecer; o resto só se ele aparece no máximo uma vez e o argumento
+        # não tem como falhar nem ter efeito, porque deixa de ser avaliado
+        # antes do corpo. Funções lembra_ae ficam como estão
+        func = call.target
+        if not call.typed or func.memo:
+            return call
+        body = func.children[0].children
+        if len(body) != 1 or node_kind(body[0]) != "RETURN":
+            return call
+        expr = body[0].children[0]
+        uses = self.parameter_uses(expr, func)
+        if uses is None or expr.static_type != func.return_type:
+            return call
+        args = {}
+        for (pname, _), arg in zip(func.params, call.children):
+            if not self.atom(arg) and (uses.get(pname, 0) > 1 or not self.harmless(arg)):
+                return call
+            args[pname] = arg
+        return self.substitute(expr, args)
+
+    def parameter_uses(self, expr, func):
+        # quantas vezes cada parâmetro aparece em expr; None se expr não dá para expandir
+        params = {pname for pname, _ in func.params}
+        uses = {}
+        stack = [expr]
+        size = 0
+        while stack:
+            node = stack.pop()
+            kind = node_kind(node)
+            size += 1
+            if size > INLINE_NODES or kind not in INLINE_KINDS:
+                return None
+            if kind == "VAR":
+                if node.value not in params:
+                    return None
+                uses[node.value] = uses.get(node.value, 0) + 1
+            stack.extend(node.children)
+        return uses
+
+    @staticmethod
+    def atom(node):
+        # literal ou variável sempre declarada: avaliar de novo (ou não avaliar) dá no mesmo
+        kind = node_kind(node)
+        return kind in LITERAL_KINDS or (kind == "VAR" and len(node.binding) == 1 and node.binding[0][3])
+
+    def harmless(self, node):
+        # expressão escalar sem chamadas nem leituras: não falha nem tem efeito
+        stack = [node]
+        while stack:
+            node = stack.pop()
+            kind = node_kind(node)
+            if kind in ("BINOP", "UNOP"):
+                if not self.pure(node):
+                    return False
+            elif not self.atom(node):
+                return False
+            stack.extend(node.children)
+        return True
+
+    @staticmethod
+    def pure(node):
+        # BinOp/UnOp escalar que não tem como falhar: os tipos já passaram pelo
+        # TypeChecker e a divisão só entra com divisor literal diferente de zero
+        scalar = TYPE_NAMES.values()
+        if node.static_type not in scalar or any(child.static_type not in scalar
+                                                 for child in node.children):
+            return False
+        if node.value == "/":
+            divisor = node.children[1]
+            return node_kind(divisor) == "INT" and divisor.value != 0
+        return True
+
+    def substitute(self, expr, args):
+        # cópia de expr com os argumentos no lugar dos parâmetros, dobrando as
+        # contas que ficaram só com literais
+        def visit(node):
+            if node_kind(node) == "VAR":
+                arg = args[node.value]
+                return copy.copy(arg) if self.atom(arg) else arg
+            return rebuild(node) if node.children else copy.copy(node)
+
+        def rebuild(node):
+            children = []
+            for child in node.children:
+                children.append((yield child))
+            clone = copy.copy(node)
+            clone.children = tuple(children)
+            kind = node_kind(clone)
+            if kind in ("BINOP", "UNOP") and all(node_kind(child) in LITERAL_KINDS for child in children):
+                return self.fold(clone, kind)
+            return clone
+
+        return walk(visit, expr)
+
+    def fold(self, node, kind):
+        values = [(child.value, child.static_type) for child in node.children]
+        try:
+            if kind == "BINOP":
+                (lval, ltype), (rval, rtype) = values
+                val, typ = eval_binop(node.value, lval, ltype, rval, rtype)
+            else:
+                val, typ = eval_unop(node.value, *values[0])
+        except Exception:
+            return node
+        literal = LITERAL_CLASSES[typ](val)
+        literal.static_type = typ
+        literal.pos = node.pos
+        return literal
+
+    def constant(self, node):
+        # valor de uma condição já dobrada, ou None se não for constante
+        return node.value if node_kind(node) == "BOOL" else None
+
+    def visit_BLOCK(self, node):
+        stmts = []
+        for child in node.children:
+            result = yield child
+            if type(result) is list:
+                stmts.extend(result)
+            elif node_kind(child) == "FUNC_CALL":
+                stmts.append(child)   # chamada usada como comando não é expandida
+            else:
+                stmts.append(result)
+        node.children = tuple(stmts)
+        return [node]
+
+    # os filhos são tuplas: cada visit_* monta a tupla nova com o filho otimizado
+    def visit_IF(self, node):
+        node.children = ((yield node.children[0]),) + node.children[1:]
+        for branch in node.children[1:]:
+            yield branch
+        cond = self.constant(node.children[0])
+        if cond is not None:
+            # o corpo do IF compartilha o escopo de fora, então os comandos do
+            # ramo vivo entram direto no bloco pai
+            if cond:
+                return list(node.children[1].children)
+            return list(node.children[2].children) if len(node.children) == 3 else []
+        return [node]
+
+    def visit_FOR(self, node):
+        node.children = ((yield node.children[0]),) + node.children[1:]
+        yield node.children[1]
+        if self.constant(node.children[0]) is False:
+            return []
+        loop = self.counted(node) or node
+        loop.builders = self.builders(loop)
+        return [loop]
+
+    def builders(self, loop):
+        # variáveis falae que, dentro do laço, só aparecem em "s vira s + ...":
+        # troca esses Assign por Append e devolve um Append por variável. Uma
+        # chamada (fora Println) poderia ler s, então nada feito
+        appends = {}   # nome -> [(bloco, Assign ou Append)]
+        reads = {}     # nome -> VarRefs do nome no laço
+        excluded = set()
+        stack = [(child, loop) for child in loop.children]
+        while stack:
+            node, parent = stack.pop()
+            kind = node_kind(node)
+            if kind == "FUNC_DEC" or kind == "FUNC_CALL" and node.name != "Println":
+                return ()
+            if kind == "VAR":
+                reads[node.value] = reads.get(node.value, 0) + 1
+            elif kind == "VAR_DECL":
+                excluded.add(node.children[0].value)
+            elif kind == "ASSIGN":
+                name = node.children[0].value
+                if type(node) is Append or self.pieces(node) is not None:
+                    appends.setdefault(name, []).append((parent, node))
+                else:
+                    excluded.add(name)
+                stack.append((node.children[1], node))   # o nome do alvo não é leitura
+                continue
+            stack.extend((child, node) for child in node.children)
+
+        builders = []
+        for name, found in appends.items():
+            # a única leitura de s em cada append é a do começo da concatenação
+            if name in excluded or reads.get(name) != len(found):
+                continue
+            replaced = {}
+            for block, node in found:
+                if type(node) is not Append:
+                    replaced[node] = Append(node, self.pieces(node))
+            for block in {block for block, _ in found}:
+                block.children = tuple(replaced.get(child, child) for child in block.children)
+            builders.append(replaced.get(found[0][1], found[0][1]))
+        return tuple(builders)
+
+    def pieces(self, assign):
+        # os pedaços de "s vira s + a + b" (s falae), na ordem; None se não for essa forma
+        name = assign.children[0].value
+        node = assign.children[1]
+        pieces = []
+        while node_kind(node) == "BINOP" and node.value == "+" and node.static_type == "string":
+            pieces.append(node.children[1])
+            node = node.children[0]
+        if node_kind(node) != "VAR" or node.value != name or node.static_type != "string" or not pieces:
+            return None
+        return tuple(reversed(pieces))
+
+    def counted(self, node):
+        # CountedLoop para "vai_rodando_ae i < limite << ... i vira i + passo >>"
+        # (ou i > limite com passo negativo), None se o laço não tem essa forma
+        cond, body = node.children
+        if node_kind(cond) != "BINOP" or cond.value not in ("<", ">") or not body.children:
+            return None
+        var, limit = cond.children
+        op = cond.value
+        if node_kind(var) != "VAR":
+            # "limite > i" é "i < limite"
+            var, limit = limit, var
+            op = "<" if op == ">" else ">"
+        step_stmt = body.children[-1]
+        if (node_kind(var) != "VAR" or var.static_type != "int" or limit.static_type != "int"
+                or node_kind(step_stmt) != "ASSIGN" or step_stmt.children[0].value != var.value):
+            return None
+        counter = var.value
+
+        # o que o corpo escreve (ou declara por cima) não é invariante; uma
+        # chamada pode escrever em qualquer variável de fora
+        written = {counter}
+        stack = list(body.children[:-1])
+        while stack:
+            child = stack.pop()
+            kind = node_kind(child)
+            if kind == "FUNC_DEC" or kind == "FUNC_CALL" and child.name != "Println":
+                return None
+            if kind in ("ASSIGN", "VAR_DECL"):
+                if child.children[0].value == counter:
+                    return None
+                written.add(child.children[0].value)
+            stack.extend(child.children)
+
+        step = self.affine(step_stmt.children[1], counter, written)
+        if step is None or step[0] != 1 or step[1] or (step[2] > 0) != (op == "<") or not step[2]:
+            return None
+        if not self.invariant(limit, written):
+            return None
+        return CountedLoop(node, counter, limit, step[2], self.sums(body, counter, written))
+
+    def invariant(self, node, written):
+        # expressão que dá o mesmo valor em todas as voltas do laço
+        stack = [node]
+        while stack:
+            node = stack.pop()
+            kind = node_kind(node)
+            if kind == "VAR":
+                if node.value in written:
+                    return False
+            elif kind not in ("INT", "BINOP", "UNOP") and not (kind == "BUILTIN" and node.value == "tamanho_ae"):
+                # o tamanho de um montão não muda (v[i] vira ... só troca elementos)
+                return False
+            stack.extend(node.children)
+        return True
+
+    def sums(self, body, counter, written):
+        # corpo só de acumulações "s vira s + e" (e afim em i, s uma vez só com
+        # coeficiente 1, em qualquer posição) antes do incremento: a tupla
+        # CountedLoop.sums; senão None
+        sums = []
+        targets = set()
+        for stmt in body.children[:-1]:
+            if node_kind(stmt) != "ASSIGN" or stmt.children[1].static_type != "int":
+                return None
+            target = stmt.children[0].value
+            if target in targets:
+                return None
+            form = self.affine(stmt.children[1], counter, written - {target})
+            if form is None:
+                return None
+            per_counter, terms, const = form
+            if sum(coef for var, coef in terms if var.value == target) != 1:
+                return None
+            targets.add(target)
+            sums.append((stmt, per_counter, tuple(term for term in terms if term[0].value != target), const))
+        return tuple(sums)
+
+    def affine(self, expr, counter, written):
+        # expressão inteira como (coeficiente de i, ((VarRef, coeficiente), ...),
+        # constante), com variáveis que o corpo não escreve; None se não for afim
+        def scale(form, factor):
+            per_counter, terms, const = form
+            return per_counter * factor, tuple((var, coef * factor) for var, coef in terms), const * factor
+
+        def combine(node):
+            left = yield node.children[0]
+            right = yield node.children[1]
+            if left is None or right is None:
+                return None
+            if node.value == "*":
+                if left[0] == 0 and not left[1]:
+                    return scale(right, left[2])
+                if right[0] == 0 and not right[1]:
+                    return scale(left, right[2])
+                return None
+            if node.value == "-":
+                right = scale(right, -1)
+            return left[0] + right[0], left[1] + right[1], left[2] + right[2]
+
+        def negate(node):
+            form = yield node.children[0]
+            return None if form is None else scale(form, -1 if node.value == "-" else 1)
+
+        def visit(node):
+            kind = node_kind(node)
+            if node.static_type != "int":
+                return None
+            if kind == "INT":
+                return 0, (), node.value
+            if kind == "VAR":
+                if node.value == counter:
+                    return 1, (), 0
+                return None if node.value in written else (0, ((node, 1),), 0)
+            if kind == "UNOP" and node.value in ("-", "+"):
+                return negate(node)
+            if kind == "BINOP" and node.value in ("+", "-", "*"):
+                return combine(node)
+            return None
+
+        return walk(visit, expr)
+
+    def visit_REPEAT(self, node):
+        yield node.children[0]
+        node.children = (node.children[0], (yield node.children[1]))
+        return [node]
+
+    def visit_PRINT(self, node):
+        node.children = ((yield node.children[0]),)
+        return [node]
+
+    def visit_ASSIGN(self, node):
+        node.children = (node.children[0], (yield node.children[1]))
+        return [node]
+
+    def visit_VAR_DECL(self, node):
+        if len(node.children) == 3:
+            node.children = node.children[:2] + ((yield node.children[2]),)
+        return [node]
+
+    def visit_FUNC_DEC(self, node):
+        yield node.children[0]
+        return [node]
+
+    def reuse(self, root, owner):
+        # de fora para dentro: em cada bloco, as invariantes de cada laço vão
+        # para um Hoist logo antes dele (as dos laços de fora saem primeiro, e
+        # as de dentro já veem as delas como Cached) e cada comando compartilha
+        # as subexpressões repetidas. owner é quem tem o frame (programa ou
+        # FuncDec) onde as temporárias ganham slot; None no modo stream
+        owners = [owner]
+
+        def visit(node):
+            kind = node_kind(node)
+            if kind == "BLOCK":
+                return block(node)
+            if kind == "FUNC_DEC":
+                return function(node)
+            if kind in ("IF", "FOR", "REPEAT"):
+                return (child for child in node.children if node_kind(child) == "BLOCK")
+            return None
+
+        def block(node):
+            stmts = []
+            for child in node.children:
+                if node_kind(child) in ("FOR", "REPEAT"):
+                    hoist = self.hoist_loop(child, owners[-1])
+                    if hoist is not None:
+                        self.share(hoist, owners[-1])
+                        stmts.append(hoist)
+                self.share(child, owners[-1])
+                stmts.append(child)
+            node.children = tuple(stmts)
+            for child in stmts:
+                yield child
+
+        def function(node):
+            owners.append(node)
+            yield node.children[0]
+            owners.pop()
+
+        walk(visit, root)
+
+    def hoist_loop(self, loop, owner):
+        # Hoist com as expressões do laço que dão o mesmo valor em todas as
+        # voltas (cada uma trocada por um Cached), ou None. Só entram
+        # expressões puras (ver pure) que não leem nada que o laço escreve ou
+        # declara: calculadas antes do laço, mesmo que ele não dê nenhuma
+        # volta, não falham nem mudam nada. Uma chamada (fora Println) pode
+        # escrever em qualquer variável de fora, então nada feito
+        written = set()
+        stack = list(loop.children)
+        while stack:
+            node = stack.pop()
+            kind = node_kind(node)
+            if kind == "FUNC_DEC" or kind == "FUNC_CALL" and node.name != "Println":
+                return None
+            if kind in ("ASSIGN", "VAR_DECL"):
+                written.add(node.children[0].value)
+            stack.extend(node.children)
+
+        signatures = self.signatures(loop.children, written)
+        hoisted = {}   # número da expressão -> Shared
+        stack = [loop]
+        while stack:
+            node = stack.pop()
+            children = list(node.children)
+            for i, child in enumerate(children):
+                number, variant, _ = signatures.get(child, (None, True, 0))
+                if number is not None and not variant and self.worth(child):
+                    shared = hoisted.get(number)
+                    if shared is None:
+                        shared = hoisted[number] = self.temporary(child, owner)
+                    children[i] = Cached(shared, child.pos)
+                else:
+                    stack.append(child)
+            if hoisted:
+                node.children = tuple(children)
+        return Hoist(tuple(hoisted.values())) if hoisted else None
+
+    def share(self, stmt, owner):
+        # subexpressões puras repetidas nas expressões do comando: a primeira
+        # ocorrência (na ordem de avaliação, da esquerda para a direita) vira
+        # Shared e as outras, Cached. As maiores escolhem primeiro; o que fica
+        # dentro de uma ocorrência trocada por Cached não conta mais. Uma
+        # chamada (fora Println) entre duas ocorrências poderia mudar o valor
+        roots = self.expressions(stmt)
+        stack = list(roots)
+        while stack:
+            node = stack.pop()
+            if node_kind(node) == "FUNC_CALL" and node.name != "Println":
+                return
+            stack.extend(node.children)
+
+        signatures = self.signatures(roots, ())
+        groups = {}   # número -> ocorrências, na ordem de avaliação
+        stack = list(reversed(roots))
+        while stack:
+            node = stack.pop()
+            number, _, _ = signatures[node]
+            if number is not None and self.worth(node):
+                groups.setdefault(number, []).append(node)
+            stack.extend(reversed(node.children))
+
+        replaced = {}
+        dead = set()
+        for nodes in sorted(groups.values(), key=lambda nodes: -signatures[nodes[0]][2]):
+            live = [node for node in nodes if node not in dead]
+            if len(live) < 2:
+                continue
+            shared = replaced[live[0]] = self.temporary(live[0], owner)
+            for node in live[1:]:
+                replaced[node] = Cached(shared, node.pos)
+                stack = list(node.children)
+                while stack:
+                    inner = stack.pop()
+                    dead.add(inner)
+                    stack.extend(inner.children)
+        if not replaced:
+            return
+
+        def swap(node):
+            new = replaced.get(node, node)
+            if type(new) is not Cached:
+                pending.append(node)   # o Shared embrulha o próprio nó, que continua sendo visitado
+            return new
+
+        pending = []
+        for holder in stmt.children if type(stmt) is Hoist else (stmt,):
+            holder.children = tuple(swap(child) if child in roots else child for child in holder.children)
+        while pending:
+            node = pending.pop()
+            if node.children:
+                node.children = tuple(swap(child) for child in node.children)
+
+    @staticmethod
+    def expressions(stmt):
+        # expressões que o comando avalia toda vez que roda, na ordem. Os
+        # pedaços de um Append e o limite de um CountedLoop são avaliados por
+        # fora dos filhos, então ficam de fora
+        kind = node_kind(stmt)
+        if kind in ("PRINT", "INDEX_ASSIGN", "RETURN"):
+            return stmt.children
+        if kind == "HOIST":
+            return tuple(shared.children[0] for shared in stmt.children)
+        if kind == "FUNC_CALL":
+            return stmt.children if stmt.name == "Println" else ()
+        if kind == "ASSIGN":
+            return () if type(stmt) is Append else stmt.children[1:]
+        if kind == "VAR_DECL":
+            return stmt.children[2:]
+        if kind in ("IF", "FOR"):
+            return () if type(stmt) is CountedLoop else stmt.children[:1]
+        if kind == "REPEAT":
+            return stmt.children[1:]
+        return ()
+
+    def signatures(self, roots, written):
+        # para cada nó avaliado a partir de roots: (número, lê algo de written,
+        # tamanho). Expressões puras iguais ganham o mesmo número; None para o
+        # que não dá para reaproveitar. Variáveis são comparadas pelo nome, o
+        # que vale dentro de um comando e, num laço, para o que ele não declara
+        numbers = {}
+        found = {}
+
+        def visit(node):
+            kind = node_kind(node)
+            if kind in LITERAL_KINDS:
+                return record(node, (kind, node.value), False, 1)
+            if kind == "VAR":
+                key = ("VAR", node.value) if self.atom(node) else None
+                return record(node, key, node.value in written, 1)
+            if kind == "CACHED":
+                return record(node, ("CACHED", node.key), False, 1)
+            return combine(node, kind)
+
+        def combine(node, kind):
+            results = []
+            # o nome no Assign/VarDecl (e o tipo no VarDecl) não é avaliado
+            start = {"ASSIGN": 1, "VAR_DECL": 2}.get(kind, 0)
+            for child in node.children[start:]:
+                results.append((yield child))
+            key = None
+            if (kind in ("BINOP", "UNOP") and self.pure(node)
+                    and all(number is not None for number, _, _ in results)):
+                key = (kind, node.value) + tuple(number for number, _, _ in results)
+            return record(node, key, any(variant for _, variant, _ in results),
+                          1 + sum(size for _, _, size in results))
+
+        def record(node, key, variant, size):
+            number = None if key is None else numbers.setdefault(key, len(numbers))
+            found[node] = number, variant, size
+            return found[node]
+
+        for root in roots:
+            walk(visit, root)
+        return found
+
+    @staticmethod
+    def worth(node):
+        # conta com pelo menos um operador sobre outra conta ou duas folhas
+        kind = node_kind(node)
+        return kind == "BINOP" or kind == "UNOP" and bool(node.children[0].children)
+
+    def temporary(self, expr, owner):
+        # Shared de expr com um nome novo e, se há frame, um slot novo no fim dele
+        slot = None
+        if owner is not None:
+            slot = owner.frame_size
+            owner.frame_size += 1
+        self.temps += 1
+        return Shared(expr, f"${self.temps}", slot)
+
+def prepare(ast, optimize=True, hoist=True):
+    # análise + otimização; devolve quantos nós o otimizador removeu
+    analyze(ast)
+    return Optimizer(hoist=hoist).run(ast) if optimize else 0
+
+
+class StackEvaluator:
+    # motor "stack": a semântica do tree-walker (SymbolTable, mesmas mensagens de
+    # erro, TailCall), mas sem recursão do Python. Cada nó em andamento é um
+    # gerador numa pilha explícita que pede o valor de cada filho com
+    # "valor = yield filho, escopo"; folhas (literais, variáveis, escuta_ae_jao)
+    # usam o Evaluate direto. Profundidade da AST e recursão da JaoLang só são
+    # limitadas pela memória. execute() usa este motor quando a AST é funda
+    # demais para o motor pedido
+    def __init__(self, output=None, input_source=None, memos=None):
+        self.output = output or OUTPUT
+        self.input_source = input_source or INPUT
+        self.memos = memos
+        self.classes = {BinOp: self.eval_BINOP, UnOp: self.eval_UNOP,
+                        Return: self.eval_RETURN, FuncCall: self.eval_FUNC_CALL,
+                        Block: self.eval_BLOCK, Print: self.eval_PRINT,
+                        Assign: self.eval_ASSIGN, Append: self.eval_APPEND,
+                        VarDecl: self.eval_VAR_DECL, If: self.eval_IF,
+                        While: self.eval_FOR, CountedLoop: self.eval_COUNTED,
+                        Repeat: self.eval_REPEAT, Index: self.eval_APPLY,
+                        Slice: self.eval_APPLY, IndexAssign: self.eval_APPLY,
+                        Builtin: self.eval_APPLY, Shared: self.eval_SHARED,
+                        Hoist: self.eval_HOIST}
+
+    def run(self, ast):
+        st = SymbolTable(output=self.output, input_source=self.input_source, memos=self.memos)
+        return self.evaluate(ast, st)
+
+    def evaluate(self, node, env):
+        classes = self.classes
+        stack = []
+        push = stack.append
+        pop = stack.pop
+        gen = self.eval_root(node, env)
+        value = None
+        while True:
+            # retoma o gerador do nó atual com o valor do último filho
+            try:
+                node, env = gen.send(value)
+            except StopIteration as stop:
+                value = stop.value
+                if not stack:
+                    return value
+                gen = pop()
+                continue
+            # folhas são avaliadas aqui mesmo, sem gerador
+            cls = type(node)
+            if cls is VarRef:
+                val, typ, _ = env.get(node.value)
+                value = val, typ
+                continue
+            typ = LITERAL_TYPES.get(cls)
+            if typ is not None:
+                value = node.value, typ
+                continue
+            handler = classes.get(cls)
+            if handler is None:
+                value = node.Evaluate(env)   # Scan, FuncDec, NoOp
+                continue
+            push(gen)
+            gen = handler(node, env)
+            value = None
+
+    def eval_root(self, node, st):
+        return (yield node, st)
+
+    def eval_BLOCK(self, node, st):
+        for child in node.children:
+            res = yield child, (SymbolTable(st) if type(child) is Block else st)
+            if res is not None and type(child) is not FuncCall:
+                return res
+        return None
+
+    def eval_PRINT(self, node, st):
+        val, typ = yield node.children[0], st
+        if typ == "bool":
+            st.output.line("true" if val else "false")
+        else:
+            st.output.line(to_str(val, typ))
+        return None
+
+    def eval_ASSIGN(self, node, st):
+        val, typ = yield node.children[1], st
+        st.set(node.children[0].value, val, typ)
+        return None
+
+    def eval_APPEND(self, node, st):
+        # Append.Evaluate com os pedaços pela pilha
+        entry = st.entry(node.children[0].value)
+        if entry is None or type(entry[0]) is not list:
+            return (yield from self.eval_ASSIGN(node, st))
+        texts = []
+        for piece in node.pieces:
+            val, typ = yield piece, st
+            texts.append(to_str(val, typ))
+        entry[0].extend(texts)
+        return None
+
+    def eval_VAR_DECL(self, node, st):
+        varName = node.children[0].value
+        varType = node.children[1].value
+        if len(node.children) == 3:
+            val, valType = yield node.children[2], st
+            if varType != valType:
+                raise Exception("Tipo da atribuição incompatível com declaração.")
+            st.declare(varName, varType, val)
+        else:
+            default = DEFAULTS[varType]
+            st.declare(varName, varType, default)
+        return None
+
+    def eval_IF(self, node, st):
+        cond, typ = yield node.children[0], st
+        if typ != "bool":
+            raise Exception("Condicional do IF precisa ser bool.")
+        if cond:
+            return (yield node.children[1], st)
+        elif len(node.children) == 3:
+            return (yield node.children[2], st)
+        return None
+
+    def eval_FOR(self, node, st):
+        return (yield from self.build_strings(node, st, self.iterate(node, st)))
+
+    def eval_COUNTED(self, node, st):
+        return (yield from self.build_strings(node, st, self.counted(node, st)))
+
+    def build_strings(self, node, st, loop):
+        # build_strings do tree (ver Append), com o laço rodando pela pilha
+        cells = []
+        for append in node.builders:
+            entry = st.entry(append.children[0].value)
+            if entry is not None and type(entry[0]) is str:
+                entry[0] = [entry[0]]
+                cells.append(entry)
+        try:
+            return (yield from loop)
+        finally:
+            for entry in cells:
+                entry[0] = "".join(entry[0])
+
+    def iterate(self, node, st):
+        cond_node, body = node.children
+        while True:
+            cond, typ = yield cond_node, st
+            if typ != "bool":
+                raise Exception("Condicional do FOR precisa ser bool.")
+            if not cond:
+                break
+            res = yield body, st
+            if res is not None:
+                return res
+        return None
+
+    def counted(self, node, st):
+        # CountedLoop.counted com os comandos do corpo pela pilha; a forma
+        # fechada (sums) não tem voltas e roda direto
+        counter = st.entry(node.counter)
+        if counter is None or node.sums is not None:
+            if node.sums is not None:
+                return node.counted(st)
+            return (yield from self.iterate(node, st))
+        start = counter[0]
+        limit, _ = yield node.limit, st
+        values = range(start, limit, node.step)
+        stmts = node.children[1].children[:-1]
+        for value in values:
+            counter[0] = value
+            for stmt in stmts:
+                res = yield stmt, (SymbolTable(st) if type(stmt) is Block else st)
+                if res is not None and type(stmt) is not FuncCall:
+                    return res
+        counter[0] = start + len(values) * node.step
+        return None
+
+    def eval_REPEAT(self, node, st):
+        block, cond_node = node.children
+        while True:
+            res = yield block, st
+            if res is not None:
+                return res
+            c, t = yield cond_node, st
+            if t != "bool":
+                raise Exception("Condicional do REPEAT precisa ser bool.")
+            if not c:
+                break
+        return None
+
+    def eval_BINOP(self, node, st):
+        lval, ltype = yield node.children[0], st
+        rval, rtype = yield node.children[1], st
+        return eval_binop(node.value, lval, ltype, rval, rtype)
+
+    def eval_UNOP(self, node, st):
+        val, typ = yield node.children[0], st
+        return eval_unop(node.value, val, typ)
+
+    def eval_APPLY(self, node, st):
+        # nós dos montões: os filhos pela pilha, depois o apply do nó
+        values = []
+        for child in node.children:
+            values.append((yield child, st))
+        return node.apply(values)
+
+    def eval_SHARED(self, node, st):
+        val, typ = yield node.children[0], st
+        st.table[node.key] = [val, typ, False]
+        return val, typ
+
+    def eval_HOIST(self, node, st):
+        for shared in node.children:
+            yield shared, st
+        return None
+
+    def eval_RETURN(self, node, st):
+        if node.tail:
+            call = node.children[0]
+            func_node, env = call.callee(st)
+            local = yield from self.enter(func_node, env, call, st)
+            return TailCall(call.name, func_node, local)
+        return (yield node.children[0], st)
+
+    def eval_FUNC_CALL(self, node, st):
+        if node.name == "Println":
+            for arg in node.children:
+                val, typ = yield arg, st
+                st.output.line("true" if typ == "bool" else to_str(val, typ))
+            return None
+
+        func_node, env = node.callee(st)
+        local = yield from self.enter(func_node, env, node, st)
+        if not func_node.memo:
+            return (yield from self.call(node.name, func_node, local))
+        cache = memo_for(local.memos, func_node)
+        key = func_node.memo_key(local)
+        result = cache.get(key)
+        if result is not None:
+            func_node.leave(local)
+            return result
+        result = yield from self.call(node.name, func_node, local)
+        cache.put(key, result)
+        return result
+
+    def enter(self, func_node, env, call, st):
+        # FuncDec.enter (ou enter_typed) com os argumentos avaliados pela pilha
+        arg_nodes = call.children
+        local = func_node.scope(env, len(arg_nodes), st)
+        typed = call.typed and func_node is call.target
+        for (pname, ptype), arg_expr in zip(func_node.params, arg_nodes):
+            arg_val, arg_type = yield arg_expr, st
+            if typed:
+                local.table[pname] = [arg_val, ptype, False]
+            else:
+                func_node.bind(local, pname, ptype, arg_val, arg_type)
+        return local
+
+    def call(self, name, func_node, local):
+        # trampolim do FuncDec.call
+        while True:
+            result = yield func_node.children[0], local
+            func_node.leave(local)
+            if type(result) is not TailCall:
+                return func_node.check_result(name, result)
+            name, func_node, local = result.name, result.func, result.frame
+
+
+class AsyncOutput(OutputSink):
+    # saída do modo assíncrono: mostra_ae/Println só juntam as linhas (line()
+    # não pode esperar); o AsyncEvaluator as escreve no writer e espera o
+    # drain() nas pausas, antes de ler a entrada e no fim. writer é um
+    # asyncio.StreamWriter (ou algo com write(bytes) e drain()); None = sys.stdout
+    def __init__(self, writer=None, max_lines=8192):
+        super().__init__(None, max_lines)
+        self.writer = writer
+
+    def line(self, text):
+        self.lines.append(text)
+
+    def flush(self):
+        if self.writer is None:
+            super().flush()
+        elif self.lines:
+            self.writer.write(("\n".join(self.lines) + "\n").encode())
+            self.lines = []
+
+    async def drain(self):
+        self.flush()
+        if self.writer is not None:
+            await self.writer.drain()
+
+
+ASYNC_SLICE = 1000
+STEPPED_CLASSES = (Scan, While, CountedLoop, Repeat)
+
+def stepped_nodes(ast):
+    # ids dos nós que o AsyncEvaluator avança passo a passo: os que leem a
+    # entrada ou têm laço ou chamada de função (podem demorar, então precisam
+    # das pausas) e os fundos demais para o Evaluate recursivo. O resto roda
+    # direto com o Evaluate do tree-walker
+    stepped = set()
+    limit = DEPTH_LIMITS["tree"]
+
+    def visit(node):
+        slow = type(node) in STEPPED_CLASSES or (type(node) is FuncCall and node.name != "Println")
+        if type(node) is CountedLoop and node.sums is not None:
+            slow = False   # forma fechada: não tem voltas
+        if not node.children:
+            if slow:
+                stepped.add(id(node))
+            return slow, 1
+        return children(node, slow)
+
+    def children(node, slow):
+        height = 0
+        for child in node.children:
+            child_slow, child_height = yield child
+            slow = slow or child_slow
+            height = max(height, child_height)
+        height += 1
+        if slow or height > limit:
+            stepped.add(id(node))
+            slow = True
+        return slow, height
+
+    walk(visit, ast)
+    return stepped
+
+
+class AsyncEvaluator(StackEvaluator):
+    # motor do modo assíncrono: os mesmos geradores do StackEvaluator, mas o
+    # laço que os move é uma corrotina. escuta_ae_jao espera uma linha do
+    # reader (asyncio.StreamReader ou algo com readline() awaitable; None =
+    # entrada vazia) e, a cada slice_steps passos, a execução devolve o controle
+    # ao event loop, então laços longos não travam as outras sessões. Só laços,
+    # chamadas e leituras andam pelos geradores (ver stepped_nodes); cada volta
+    # de laço é pelo menos um passo
+    def __init__(self, reader=None, writer=None, memos=None, slice_steps=ASYNC_SLICE):
+        super().__init__(AsyncOutput(writer), InputSource(lines=()), memos)
+        self.reader = reader
+        self.slice_steps = slice_steps
+        self.stepped = set()
+
+    async def run(self, ast):
+        self.stepped = stepped_nodes(ast)
+        st = SymbolTable(output=self.output, input_source=self.input_source, memos=self.memos)
+        try:
+            return await self.evaluate(ast, st)
+        finally:
+            await self.output.drain()
+
+    async def scan(self):
+        # o que foi mostrado sai antes de esperar a entrada (como no InputSource)
+        await self.output.drain()
+        line = await self.reader.readline() if self.reader is not None else ""
+        if not line:
+            raise EOFError("EOF when reading a line")
+        if type(line) is bytes:
+            line = line.decode()
+        val = scan_value(line[:-1] if line.endswith("\n") else line)
+        return val, "int" if type(val) is int else "string"
+
+    async def evaluate(self, node, env):
+        # o laço do StackEvaluator.evaluate, com as esperas no meio
+        classes = self.classes
+        stepped = self.stepped
+        stack = []
+        push = stack.append
+        pop = stack.pop
+        gen = self.eval_root(node, env)
+        value = None
+        steps = 0
+        while True:
+            steps += 1
+            if steps >= self.slice_steps:
+                steps = 0
+                await self.output.drain()
+                await asyncio.sleep(0)
+            try:
+                node, env = gen.send(value)
+            except StopIteration as stop:
+                value = stop.value
+                if not stack:
+                    return value
+                gen = pop()
+                continue
+            cls = type(node)
+            if cls is VarRef:
+                val, typ, _ = env.get(node.value)
+                value = val, typ
+                continue
+            typ = LITERAL_TYPES.get(cls)
+            if typ is not None:
+                value = node.value, typ
+                continue
+            if cls is Scan:
+                value = await self.scan()
+                continue
+            handler = classes.get(cls)
+            if handler is None or id(node) not in stepped:
+                value = node.Evaluate(env)   # FuncDec, NoOp e subárvores sem espera
+                continue
+            push(gen)
+            gen = handler(node, env)
+            value = None
+
+
+def frame_up(frame, depth):
+    for _ in range(depth):
+        frame = frame[0]
+    return frame
+
+def new_frame(parent, size):
+    frame = [UNSET] * size
+    frame[0] = parent
+    return frame
+
+def check_return(name, return_type, result):
+    # mesma checagem do FuncCall.Evaluate, sobre o valor cru
+    if result is not None:
+        if return_type == "void":
+            raise Exception(f"Função '{name}' é void — não pode retornar valor.")
+        if type_of(result) != return_type:
+            raise Exception(f"Retorno de '{name}' incompatível "
+                            f"({type_of(result)} ≠ {return_type})")
+        return result
+    if return_type != "void":
+        raise Exception(f"Função '{name}' deve retornar '{return_type}'.")
+    return None
+
+class FramePool:
+    # frames de uma função que podem ser reaproveitados entre chamadas (a função
+    # não declara outras, então ninguém guarda o frame depois do retorno). A
+    # chamada pega um frame da lista, ou cria um se estiver vazia, e devolve
+    # zerado ao sair; recursão só cria frames novos até a maior profundidade
+    __slots__ = ("free", "blank")
+
+    def __init__(self, size):
+        self.free = []
+        self.blank = [None] + [UNSET] * (size - 1)
+
+    def acquire(self, parent):
+        if self.free:
+            frame = self.free.pop()
+            frame[0] = parent
+            return frame
+        return new_frame(parent, len(self.blank))
+
+    def release(self, frame):
+        frame[:] = self.blank
+        self.free.append(frame)
+
+
+class ClosureCompiler:
+    # transforma a AST (já passada pelo Resolver e pelo TypeChecker) numa árvore
+    # de closures que recebem o frame atual (lista de slots) e trabalham com
+    # valores Python crus: despacho por nó, operador, tipo e posição das variáveis
+    # acontece uma vez só, na compilação. Onde o tipo só é conhecido em tempo de
+    # execução (static_type None) a closure confere o tipo pelo valor
+    def __init__(self, output=None, input_source=None, memos=None):
+        self.bodies = {}
+        self.pools = {}   # FuncDec -> FramePool (só funções sem funções dentro)
+        self.memos = {} if memos is None else memos   # FuncDec -> MemoCache
+        self.output = output or OUTPUT
+        self.input_source = input_source or INPUT
+
+    def compile(self, node):
+        return getattr(self, "compile_" + node_kind(node))(node)
+
+    def compile_program(self, ast):
+        body = self.compile(ast)
+        size = ast.frame_size
+        return lambda: body(new_frame(None, size))
+
+    def compile_INT(self, node):
+        val = node.value
+        return lambda frame: val
+
+    compile_BOOL = compile_INT
+    compile_STRING = compile_INT
+
+    def compile_VAR(self, node):
+        # também compila o callee de uma FuncCall, que guarda o nome em name
+        name = node.name if type(node) is FuncCall else node.value
+        candidates = node.binding
+        depth, slot, _, definite, _ = candidates[0]
+        if len(candidates) == 1 and definite:
+            if depth == 0:
+                return itemgetter(slot)
+            return lambda frame: frame_up(frame, depth)[slot]
+
+        places = tuple((depth, slot) for depth, slot, _, _, _ in candidates)
+        def var(frame):
+            for depth, slot in places:
+                val = frame_up(frame, depth)[slot]
+                if val is not UNSET:
+                    return val
+            raise Exception(f"Variável ou função '{name}' não encontrada.")
+        return var
+
+    def compile_SHARED(self, node):
+        expr = self.compile(node.children[0])
+        slot = node.slot
+        def shared(frame):
+            val = frame[slot] = expr(frame)
+            return val
+        return shared
+
+    def compile_CACHED(self, node):
+        return itemgetter(node.slot)
+
+    def compile_HOIST(self, node):
+        stores = tuple((shared.slot, self.compile(shared.children[0])) for shared in node.children)
+        def hoist(frame):
+            for slot, expr in stores:
+                frame[slot] = expr(frame)
+        return hoist
+
+    def compile_NOOP(self, node):
+        return lambda frame: None
+
+    compile_UNKNOWN = compile_NOOP
+
+    def compile_RETURN(self, node):
+        if node.tail:
+            call = node.children[0]
+            enter = self.compile_enter(call)
+            name = call.name
+            def tail_call(frame):
+                func_node, local = enter(frame)
+                return TailCall(name, func_node, local)
+            return tail_call
+        return self.compile(node.children[0])
+
+    def compile_SCAN(self, node):
+        scan = self.input_source.scan
+        return lambda frame: scan()
+
+    def compile_BINOP(self, node):
+        lnode, rnode = node.children
+        left = self.compile(lnode)
+        right = self.compile(rnode)
+        op = node.value
+        ltype, rtype = lnode.static_type, rnode.static_type
+
+        # montões também: uma chamada ao NumPy por operação, o tipo pelo valor
+        if ltype is None or rtype is None or vectorized(op, ltype, rtype):
+            def dynamic(frame):
+                lval = left(frame)
+                rval = right(frame)
+                return eval_binop(op, lval, type_of(lval), rval, type_of(rval))[0]
+            return dynamic
+
+        if op == "+":
+            if ltype == rtype:
+                return lambda frame: left(frame) + right(frame)
+            lconv = STR_CONVERTERS[ltype]
+            rconv = STR_CONVERTERS[rtype]
+            return lambda frame: lconv(left(frame)) + rconv(right(frame))
+        if op == "-":
+            return lambda frame: left(frame) - right(frame)
+        if op == "*":
+            return lambda frame: left(frame) * right(frame)
+        if op == "/":
+            if node_kind(rnode) == "INT" and rnode.value != 0:
+                divisor = rnode.value
+                return lambda frame: left(frame) // divisor
+            def div(frame):
+                lval = left(frame)
+                rval = right(frame)
+                if rval == 0:
+                    raise Exception("Divisão por zero.")
+                return lval // rval
+            return div
+        if op == "<":
+            return lambda frame: left(frame) < right(frame)
+        if op == ">":
+            return lambda frame: left(frame) > right(frame)
+        if op == "==":
+            return lambda frame: left(frame) == right(frame)
+        # && e || avaliam os dois lados, como no Node.Evaluate
+        if op == "&&":
+            def and_(frame):
+                lval = left(frame)
+                rval = right(frame)
+                return lval and rval
+            return and_
+        def or_(frame):
+            lval = left(frame)
+            rval = right(frame)
+            return lval or rval
+        return or_
+
+    def compile_UNOP(self, node):
+        operand = self.compile(node.children[0])
+        op = node.value
+        if node.children[0].static_type is None or node.children[0].static_type in ARRAY_TYPES:
+            def dynamic(frame):
+                val = operand(frame)
+                return eval_unop(op, val, type_of(val))[0]
+            return dynamic
+        if op == "-":
+            return lambda frame: -operand(frame)
+        if op == "!":
+            return lambda frame: not operand(frame)
+        return operand
+
+    def compile_INDEX(self, node):
+        array, index = map(self.compile, node.children)
+        return lambda frame: array_index(array(frame), index(frame))
+
+    def compile_SLICE(self, node):
+        array, start, stop = map(self.compile, node.children)
+        return lambda frame: array_slice(array(frame), start(frame), stop(frame))
+
+    def compile_INDEX_ASSIGN(self, node):
+        array, index, expr = map(self.compile, node.children)
+        def store(frame):
+            array_store(array(frame), index(frame), expr(frame))
+        return store
+
+    def compile_BUILTIN(self, node):
+        name = node.value
+        args = tuple(map(self.compile, node.children))
+        return lambda frame: call_builtin(name, *[arg(frame) for arg in args])
+
+    def compile_BLOCK(self, node):
+        return self.compile_statements(node.children, can_return(node))
+
+    def compile_statements(self, children, returns):
+        stmts = []
+        for child in children:
+            fn = self.compile(child)
+            kind = node_kind(child)
+            if kind == "BLOCK":
+                start, end = child.scope_slots
+                if end > start:
+                    # bloco aninhado: devolve a faixa de slots dele vazia ao sair,
+                    # pronta para a próxima entrada ou para os blocos irmãos
+                    fn = self.scoped(fn, start, end)
+            elif kind == "FUNC_CALL" and returns:
+                fn = self.discarded(fn)
+            stmts.append(fn)
+        stmts = tuple(stmts)
+
+        if not returns:
+            def block(frame):
+                for stmt in stmts:
+                    stmt(frame)
+            return block
+
+        def block_with_return(frame):
+            for stmt in stmts:
+                res = stmt(frame)
+                if res is not None:
+                    return res
+            return None
+        return block_with_return
+
+    def discarded(self, call):
+        # chamada usada como comando num bloco com devolve_ae: o valor não encerra o bloco
+        def stmt(frame):
+            call(frame)
+        return stmt
+
+    def scoped(self, inner, start, end):
+        unset = [UNSET] * (end - start)
+        def scoped_block(frame):
+            res = inner(frame)
+            frame[start:end] = unset
+            return res
+        return scoped_block
+
+    def compile_PRINT(self, node):
+        expr = self.compile(node.children[0])
+        typ = node.children[0].static_type
+        line = self.output.line
+        if typ == "bool":
+            def print_bool(frame):
+                line("true" if expr(frame) else "false")
+            return print_bool
+        if typ is None or typ in ARRAY_TYPES:
+            def print_dynamic(frame):
+                val = expr(frame)
+                line(to_str(val, type_of(val)))
+            return print_dynamic
+        if typ == "string":
+            return lambda frame: line(expr(frame))
+        def print_(frame):
+            line(str(expr(frame)))
+        return print_
+
+    def compile_ASSIGN(self, node):
+        assign = self.compile_assign(node)
+        place = self.place(node) if type(node) is Append else None
+        if place is None:
+            return assign
+        depth, slot = place
+        pieces = tuple((self.compile(piece), STR_CONVERTERS.get(piece.static_type))
+                       for piece in node.pieces)
+        def text(piece, conv, frame):
+            val = piece(frame)
+            return to_str(val, type_of(val)) if conv is None else conv(val)
+        def append(frame):
+            parts = frame_up(frame, depth)[slot]
+            if type(parts) is not list:
+                return assign(frame)   # fora do laço que abriu a lista
+            parts.extend([text(piece, conv, frame) for piece, conv in pieces])
+        return append
+
+    def compile_assign(self, node):
+        name = node.children[0].value
+        expr = self.compile(node.children[1])
+        candidates = node.binding
+        depth, slot, typ, definite, _ = candidates[0]
+        if (len(candidates) == 1 and definite and depth == 0
+                and typ is not None and typ == node.children[1].static_type):
+            def assign(frame):
+                frame[slot] = expr(frame)
+            return assign
+
+        places = tuple((depth, slot) for depth, slot, _, _, _ in candidates)
+        def assign_checked(frame):
+            val = expr(frame)
+            for depth, slot in places:
+                target = frame_up(frame, depth)
+                old = target[slot]
+                if old is not UNSET:
+                    if type(old) is not type(val):
+                        raise Exception(f"Tipo incompatível: '{type_of(val)}' != '{type_of(old)}'")
+                    target[slot] = val
+                    return
+            raise Exception(f"Variável '{name}' não declarada.")
+        return assign_checked
+
+    def compile_VAR_DECL(self, node):
+        name = node.children[0].value
+        var_type = node.children[1].value
+        slot = node.slot
+        if len(node.children) == 3:
+            expr = self.compile(node.children[2])
+            dynamic = node.children[2].static_type is None
+        else:
+            default = DEFAULTS[var_type]
+            expr = lambda frame: default
+            dynamic = False
+
+        if node.fresh and not dynamic:
+            def decl(frame):
+                frame[slot] = expr(frame)
+            return decl
+
+        def decl_checked(frame):
+            val = expr(frame)
+            if dynamic and var_type != type_of(val):
+                raise Exception("Tipo da atribuição incompatível com declaração.")
+            if frame[slot] is not UNSET:
+                raise Exception(f"Variável ou função '{name}' já declarada.")
+            frame[slot] = val
+        return decl_checked
+
+    def compile_cond(self, node, construct):
+        cond = self.compile(node)
+        if node.static_type is not None:
+            return cond
+        def dynamic(frame):
+            val = cond(frame)
+            if type(val) is not bool:
+                raise Exception(f"Condicional do {construct} precisa ser bool.")
+            return val
+        return dynamic
+
+    def compile_IF(self, node):
+        cond = self.compile_cond(node.children[0], "IF")
+        then_blk = self.compile(node.children[1])
+        if len(node.children) == 3:
+            else_blk = self.compile(node.children[2])
+            return lambda frame: then_blk(frame) if cond(frame) else else_blk(frame)
+        return lambda frame: then_blk(frame) if cond(frame) else None
+
+    def compile_FOR(self, node):
+        loop = self.compile_loop(node)
+        if not node.builders:
+            return loop
+        # como no build_strings do tree: só as variáveis num slot fixo viram lista
+        places = [place for place in map(self.place, node.builders) if place is not None]
+        def build_strings(frame):
+            cells = []
+            for depth, slot in places:
+                scope = frame_up(frame, depth)
+                if type(scope[slot]) is str:
+                    scope[slot] = [scope[slot]]
+                    cells.append((scope, slot))
+            try:
+                return loop(frame)
+            finally:
+                for scope, slot in cells:
+                    scope[slot] = "".join(scope[slot])
+        return build_strings
+
+    def compile_loop(self, node):
+        if type(node) is CountedLoop:
+            counted = self.compile_counted(node)
+            if counted is not None:
+                return counted
+        cond = self.compile_cond(node.children[0], "FOR")
+        body = self.compile(node.children[1])
+        if can_return(node.children[1]):
+            # devolve_ae dentro do laço sai da função
+            def for_return(frame):
+                while cond(frame):
+                    res = body(frame)
+                    if res is not None:
+                        return res
+            return for_return
+        def for_(frame):
+            while cond(frame):
+                body(frame)
+        return for_
+
+    @staticmethod
+    def place(assign):
+        # (profundidade, slot) de quem só tem uma declaração, definitiva; senão None
+        candidates = assign.binding
+        depth, slot, _, definite, _ = candidates[0]
+        return (depth, slot) if len(candidates) == 1 and definite else None
+
+    def compile_counted(self, node):
+        # CountedLoop com o contador e os acumuladores em slots fixos; None
+        # quando não dá (o chamador compila o laço comum)
+        body = node.children[1]
+        counter = self.place(body.children[-1])
+        targets = [] if node.sums is None else [self.place(assign) for assign, _, _, _ in node.sums]
+        if counter is None or None in targets:
+            return None
+        depth, slot = counter
+        limit = self.compile(node.limit)
+        step = node.step
+
+        if node.sums is not None:
+            sums = tuple((target, per_counter, tuple((self.compile(var), coef) for var, coef in terms), const)
+                         for target, (_, per_counter, terms, const) in zip(targets, node.sums))
+            def counted_sum(frame):
+                scope = frame_up(frame, depth)
+                start = scope[slot]
+                count = len(range(start, limit(frame), step))
+                if count:
+                    total = count * start + step * (count * (count - 1) // 2)
+                    for (target_depth, target_slot), per_counter, terms, const in sums:
+                        invariant = const
+                        for var, coef in terms:
+                            invariant += coef * var(frame)
+                        frame_up(frame, target_depth)[target_slot] += per_counter * total + count * invariant
+                scope[slot] = start + count * step
+            return counted_sum
+
+        stmts = self.compile_statements(body.children[:-1], can_return(body))
+        def counted(frame):
+            scope = frame_up(frame, depth)
+            start = scope[slot]
+            values = range(start, limit(frame), step)
+            for value in values:
+                scope[slot] = value
+                res = stmts(frame)
+                if res is not None:
+                    return res
+            scope[slot] = start + len(values) * step
+        return counted
+
+    def compile_REPEAT(self, node):
+        body = self.compile(node.children[0])
+        cond = self.compile_cond(node.children[1], "REPEAT")
+        if can_return(node.children[0]):
+            def repeat_return(frame):
+                res = body(frame)
+                while res is None and cond(frame):
+                    res = body(frame)
+                return res
+            return repeat_return
+        def repeat(frame):
+            body(frame)
+            while cond(frame):
+                body(frame)
+        return repeat
+
+    def compile_FUNC_DEC(self, node):
+        # o slot guarda a função junto com o frame onde foi declarada (escopo léxico)
+        self.bodies[node] = self.compile(node.children[0])
+        if node.pooled:
+            self.pools[node] = FramePool(node.frame_size)
+        slot = node.slot
+        def func_dec(frame):
+            if frame[slot] is not UNSET:
+                raise Exception(f"Variável ou função '{node.name}' já declarada.")
+            frame[slot] = (node, frame)
+        return func_dec
+
+    def compile_enter(self, node):
+        # closure que acha a função chamada e devolve (FuncDec, frame da chamada
+        # já com os argumentos, avaliados no frame de quem chama)
+        name = node.name
+        args = tuple(self.compile(arg) for arg in node.children)
+        callee = self.compile_VAR(node)
+        pools = self.pools
+        target = node.target if node.typed else None
+        def enter(frame):
+            func = callee(frame)
+            if type(func) is not tuple:
+                raise Exception(f"'{name}' não é uma função.")
+            func_node, def_frame = func
+            if func_node is target:
+                # assinatura conferida na análise (FuncCall.typed)
+                pool = pools.get(func_node)
+                local = pool.acquire(def_frame) if pool else new_frame(def_frame, func_node.frame_size)
+                for i, arg in enumerate(args, 1):
+                    local[i] = arg(frame)
+                return func_node, local
+            if len(func_node.params) != len(args):
+                raise Exception("Número incorreto de argumentos.")
+
+            pool = pools.get(func_node)
+            local = pool.acquire(def_frame) if pool else new_frame(def_frame, func_node.frame_size)
+            for i, ((pname, ptype), arg) in enumerate(zip(func_node.params, args), 1):
+                arg_val = arg(frame)
+                arg_type = type_of(arg_val)
+                if arg_type != ptype:
+                    raise Exception(f"Tipo incompatível em argumento '{pname}': esperado {ptype}, recebido {arg_type}")
+                local[i] = arg_val
+            return func_node, local
+        return enter
+
+    def compile_FUNC_CALL(self, node):
+        name = node.name
+
+        if name == "Println":
+            # Println imprime "true" para qualquer bool (comportamento do FuncCall.Evaluate)
+            args = tuple(self.compile(arg) for arg in node.children)
+            line = self.output.line
+            def println(frame):
+                for arg in args:
+                    val = arg(frame)
+                    line("true" if type(val) is bool else dynamic_text(val))
+            return println
+
+        enter = self.compile_enter(node)
+        bodies = self.bodies
+        pools = self.pools
+        memos = self.memos
+        def run(call_name, func_node, local):
+            # trampolim: chamadas em posição de cauda voltam como TailCall
+            while True:
+                result = bodies[func_node](local)
+                pool = pools.get(func_node)
+                if pool:
+                    pool.release(local)
+                if type(result) is not TailCall:
+                    return check_return(call_name, func_node.return_type, result)
+                call_name, func_node, local = result.name, result.func, result.frame
+
+        def call(frame):
+            func_node, local = enter(frame)
+            if not func_node.memo:
+                return run(name, func_node, local)
+            # lembra_ae: a chave são os argumentos, já nos slots do frame
+            cache = memo_for(memos, func_node)
+            key = tuple(local[1:1 + len(func_node.params)])
+            result = cache.get(key)
+            if result is not None:
+                pool = pools.get(func_node)
+                if pool:
+                    pool.release(local)
+                return result
+            result = run(name, func_node, local)
+            cache.put(key, result)
+            return result
+        return call
+
+
+# opcodes da VM; cada instrução ocupa duas posições no array: (opcode, argumento)
+(LOAD_CONST, LOAD_FAST, LOAD_VAR, STORE_FAST, STORE_VAR, DECL_FAST, DECL_VAR,
+ CLEAR_SLOTS, ADD, CONCAT, SUB, MUL, DIV, LT, GT, EQ, AND, OR, NEG, NOT,
+ BINOP_DYN, UNOP_DYN, CHECK_BOOL, JUMP, JUMP_IF_FALSE, JUMP_IF_TRUE,
+ POP_JUMP_IF_NONE, POP, PRINT, PRINT_BOOL, PRINT_DYN, PRINTLN, SCAN,
+ FUNC_DEC, CALL, RETURN_VALUE, RETURN_NONE,
+ # superinstruções geradas pela fusão de sequências comuns
+ LOAD_FAST_FAST, LOAD_FAST_CONST, JUMP_IF_NOT_LT, JUMP_IF_NOT_GT, JUMP_IF_NOT_EQ,
+ ADD_STORE_FAST, JUMP_IF_LT,
+ TAIL_CALL, NATIVE, BUILD_OPEN, APPEND_FAST, BUILD_JOIN) = range(49)
+
+OPNAMES = ("LOAD_CONST", "LOAD_FAST", "LOAD_VAR", "STORE_FAST", "STORE_VAR", "DECL_FAST",
+           "DECL_VAR", "CLEAR_SLOTS", "ADD", "CONCAT", "SUB", "MUL", "DIV", "LT", "GT",
+           "EQ", "AND", "OR", "NEG", "NOT", "BINOP_DYN", "UNOP_DYN", "CHECK_BOOL", "JUMP",
+           "JUMP_IF_FALSE", "JUMP_IF_TRUE", "POP_JUMP_IF_NONE", "POP", "PRINT", "PRINT_BOOL",
+           "PRINT_DYN", "PRINTLN", "SCAN", "FUNC_DEC", "CALL", "RETURN_VALUE", "RETURN_NONE",
+           "LOAD_FAST_FAST", "LOAD_FAST_CONST", "JUMP_IF_NOT_LT", "JUMP_IF_NOT_GT",
+           "JUMP_IF_NOT_EQ", "ADD_STORE_FAST", "JUMP_IF_LT", "TAIL_CALL", "NATIVE",
+           "BUILD_OPEN", "APPEND_FAST", "BUILD_JOIN")
+
+# (instrução anterior, nova) -> superinstrução; argumentos duplos vão empacotados
+FUSIONS = {
+    (LOAD_FAST, LOAD_FAST): LOAD_FAST_FAST,
+    (LOAD_FAST, LOAD_CONST): LOAD_FAST_CONST,
+    (LT, JUMP_IF_FALSE): JUMP_IF_NOT_LT,
+    (GT, JUMP_IF_FALSE): JUMP_IF_NOT_GT,
+    (EQ, JUMP_IF_FALSE): JUMP_IF_NOT_EQ,
+    (ADD, STORE_FAST): ADD_STORE_FAST,
+    (LT, JUMP_IF_TRUE): JUMP_IF_LT,
+}
+PACKED = (LOAD_FAST_FAST, LOAD_FAST_CONST)
+ARG_BITS = 20
+ARG_MASK = (1 << ARG_BITS) - 1
+
+STATIC_BINOPS = {"-": SUB, "*": MUL, "/": DIV, "<": LT, ">": GT, "==": EQ, "&&": AND, "||": OR}
+CONSTRUCTS = ("IF", "FOR", "REPEAT")
+
+
+class Code:
+    # instruções num array de inteiros + pool de constantes (valores, nomes, infos de chamada)
+    __slots__ = ("name", "ops", "consts", "frame_size", "pooled")
+
+    def __init__(self, name, frame_size, pooled=False):
+        self.name = name
+        self.ops = array("l")
+        self.consts = []
+        self.frame_size = frame_size
+        self.pooled = pooled   # frames podem ser reaproveitados entre chamadas
+
+    def dis(self):
+        lines = []
+        ops = self.ops
+        for pc in range(0, len(ops), 2):
+            op, arg = ops[pc], ops[pc + 1]
+            if op in PACKED:
+                arg = f"{arg & ARG_MASK} {arg >> ARG_BITS}"
+            lines.append(f"{pc:>5} {OPNAMES[op]:<16} {arg}")
+        return "\n".join(lines)
+
+
+class BytecodeCompiler:
+    # gera bytecode para a VM a partir da AST já analisada (Resolver + TypeChecker)
+    def __init__(self):
+        self.code = None
+        self.const_index = None
+        self.barrier = 0  # posição alvo de salto: a instrução ali não pode ser fundida
+        self.codes = {}   # FuncDec -> Code
+        self.building = set()   # slots guardando lista de pedaços (ver Append)
+
+    def compile_program(self, ast):
+        return self.compile_code(Code("<programa>", ast.frame_size), ast)
+
+    def compile_code(self, code, body):
+        outer = self.code, self.const_index, self.barrier, self.building
+        self.code, self.const_index, self.barrier, self.building = code, {}, 0, set()
+        self.stmt(body)
+        self.emit(RETURN_NONE)
+        self.code, self.const_index, self.barrier, self.building = outer
+        return code
+
+    def emit(self, op, arg=0):
+        ops = self.code.ops
+        if len(ops) > self.barrier:
+            fused = FUSIONS.get((ops[-2], op))
+            if fused is not None:
+                if fused in PACKED:
+                    if ops[-1] > ARG_MASK or arg > ARG_MASK:
+                        fused = None
+                    else:
+                        arg = ops[-1] | (arg << ARG_BITS)
+                if fused is not None:
+                    ops[-2] = fused
+                    ops[-1] = arg
+                    return len(ops) - 1
+        ops.append(op)
+        ops.append(arg)
+        return len(ops) - 1   # posição do argumento, para remendar saltos
+
+    def const(self, value):
+        # valores simples são reaproveitados no pool; o tipo entra na chave (1 != eh_tudo)
+        key = (type(value), value) if type(value) in TYPE_NAMES else id(value)
+        index = self.const_index.get(key)
+        if index is None:
+            consts = self.code.consts
+            consts.append(value)
+            index = self.const_index[key] = len(consts) - 1
+        return index
+
+    def label(self):
+        self.barrier = len(self.code.ops)
+        return self.barrier
+
+    def patch(self, at, target=None):
+        self.code.ops[at] = self.label() if target is None else target
+
+    # -- expressões: deixam exatamente um valor na pilha --
+
+    def expr(self, node):
+        getattr(self, "expr_" + node_kind(node))(node)
+
+    def expr_INT(self, node):
+        self.emit(LOAD_CONST, self.const(node.value))
+
+    expr_BOOL = expr_INT
+    expr_STRING = expr_INT
+
+    def places(self, binding):
+        return tuple((depth, slot) for depth, slot, _, _, _ in binding)
+
+    def expr_VAR(self, node):
+        depth, slot, _, definite, _ = node.binding[0]
+        if len(node.binding) == 1 and definite and depth == 0:
+            self.emit(LOAD_FAST, slot)
+        else:
+            self.emit(LOAD_VAR, self.const((node.value, self.places(node.binding))))
+
+    def expr_SCAN(self, node):
+        self.emit(SCAN)
+
+    def expr_SHARED(self, node):
+        self.expr(node.children[0])
+        self.emit(STORE_FAST, node.slot)
+        self.emit(LOAD_FAST, node.slot)
+
+    def expr_CACHED(self, node):
+        self.emit(LOAD_FAST, node.slot)
+
+    def expr_RETURN(self, node):
+        self.expr(node.children[0])
+
+    def expr_NOOP(self, node):
+        self.emit(LOAD_CONST, self.const(None))
+
+    expr_UNKNOWN = expr_NOOP
+
+    def expr_BINOP(self, node):
+        lnode, rnode = node.children
+        self.expr(lnode)
+        self.expr(rnode)
+        ltype, rtype = lnode.static_type, rnode.static_type
+        if ltype is None or rtype is None or vectorized(node.value, ltype, rtype):
+            self.emit(BINOP_DYN, self.const(node.value))
+        elif node.value == "+":
+            if ltype == rtype:
+                self.emit(ADD)
+            else:
+                self.emit(CONCAT, self.const((STR_CONVERTERS[ltype], STR_CONVERTERS[rtype])))
+        else:
+            self.emit(STATIC_BINOPS[node.value])
+
+    def expr_UNOP(self, node):
+        self.expr(node.children[0])
+        if node.children[0].static_type is None or node.children[0].static_type in ARRAY_TYPES:
+            self.emit(UNOP_DYN, self.const(node.value))
+        elif node.value == "-":
+            self.emit(NEG)
+        elif node.value == "!":
+            self.emit(NOT)
+
+    def native(self, node, func):
+        # filhos na pilha, depois func(*filhos) no lugar deles
+        for child in node.children:
+            self.expr(child)
+        self.emit(NATIVE, self.const((func, len(node.children))))
+
+    def expr_INDEX(self, node):
+        self.native(node, array_index)
+
+    def expr_SLICE(self, node):
+        self.native(node, array_slice)
+
+    def expr_BUILTIN(self, node):
+        name = node.value
+        self.native(node, lambda *args: call_builtin(name, *args))
+
+    def expr_FUNC_CALL(self, node):
+        for arg in node.children:
+            self.expr(arg)
+        if node.name == "Println":
+            self.emit(PRINTLN, len(node.children))
+            self.emit(LOAD_CONST, self.const(None))
+        else:
+            self.emit(CALL, self.const((node.name, len(node.children), self.places(node.binding))))
+
+    # -- comandos: não deixam nada na pilha --
+
+    def stmt(self, node):
+        getattr(self, "stmt_" + node_kind(node), self.stmt_value)(node)
+
+    def stmt_value(self, node):
+        # expressão usada como comando; um valor diferente de None encerra o bloco
+        self.expr(node)
+        if can_return(node):
+            self.early_exit()
+        else:
+            self.emit(POP)
+
+    def early_exit(self):
+        # valor no topo: retorna do código (também de dentro de laços), a não ser
+        # que seja None
+        skip = self.emit(POP_JUMP_IF_NONE)
+        self.emit(RETURN_VALUE)
+        self.patch(skip)
+
+    def stmt_NOOP(self, node):
+        pass
+
+    stmt_UNKNOWN = stmt_NOOP
+
+    def stmt_BLOCK(self, node):
+        for child in node.children:
+            self.stmt(child)
+            if node_kind(child) == "BLOCK" and child.scope_slots[1] > child.scope_slots[0]:
+                self.emit(CLEAR_SLOTS, self.const(child.scope_slots))
+
+    def stmt_PRINT(self, node):
+        self.expr(node.children[0])
+        typ = node.children[0].static_type
+        self.emit(PRINT_BOOL if typ == "bool" else PRINT_DYN if typ is None or typ in ARRAY_TYPES else PRINT)
+
+    def stmt_ASSIGN(self, node):
+        depth, slot, typ, definite, _ = node.binding[0]
+        if type(node) is Append and depth == 0 and slot in self.building and len(node.binding) == 1:
+            for piece in node.pieces:
+                self.expr(piece)
+            convs = tuple(STR_CONVERTERS.get(piece.static_type) for piece in node.pieces)
+            self.emit(APPEND_FAST, self.const((slot, convs)))
+            return
+        self.expr(node.children[1])
+        if (len(node.binding) == 1 and definite and depth == 0
+                and typ is not None and typ == node.children[1].static_type):
+            self.emit(STORE_FAST, slot)
+        else:
+            self.emit(STORE_VAR, self.const((node.children[0].value, self.places(node.binding))))
+
+    def stmt_INDEX_ASSIGN(self, node):
+        self.native(node, array_store)
+        self.emit(POP)
+
+    def stmt_HOIST(self, node):
+        for shared in node.children:
+            self.expr(shared.children[0])
+            self.emit(STORE_FAST, shared.slot)
+
+    def stmt_VAR_DECL(self, node):
+        var_type = node.children[1].value
+        if len(node.children) == 3:
+            self.expr(node.children[2])
+            dynamic = node.children[2].static_type is None
+        else:
+            default = DEFAULTS[var_type]
+            self.emit(LOAD_CONST, self.const(default))
+            dynamic = False
+        if node.fresh and not dynamic:
+            self.emit(DECL_FAST, node.slot)
+        else:
+            info = (node.children[0].value, node.slot, var_type if dynamic else None)
+            self.emit(DECL_VAR, self.const(info))
+
+    def cond(self, node, construct):
+        self.expr(node)
+        if node.static_type is None:
+            self.emit(CHECK_BOOL, CONSTRUCTS.index(construct))
+
+    def stmt_IF(self, node):
+        self.cond(node.children[0], "IF")
+        to_else = self.emit(JUMP_IF_FALSE)
+        self.stmt(node.children[1])
+        if len(node.children) == 3:
+            to_end = self.emit(JUMP)
+            self.patch(to_else)
+            self.stmt(node.children[2])
+            self.patch(to_end)
+        else:
+            self.patch(to_else)
+
+    def stmt_FOR(self, node):
+        # como no build_strings do tree, para os slots do próprio frame e sem
+        # try/finally (como no PythonTranspiler): um erro encerra o programa e
+        # um devolve_ae no laço descarta o frame sem ler a variável
+        slots = []
+        for append in node.builders:
+            depth, slot, _, definite, _ = append.binding[0]
+            if len(append.binding) == 1 and definite and depth == 0 and slot not in self.building:
+                slots.append(slot)
+        for slot in slots:
+            self.emit(BUILD_OPEN, slot)
+        self.building.update(slots)
+        top = self.label()
+        self.cond(node.children[0], "FOR")
+        to_end = self.emit(JUMP_IF_FALSE)
+        self.stmt(node.children[1])
+        self.emit(JUMP, top)
+        self.patch(to_end)
+        self.building.difference_update(slots)
+        for slot in slots:
+            self.emit(BUILD_JOIN, slot)
+
+    def stmt_REPEAT(self, node):
+        top = self.label()
+        self.stmt(node.children[0])
+        self.cond(node.children[1], "REPEAT")
+        self.emit(JUMP_IF_TRUE, top)
+
+    def stmt_FUNC_DEC(self, node):
+        code = self.compile_code(Code(node.name, node.frame_size, node.pooled), node.children[0])
+        self.codes[node] = code
+        self.emit(FUNC_DEC, self.const((node, code)))
+
+    def stmt_FUNC_CALL(self, node):
+        if node.name == "Println":
+            for arg in node.children:
+                self.expr(arg)
+            self.emit(PRINTLN, len(node.children))
+        else:
+            self.stmt_value(node)
+
+    def stmt_RETURN(self, node):
+        call = node.children[0]
+        if not node.tail:
+            self.stmt_value(node)
+            return
+        # devolve_ae f(...): a VM monta o frame de f e devolve um TailCall
+        for arg in call.children:
+            self.expr(arg)
+        self.emit(TAIL_CALL, self.const((call.name, len(call.children), self.places(call.binding))))
+
+
+class VM:
+    # laço de despacho sobre o bytecode; frames são as mesmas listas de slots do
+    # motor closure (índice 0 = frame léxico pai)
+    def __init__(self, output=None, input_source=None, memos=None):
+        self.output = output or OUTPUT
+        self.input_source = input_source or INPUT
+        self.pools = {}   # Code -> FramePool (só funções sem funções dentro)
+        self.memos = {} if memos is None else memos   # FuncDec -> MemoCache
+
+    def run_program(self, code):
+        return self.run(code, new_frame(None, code.frame_size))
+
+    def run(self, code, frame):
+        ops = code.ops
+        consts = code.consts
+        line = self.output.line
+        stack = []
+        push = stack.append
+        pop = stack.pop
+        pc = 0
+        while True:
+            op = ops[pc]
+            arg = ops[pc + 1]
+            pc += 2
+
+            if op == LOAD_FAST_CONST:
+                push(frame[arg & ARG_MASK])
+                push(consts[arg >> ARG_BITS])
+            elif op == ADD_STORE_FAST:
+                rval = pop()
+                frame[arg] = pop() + rval
+            elif op == LOAD_FAST_FAST:
+                push(frame[arg & ARG_MASK])
+                push(frame[arg >> ARG_BITS])
+            elif op == JUMP_IF_NOT_LT:
+                rval = pop()
+                if not pop() < rval:
+                    pc = arg
+            elif op == JUMP_IF_LT:
+                rval = pop()
+                if pop() < rval:
+                    pc = arg
+            elif op == LOAD_FAST:
+                push(frame[arg])
+            elif op == LOAD_CONST:
+                push(consts[arg])
+            elif op == STORE_FAST:
+                frame[arg] = pop()
+            elif op == JUMP_IF_FALSE:
+                if not pop():
+                    pc = arg
+            elif op == JUMP_IF_NOT_GT:
+                rval = pop()
+                if not pop() > rval:
+                    pc = arg
+            elif op == JUMP_IF_NOT_EQ:
+                rval = pop()
+                if not pop() == rval:
+                    pc = arg
+            elif op == ADD:
+                rval = pop()
+                stack[-1] += rval
+            elif op == LT:
+                rval = pop()
+                stack[-1] = stack[-1] < rval
+            elif op == JUMP:
+                pc = arg
+            elif op == SUB:
+                rval = pop()
+                stack[-1] -= rval
+            elif op == MUL:
+                rval = pop()
+                stack[-1] *= rval
+            elif op == GT:
+                rval = pop()
+                stack[-1] = stack[-1] > rval
+            elif op == EQ:
+                rval = pop()
+                stack[-1] = stack[-1] == rval
+            elif op == JUMP_IF_TRUE:
+                if pop():
+                    pc = arg
+            elif op == DIV:
+                rval = pop()
+                if rval == 0:
+                    raise Exception("Divisão por zero.")
+                stack[-1] //= rval
+            elif op == CONCAT:
+                lconv, rconv = consts[arg]
+                rval = pop()
+                stack[-1] = lconv(stack[-1]) + rconv(rval)
+            elif op == AND:
+                rval = pop()
+                stack[-1] = stack[-1] and rval
+            elif op == OR:
+                rval = pop()
+                stack[-1] = stack[-1] or rval
+            elif op == NOT:
+                stack[-1] = not stack[-1]
+            elif op == NEG:
+                stack[-1] = -stack[-1]
+            elif op == PRINT:
+                line(str(pop()))
+            elif op == PRINT_BOOL:
+                line("true" if pop() else "false")
+            elif op == LOAD_VAR:
+                name, places = consts[arg]
+                for depth, slot in places:
+                    val = frame_up(frame, depth)[slot]
+                    if val is not UNSET:
+                        push(val)
+                        break
+                else:
+                    raise Exception(f"Variável ou função '{name}' não encontrada.")
+            elif op == STORE_VAR:
+                name, places = consts[arg]
+                val = pop()
+                for depth, slot in places:
+                    target = frame_up(frame, depth)
+                    old = target[slot]
+                    if old is not UNSET:
+                        if type(old) is not type(val):
+                            raise Exception(f"Tipo incompatível: '{type_of(val)}' != '{type_of(old)}'")
+                        target[slot] = val
+                        break
+                else:
+                    raise Exception(f"Variável '{name}' não declarada.")
+            elif op == DECL_FAST:
+                frame[arg] = pop()
+            elif op == DECL_VAR:
+                name, slot, var_type = consts[arg]
+                val = pop()
+                if var_type is not None and var_type != type_of(val):
+                    raise Exception("Tipo da atribuição incompatível com declaração.")
+                if frame[slot] is not UNSET:
+                    raise Exception(f"Variável ou função '{name}' já declarada.")
+                frame[slot] = val
+            elif op == CLEAR_SLOTS:
+                start, end = consts[arg]
+                frame[start:end] = [UNSET] * (end - start)
+            elif op == BINOP_DYN:
+                rval = pop()
+                lval = stack[-1]
+                stack[-1] = eval_binop(consts[arg], lval, type_of(lval), rval, type_of(rval))[0]
+            elif op == UNOP_DYN:
+                val = stack[-1]
+                stack[-1] = eval_unop(consts[arg], val, type_of(val))[0]
+            elif op == CHECK_BOOL:
+                if type(stack[-1]) is not bool:
+                    raise Exception(f"Condicional do {CONSTRUCTS[arg]} precisa ser bool.")
+            elif op == PRINT_DYN:
+                val = pop()
+                line(to_str(val, type_of(val)))
+            elif op == PRINTLN:
+                # Println imprime "true" para qualquer bool (comportamento do FuncCall.Evaluate)
+                args = stack[len(stack) - arg:]
+                del stack[len(stack) - arg:]
+                for val in args:
+                    line("true" if type(val) is bool else dynamic_text(val))
+            elif op == SCAN:
+                push(self.input_source.scan())
+            elif op == POP:
+                pop()
+            elif op == POP_JUMP_IF_NONE:
+                if stack[-1] is None:
+                    pop()
+                    pc = arg
+            elif op == CALL:
+                push(self.call(frame, stack, *consts[arg]))
+            elif op == TAIL_CALL:
+                name = consts[arg][0]
+                func_node, code, local = self.enter(frame, stack, *consts[arg])
+                return TailCall(name, (func_node, code), local)
+            elif op == FUNC_DEC:
+                func_node, func_code = consts[arg]
+                if frame[func_node.slot] is not UNSET:
+                    raise Exception(f"Variável ou função '{func_node.name}' já declarada.")
+                frame[func_node.slot] = (func_node, frame, func_code)
+            elif op == RETURN_VALUE:
+                return pop()
+            elif op == RETURN_NONE:
+                return None
+            elif op == NATIVE:
+                func, nargs = consts[arg]
+                args = stack[len(stack) - nargs:]
+                del stack[len(stack) - nargs:]
+                push(func(*args))
+            elif op == APPEND_FAST:
+                slot, convs = consts[arg]
+                args = stack[len(stack) - len(convs):]
+                del stack[len(stack) - len(convs):]
+                frame[slot].extend([to_str(val, type_of(val)) if conv is None else conv(val)
+                                    for val, conv in zip(args, convs)])
+            elif op == BUILD_OPEN:
+                if type(frame[arg]) is str:
+                    frame[arg] = [frame[arg]]
+            elif op == BUILD_JOIN:
+                if type(frame[arg]) is list:
+                    frame[arg] = "".join(frame[arg])
+            else:
+                raise Exception(f"Opcode desconhecido: {op}")
+
+    def enter(self, frame, stack, name, nargs, places):
+        # acha a função e monta o frame da chamada com os argumentos do topo da pilha
+        for depth, slot in places:
+            func = frame_up(frame, depth)[slot]
+            if func is not UNSET:
+                break
+        else:
+            raise Exception(f"Variável ou função '{name}' não encontrada.")
+        if type(func) is not tuple:
+            raise Exception(f"'{name}' não é uma função.")
+        func_node, def_frame, code = func
+        if len(func_node.params) != nargs:
+            raise Exception("Número incorreto de argumentos.")
+
+        args = stack[len(stack) - nargs:]
+        del stack[len(stack) - nargs:]
+        if code.pooled:
+            pool = self.pools.get(code)
+            if pool is None:
+                pool = self.pools[code] = FramePool(code.frame_size)
+            local = pool.acquire(def_frame)
+        else:
+            local = new_frame(def_frame, code.frame_size)
+        for i, ((pname, ptype), arg_val) in enumerate(zip(func_node.params, args), 1):
+            arg_type = type_of(arg_val)
+            if arg_type != ptype:
+                raise Exception(f"Tipo incompatível em argumento '{pname}': esperado {ptype}, recebido {arg_type}")
+            local[i] = arg_val
+        return func_node, code, local
+
+    def call(self, frame, stack, name, nargs, places):
+        func_node, code, local = self.enter(frame, stack, name, nargs, places)
+        if not func_node.memo:
+            return self.run_call(name, func_node, code, local)
+        # lembra_ae: a chave são os argumentos, já nos slots do frame
+        cache = memo_for(self.memos, func_node)
+        key = tuple(local[1:1 + nargs])
+        result = cache.get(key)
+        if result is not None:
+            if code.pooled:
+                self.pools[code].release(local)
+            return result
+        result = self.run_call(name, func_node, code, local)
+        cache.put(key, result)
+        return result
+
+    def run_call(self, name, func_node, code, local):
+        # trampolim: TAIL_CALL devolve um TailCall, que roda aqui sem recursão
+        while True:
+            result = self.run(code, local)
+            if code.pooled:
+                self.pools[code].release(local)
+            if type(result) is not TailCall:
+                return check_return(name, func_node.return_type, result)
+            name, (func_node, code), local = result.name, result.func, result.frame
+
+
+# funções de apoio usadas pelo código gerado pelo PythonTranspiler
+def dynamic_binop(op, lval, rval):
+    return eval_binop(op, lval, type_of(lval), rval, type_of(rval))[0]
+
+def dynamic_unop(op, val):
+    return eval_unop(op, val, type_of(val))[0]
+
+def floor_div(lval, rval):
+    if rval == 0:
+        raise Exception("Divisão por zero.")
+    return lval // rval
+
+def write_line(text):
+    OUTPUT.line(text)
+
+def flush_output():
+    OUTPUT.flush()
+
+def scan_input():
+    return INPUT.scan()
+
+def check_cond(val, construct):
+    if type(val) is not bool:
+        raise Exception(f"Condicional do {construct} precisa ser bool.")
+    return val
+
+def dynamic_text(val):
+    return to_str(val, type_of(val))
+
+def println(line, *args):
+    # Println imprime "true" para qualquer bool (comportamento do FuncCall.Evaluate)
+    for val in args:
+        line("true" if type(val) is bool else dynamic_text(val))
+
+def missing(name):
+    raise Exception(f"Variável ou função '{name}' não encontrada.")
+
+def type_mismatch(val, old):
+    raise Exception(f"Tipo incompatível: '{type_of(val)}' != '{type_of(old)}'")
+
+def check_call(func, name, args):
+    # funções geradas são tuplas (parâmetros, tipo de retorno, função Python,
+    # MemoCache ou None)
+    if type(func) is not tuple:
+        raise Exception(f"'{name}' não é uma função.")
+    params, return_type, body, memo = func
+    if len(params) != len(args):
+        raise Exception("Número incorreto de argumentos.")
+    for (pname, ptype), arg_val in zip(params, args):
+        arg_type = type_of(arg_val)
+        if arg_type != ptype:
+            raise Exception(f"Tipo incompatível em argumento '{pname}': esperado {ptype}, recebido {arg_type}")
+    return return_type, body, memo
+
+def call_function(func, name, *args):
+    return_type, body, memo = check_call(func, name, args)
+    if memo is None:
+        return run_function(name, return_type, body, args)
+    # lembra_ae: a tupla de argumentos já é a chave
+    result = memo.get(args)
+    if result is None:
+        result = run_function(name, return_type, body, args)
+        memo.put(args, result)
+    return result
+
+def run_function(name, return_type, body, args):
+    # trampolim: "devolve_ae f(...)" volta como TailCall e roda aqui
+    while True:
+        result = body(*args)
+        if type(result) is not TailCall:
+            return check_return(name, return_type, result)
+        name, args = result.name, result.frame
+        return_type, body = result.func
+
+def tail_call(func, name, *args):
+    # funções lembra_ae nunca são chamadas na cauda: o memo fica de fora
+    return TailCall(name, check_call(func, name, args)[:2], args)
+
+def memo_cache(memos, index, name, size):
+    # cache da função lembra_ae número index do programa gerado
+    cache = memos.get(index)
+    if cache is None:
+        cache = memos[index] = MemoCache(name, size)
+    return cache
+
+TRANSPILER_RUNTIME = ("UNSET", "type_of", "dynamic_binop", "dynamic_unop", "floor_div",
+                      "scan_input", "check_cond", "dynamic_text", "println", "missing",
+                      "type_mismatch", "call_function", "tail_call", "memo_cache",
+                      "write_line", "flush_output", "array_index", "array_slice",
+                      "array_store", "array_str", "call_builtin", "DEFAULTS")
+
+BOOL_TO_STR = '("true" if {} else "false")'
+
+
+class PythonTranspiler:
+    # traduz a AST já analisada para código Python equivalente: cada slot vira
+    # uma variável local (v<nível>_<slot>), funções viram defs aninhadas (o
+    # escopo léxico sai de graça pelas closures do Python) e laços viram while.
+    # O resultado é compilado com compile() e roda no bytecode do CPython
+    def __init__(self):
+        self.lines = []
+        self.indent = 1
+        self.level = 0          # profundidade de funções (0 = programa)
+        self.nonlocals = None   # nomes de níveis externos atribuídos na função atual
+        self.memo_funcs = []    # FuncDec lembra_ae, na ordem dos índices em MEMOS
+        self.building = set()   # variáveis guardando lista de pedaços (ver Append)
+
+    def transpile(self, ast):
+        self.lines = ["def programa():"]
+        self.function_body(ast, ast.frame_size, 0)
+        self.lines.append("")
+        self.lines.append("try:")
+        self.lines.append("    programa()")
+        self.lines.append("finally:")
+        self.lines.append("    flush_output()")
+        return "\n".join(self.lines) + "\n"
+
+    def emit(self, line):
+        self.lines.append("    " * self.indent + line)
+
+    def var(self, depth, slot):
+        return f"v{self.level - depth}_{slot}"
+
+    def function_body(self, body, frame_size, nparams):
+        outer = self.nonlocals
+        self.nonlocals = set()
+        header = len(self.lines)
+        slots = [f"v{self.level}_{slot}" for slot in range(nparams + 1, frame_size)]
+        if slots:
+            self.emit(" = ".join(slots) + " = UNSET")
+        self.block(body)
+        if self.nonlocals:
+            self.lines.insert(header, "    " * self.indent + "nonlocal " + ", ".join(sorted(self.nonlocals)))
+        self.nonlocals = outer
+
+    def block(self, node):
+        start = len(self.lines)
+        self.stmt(node)
+        if len(self.lines) == start:
+            self.emit("pass")
+
+    def clear(self, scope_slots):
+        start, end = scope_slots
+        self.emit(" = ".join(self.var(0, slot) for slot in range(start, end)) + " = UNSET")
+
+    # -- expressões: devolvem o código Python como string --
+
+    def expr(self, node):
+        return getattr(self, "expr_" + node_kind(node))(node)
+
+    def expr_INT(self, node):
+        return repr(node.value)
+
+    expr_BOOL = expr_INT
+    expr_STRING = expr_INT
+
+    def expr_VAR(self, node):
+        depth, slot, _, definite, _ = node.binding[0]
+        if len(node.binding) == 1 and definite:
+            return self.var(depth, slot)
+        code = f"missing({(node.name if type(node) is FuncCall else node.value)!r})"
+        for depth, slot, _, _, _ in reversed(node.binding):
+            name = self.var(depth, slot)
+            code = f"{name} if {name} is not UNSET else {code}"
+        return f"({code})"
+
+    def expr_SCAN(self, node):
+        return "scan_input()"
+
+    def expr_SHARED(self, node):
+        return f"({self.var(0, node.slot)} := {self.expr(node.children[0])})"
+
+    def expr_CACHED(self, node):
+        return self.var(0, node.slot)
+
+    def expr_RETURN(self, node):
+        return self.expr(node.children[0])
+
+    def expr_NOOP(self, node):
+        return "None"
+
+    expr_UNKNOWN = expr_NOOP
+
+    def expr_BINOP(self, node):
+        lnode, rnode = node.children
+        left, right = self.expr(lnode), self.expr(rnode)
+        op = node.value
+        ltype, rtype = lnode.static_type, rnode.static_type
+        if ltype is None or rtype is None or vectorized(op, ltype, rtype):
+            return f"dynamic_binop({op!r}, {left}, {right})"
+        if op == "+" and ltype != rtype:
+            return f"({self.to_str(left, ltype)} + {self.to_str(right, rtype)})"
+        if op == "/":
+            if node_kind(rnode) == "INT" and rnode.value != 0:
+                return f"({left} // {right})"
+            return f"floor_div({left}, {right})"
+        # && e || avaliam os dois lados, como no Node.Evaluate: & e | em bools
+        pyop = {"&&": "&", "||": "|"}.get(op, op)
+        return f"({left} {pyop} {right})"
+
+    def to_str(self, code, typ):
+        if typ == "int":
+            return f"str({code})"
+        if typ == "bool":
+            return BOOL_TO_STR.format(code)
+        if typ in ARRAY_TYPES:
+            return f"array_str({code})"
+        return code
+
+    def expr_UNOP(self, node):
+        operand = self.expr(node.children[0])
+        op = node.value
+        if node.children[0].static_type is None or node.children[0].static_type in ARRAY_TYPES:
+            return f"dynamic_unop({op!r}, {operand})"
+        if op == "-":
+            return f"(-{operand})"
+        if op == "!":
+            return f"(not {operand})"
+        return operand
+
+    def expr_INDEX(self, node):
+        return f"array_index({', '.join(map(self.expr, node.children))})"
+
+    def expr_SLICE(self, node):
+        return f"array_slice({', '.join(map(self.expr, node.children))})"
+
+    def expr_BUILTIN(self, node):
+        args = "".join(", " + self.expr(arg) for arg in node.children)
+        return f"call_builtin({node.value!r}{args})"
+
+    def expr_FUNC_CALL(self, node):
+        args = "".join(", " + self.expr(arg) for arg in node.children)
+        if node.name == "Println":
+            return f"println(write_line{args})"
+        return f"call_function({self.expr_VAR(node)}, {node.name!r}{args})"
+
+    # -- comandos: emitem linhas --
+
+    def stmt(self, node):
+        getattr(self, "stmt_" + node_kind(node), self.stmt_value)(node)
+
+    def stmt_value(self, node):
+        # expressão usada como comando: o valor é descartado
+        self.emit(self.expr(node))
+
+    def stmt_NOOP(self, node):
+        pass
+
+    stmt_UNKNOWN = stmt_NOOP
+
+    def stmt_BLOCK(self, node):
+        for child in node.children:
+            self.stmt(child)
+            if node_kind(child) == "BLOCK" and child.scope_slots[1] > child.scope_slots[0]:
+                self.clear(child.scope_slots)
+
+    def stmt_PRINT(self, node):
+        expr = self.expr(node.children[0])
+        typ = node.children[0].static_type
+        if typ == "bool":
+            self.emit(f"write_line({BOOL_TO_STR.format(expr)})")
+        elif typ is None:
+            self.emit(f"write_line(dynamic_text({expr}))")
+        elif typ in ARRAY_TYPES:
+            self.emit(f"write_line(array_str({expr}))")
+        elif typ == "string":
+            self.emit(f"write_line({expr})")
+        else:
+            self.emit(f"write_line(str({expr}))")
+
+    def stmt_ASSIGN(self, node):
+        candidates = node.binding
+        depth, slot, typ, definite, _ = candidates[0]
+        if type(node) is Append and self.var(depth, slot) in self.building and len(candidates) == 1:
+            pieces = " + ".join(f"dynamic_text({self.expr(piece)})" if piece.static_type is None
+                                else self.to_str(self.expr(piece), piece.static_type)
+                                for piece in node.pieces)
+            self.emit(f"{self.var(depth, slot)}.append({pieces})")
+            return
+        expr = self.expr(node.children[1])
+        if (len(candidates) == 1 and definite and depth == 0
+                and typ is not None and typ == node.children[1].static_type):
+            self.emit(f"{self.var(depth, slot)} = {expr}")
+            return
+
+        self.emit(f"_v = {expr}")
+        keyword = "if"
+        for depth, slot, _, _, _ in candidates:
+            name = self.var(depth, slot)
+            if depth > 0:
+                self.nonlocals.add(name)
+            self.emit(f"{keyword} {name} is not UNSET:")
+            self.emit(f"    if type({name}) is not type(_v):")
+            self.emit(f"        type_mismatch(_v, {name})")
+            self.emit(f"    {name} = _v")
+            keyword = "elif"
+        msg = f"Variável '{node.children[0].value}' não declarada."
+        self.emit("else:")
+        self.emit(f"    raise Exception({msg!r})")
+
+    def stmt_INDEX_ASSIGN(self, node):
+        self.emit(f"array_store({', '.join(map(self.expr, node.children))})")
+
+    def stmt_HOIST(self, node):
+        for shared in node.children:
+            self.emit(f"{self.var(0, shared.slot)} = {self.expr(shared.children[0])}")
+
+    def stmt_VAR_DECL(self, node):
+        name = node.children[0].value
+        var_type = node.children[1].value
+        target = self.var(0, node.slot)
+        if len(node.children) == 3:
+            expr = self.expr(node.children[2])
+            dynamic = node.children[2].static_type is None
+        else:
+            # o montão vazio não tem literal: vem do runtime
+            expr = f"DEFAULTS[{var_type!r}]" if var_type in ARRAY_TYPES else repr(DEFAULTS[var_type])
+            dynamic = False
+
+        if node.fresh and not dynamic:
+            self.emit(f"{target} = {expr}  # {name}")
+            return
+        self.emit(f"_v = {expr}")
+        if dynamic:
+            self.emit(f"if type_of(_v) != {var_type!r}:")
+            self.emit("    raise Exception('Tipo da atribuição incompatível com declaração.')")
+        self.redeclared(target, name)
+        self.emit(f"{target} = _v  # {name}")
+
+    def redeclared(self, target, name):
+        msg = f"Variável ou função '{name}' já declarada."
+        self.emit(f"if {target} is not UNSET:")
+        self.emit(f"    raise Exception({msg!r})")
+
+    def cond(self, node, construct):
+        code = self.expr(node)
+        if node.static_type is None:
+            return f"check_cond({code}, {construct!r})"
+        return code
+
+    def stmt_IF(self, node):
+        self.emit(f"if {self.cond(node.children[0], 'IF')}:")
+        self.indented(node.children[1])
+        if len(node.children) == 3:
+            self.emit("else:")
+            self.indented(node.children[2])
+
+    def indented(self, node):
+        self.indent += 1
+        self.block(node)
+        self.indent -= 1
+
+    def stmt_FOR(self, node):
+        # como no build_strings do tree, para as locais do programa ou da função,
+        # mas sem try/finally (o CPython limita os blocos aninhados): um erro
+        # encerra o programa e um devolve_ae no laço não lê a variável
+        names = []
+        for append in node.builders:
+            depth, slot, _, definite, _ = append.binding[0]
+            name = self.var(depth, slot)
+            if len(append.binding) == 1 and definite and depth == 0 and name not in self.building:
+                names.append(name)
+        for name in names:
+            self.emit(f"{name} = [{name}]")
+        self.building.update(names)
+        self.emit(f"while {self.cond(node.children[0], 'FOR')}:")
+        self.indented(node.children[1])
+        self.building.difference_update(names)
+        for name in names:
+            self.emit(f"{name} = ''.join({name})")
+
+    def stmt_REPEAT(self, node):
+        body, cond = node.children
+        self.emit("while True:")
+        self.indent += 1
+        self.block(body)
+        self.emit(f"if not {self.cond(cond, 'REPEAT')}:")
+        self.emit("    break")
+        self.indent -= 1
+
+    def stmt_FUNC_DEC(self, node):
+        nparams = len(node.params)
+        self.level += 1
+        params = ", ".join(f"v{self.level}_{slot}" for slot in range(1, nparams + 1))
+        pyname = f"fn_{node.name}_{self.level}_{node.slot}"
+        self.emit(f"def {pyname}({params}):")
+        self.indent += 1
+        self.function_body(node.children[0], node.frame_size, nparams)
+        self.indent -= 1
+        self.level -= 1
+        target = self.var(0, node.slot)
+        self.redeclared(target, node.name)
+        memo = "None"
+        if node.memo:
+            memo = f"memo_cache(MEMOS, {len(self.memo_funcs)}, {node.name!r}, {node.memo})"
+            self.memo_funcs.append(node)
+        self.emit(f"{target} = ({tuple(node.params)!r}, {node.return_type!r}, {pyname}, {memo})")
+
+    def stmt_FUNC_CALL(self, node):
+        self.stmt_value(node)
+
+    def stmt_RETURN(self, node):
+        call = node.children[0]
+        if node.tail:
+            args = "".join(", " + self.expr(arg) for arg in call.children)
+            self.emit(f"return tail_call({self.expr_VAR(call)}, {call.name!r}{args})")
+            return
+        if node.children[0].static_type is not None:
+            # RETURN de tipo conhecido nunca devolve None: sai direto
+            self.emit(f"return {self.expr(node)}")
+            return
+        self.emit(f"_r = {self.expr(node)}")
+        self.emit("if _r is not None:")
+        self.emit("    return _r")
+
+
+def transpile(ast):
+    # código do módulo gerado, pronto para gravar como .py (importa o runtime)
+    header = ("# gerado pelo transpilador da JaoLang\n"
+              f"from jaolang_interpreter import {', '.join(TRANSPILER_RUNTIME)}\n\n"
+              "MEMOS = {}\n\n")
+    return header + PythonTranspiler().transpile(ast)
+
+def run_transpiled(ast, output=None, input_source=None, memos=None):
+    transpiler = PythonTranspiler()
+    source = transpiler.transpile(ast)
+    try:
+        code = compile(source, "<jaolang>", "exec")
+    except (SyntaxError, RecursionError, MemoryError):
+        raise Exception("Programa aninhado demais para o transpilador.")
+    output = output or OUTPUT
+    namespace = {name: globals()[name] for name in TRANSPILER_RUNTIME}
+    # cada execução usa a própria entrada/saída, já como métodos ligados
+    namespace["write_line"] = output.line
+    namespace["flush_output"] = output.flush
+    namespace["scan_input"] = (input_source or INPUT).scan
+    # caches das funções lembra_ae, criados já no dicionário da execução
+    memos = {} if memos is None else memos
+    namespace["MEMOS"] = {index: memo_for(memos, func)
+                          for index, func in enumerate(transpiler.memo_funcs)}
+    exec(code, namespace)
+
+
+# cache em disco das ASTs já analisadas (como o __pycache__): a chave é o hash do
+# código-fonte junto com a versão do interpretador, então editar qualquer um dos
+# dois invalida a entrada. O diretório é limitado em bytes e descarta as entradas
+# usadas há mais tempo (mtime é atualizado a cada acerto)
+CACHE_DIR_NAME = "__jaocache__"
+CACHE_MAX_BYTES = 64 * 1024 * 1024
+CACHE_FORMAT = 1
+_interpreter_version = None
+
+def interpreter_version():
+    global _interpreter_version
+    if _interpreter_version is None:
+        with open(os.path.abspath(__file__), "rb") as f:
+            _interpreter_version = hashlib.sha256(f.read()).hexdigest()
+    return _interpreter_version
+
+def cache_dir_for(path):
+    return os.environ.get("JAOLANG_CACHE_DIR") or os.path.join(
+        os.path.dirname(os.path.abspath(path)), CACHE_DIR_NAME)
+
+def cache_key(source, optimize, hoist=True, memo=(), memo_size=None):
+    h = hashlib.sha256()
+    # o nome do módulo entra na chave: o pickle referencia as classes por ele.
+    # Sem o NumPy um programa com montao nem passa do parse
+    h.update(f"{CACHE_FORMAT}:{interpreter_version()}:{__name__}:{optimize}:{hoist}:"
+             f"{numpy is not None}:{sorted(set(memo))}:{memo_size}:".encode())
+    h.update(source.encode("utf-8"))
+    return h.hexdigest()
+
+def cache_load(cache_dir, key):
+    path = os.path.join(cache_dir, key + ".ast")
+    # o unpickle cria muitos objetos de uma vez; com o coletor ligado ele dispara
+    # dezenas de coletas inúteis e leva mais tempo que o próprio parse
+    enabled = gc.isenabled()
+    gc.disable()
+    try:
+        with open(path, "rb") as f:
+            entry = pickle.load(f)
+    except Exception:
+        # ausente, removida por outra execução ou corrompida: vale como falta
+        return None
+    finally:
+        if enabled:
+            gc.enable()
+    try:
+        os.utime(path)
+    except OSError:
+        pass  # diretório só de leitura: o acerto vale, só a ordem do LRU não muda
+    return entry
+
+def cache_store(cache_dir, key, entry, max_bytes=CACHE_MAX_BYTES):
+    try:
+        data = pickle.dumps(entry, protocol=pickle.HIGHEST_PROTOCOL)
+    except RecursionError:
+        return
+    try:
+        os.makedirs(cache_dir, exist_ok=True)
+        # grava num temporário do mesmo diretório e troca com os.replace, que é
+        # atômico: execuções concorrentes nunca leem um arquivo pela metade
+        fd, tmp = tempfile.mkstemp(dir=cache_dir, suffix=".tmp")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                f.write(data)
+            os.replace(tmp, os.path.join(cache_dir, key + ".ast"))
+        except BaseException:
+            os.unlink(tmp)
+            raise
+        cache_evict(cache_dir, max_bytes)
+    except OSError:
+        pass  # diretório sem permissão de escrita: segue sem cache
+
+def cache_evict(cache_dir, max_bytes):
+    entries = []
+    for entry in os.scandir(cache_dir):
+        if entry.name.endswith(".ast"):
+            try:
+                st = entry.stat()
+            except FileNotFoundError:
+                continue
+            entries.append((st.st_mtime, st.st_size, entry.path))
+    total = sum(size for _, size, _ in entries)
+    for _, size, path in sorted(entries):
+        if total <= max_bytes:
+            break
+        try:
+            os.unlink(path)
+        except FileNotFoundError:
+            pass
+        total -= size
+
+def load_program(path, use_cache=True, optimize=True, hoist=True, memo=(), memo_size=None):
+    # devolve (AST já analisada, nós removidos pelo otimizador), do cache quando
+    # possível. memo e memo_size são o --memo e o --memo-size
+    with open(path, encoding="utf-8") as f:
+        source = f.read()
+
+    def build():
+        ast = Parser.run(source)
+        if memo or memo_size is not None:
+            memoize(ast, memo, memo_size or MEMO_SIZE)
+        return ast, prepare(ast, optimize, hoist)
+
+    if not use_cache:
+        return build()
+    cache_dir = cache_dir_for(path)
+    key = cache_key(source, optimize, hoist, memo, memo_size)
+    entry = cache_load(cache_dir, key)
+    if entry is None:
+        entry = build()
+        cache_store(cache_dir, key, entry)
+    return entry
+
+
+ENGINES = ("tree", "closure", "vm", "python", "stack")
+# motores que rodam um comando de cada vez sobre a SymbolTable (modo stream)
+STREAM_ENGINES = ("tree", "stack")
+
+# profundidade da AST a partir da qual execute() troca o motor pedido pelo
+# "stack": os outros descem a árvore com recursão do Python (no compilador, no
+# código gerado ou na avaliação), e o limite deixa pilha de sobra para a
+# recursão da própria JaoLang. O python esbarra antes nos limites do compile()
+# (parênteses e indentação aninhados)
+DEPTH_LIMITS = {"tree": 200, "closure": 150, "vm": 150, "python": 40}
+
+def open_io(output, stdin):
+    # saída e entrada de uma execução a partir dos argumentos do execute()
+    sink = output if isinstance(output, OutputSink) else OutputSink(output)
+    if isinstance(stdin, InputSource):
+        source = stdin
+    elif isinstance(stdin, (list, tuple)):
+        source = InputSource(lines=stdin)
+    else:
+        source = InputSource(stdin)
+    source.output = sink
+    return sink, source
+
+def execute(ast, engine="tree", analyzed=False, optimize=True, output=None, stdin=None,
+            memos=None):
+    # output: OutputSink ou stream de destino (arquivo, io.StringIO, ...); None = sys.stdout
+    # stdin: InputSource, stream de texto ou lista de linhas; None = sys.stdin
+    # memos: dicionário que recebe os caches das funções lembra_ae (estatísticas)
+    # Nada aqui é global: execuções em threads diferentes não se misturam
+    if not analyzed:
+        prepare(ast, optimize)
+    sink, source = open_io(output, stdin)
+    if nesting(ast) > DEPTH_LIMITS.get(engine, nesting(ast)):
+        engine = "stack"
+    try:
+        if engine == "closure":
+            ClosureCompiler(sink, source, memos).compile_program(ast)()
+        elif engine == "vm":
+            VM(sink, source, memos).run_program(BytecodeCompiler().compile_program(ast))
+        elif engine == "python":
+            run_transpiled(ast, sink, source, memos)
+        elif engine == "stack":
+            StackEvaluator(sink, source, memos).run(ast)
+        else:
+            ast.Evaluate(SymbolTable(output=sink, input_source=source, memos=memos))
+    except RecursionError:
+        # só "devolve_ae f(...)" roda sem crescer a pilha do Python
+        raise Exception("Recursão profunda demais (chamadas fora de posição de cauda).") from None
+    finally:
+        sink.flush()
+
+
+async def execute_async(ast, reader=None, writer=None, analyzed=False, optimize=True,
+                        memos=None, slice_steps=ASYNC_SLICE):
+    # modo assíncrono: roda a AST numa corrotina, lendo escuta_ae_jao do reader
+    # e escrevendo mostra_ae no writer (ex.: os streams de uma conexão do
+    # asyncio.start_server). Milhares de sessões dividem um event loop sem uma
+    # thread por sessão. Usa sempre o AsyncEvaluator (semântica do motor stack)
+    if not analyzed:
+        prepare(ast, optimize)
+    await AsyncEvaluator(reader, writer, memos, slice_steps).run(ast)
+
+
+def execute_stream(stream, engine="tree", optimize=True, output=None, stdin=None, memos=None,
+                   hoist=True):
+    # modo stream: lê o programa de um stream de texto e executa cada comando do
+    # bloco do programa assim que ele termina de ser lido, sem montar a AST
+    # inteira; a subárvore do comando é descartada depois. A memória fica
+    # proporcional ao maior comando (mais as funções e variáveis do programa).
+    # Um erro de sintaxe ou semântico só aparece quando o comando é alcançado,
+    # depois dos anteriores já terem rodado
+    if engine not in STREAM_ENGINES:
+        raise Exception(f"Motor sem modo stream: {engine}")
+    sink, source = open_io(output, stdin)
+    analyzer = Analyzer(optimize, hoist)
+    evaluator = StackEvaluator()
+    st = SymbolTable(output=sink, input_source=source, memos=memos)
+    try:
+        for stmt in Parser(stream).statements():
+            part = analyzer.statement(stmt)
+            if engine == "stack" or nesting(part) > DEPTH_LIMITS["tree"]:
+                evaluator.evaluate(part, st)
+            else:
+                part.Evaluate(st)
+    except RecursionError:
+        raise Exception("Recursão profunda demais (chamadas fora de posição de cauda).") from None
+    finally:
+        sink.flush()
+
+
+# quadros do --profile-out: chamadas de função e construções de controle
+PROFILE_FRAMES = {"FOR": "vai_rodando_ae", "REPEAT": "repete_ate_jao", "IF": "se_liga_jao"}
+
+class Profiler:
+    # --profile: troca o Evaluate de cada nó da AST (motor tree) por uma versão
+    # que conta execuções e mede o tempo, por linha do fonte e por tipo de nó
+    # (VAR = consulta na tabela de símbolos). "cumulativo" inclui os filhos e,
+    # como o cumtime do cProfile, só conta a ocorrência mais externa de uma
+    # linha ou tipo que já está na pilha (recursão); "próprio" desconta os filhos.
+    # Execuções por linha contam só os comandos (filhos de bloco)
+    def __init__(self, source, clock=time.perf_counter):
+        self.source_map = SourceMap(source)
+        self.clock = clock
+        self.lines = {}      # linha -> [execuções, cumulativo, próprio]
+        self.kinds = {}      # tipo -> [execuções, cumulativo, próprio]
+        self.stacks = {}     # pilha de quadros -> tempo próprio
+        self.active = {}     # linha ou tipo -> ocorrências abertas
+        self.inner = [0.0]   # tempo gasto nos filhos de cada nó aberto
+        self.path = [("programa",)]
+        self.total = 0.0
+        self.wrappers = {}   # nó -> versão medida do Evaluate
+        self.patched = {}    # classe -> Evaluate próprio original (None se herdado)
+
+    def instrument(self, ast):
+        # os nós têm __slots__, então o Evaluate medido não cabe na instância:
+        # cada classe presente na AST ganha um Evaluate que procura o nó em
+        # self.wrappers. Todos os wrappers são montados antes da troca, com o
+        # Evaluate original
+        stack = [(ast, None)]
+        while stack:
+            node, parent = stack.pop()
+            statement = type(parent) is Block and type(node) is not Block
+            line = self.source_map.line(node.pos) if node.pos is not None else 0
+            self.wrappers[node] = self.wrap(node, line, statement)
+            self.patched.setdefault(type(node), None)
+            stack.extend((child, node) for child in node.children)
+        for cls in self.patched:
+            self.patched[cls] = cls.__dict__.get("Evaluate")
+            cls.Evaluate = self.dispatch(cls.Evaluate)
+
+    def dispatch(self, original):
+        wrappers = self.wrappers
+
+        def Evaluate(node, st):
+            profiled = wrappers.get(node)
+            return original(node, st) if profiled is None else profiled(st)
+        return Evaluate
+
+    def restore(self, ast):
+        # devolve o Evaluate original às classes
+        for cls, original in self.patched.items():
+            if original is None:
+                del cls.Evaluate
+            else:
+                cls.Evaluate = original
+        self.patched = {}
+        self.wrappers = {}
+
+    def wrap(self, node, line, statement):
+        evaluate = node.Evaluate
+        if type(node) is CountedLoop:
+            # o perfil conta cada volta e cada incremento: roda o laço comum.
+            # O While.Evaluate é pego agora, antes da troca; buscado na hora
+            # da execução ele já seria o dispatch e voltaria para este wrapper
+            loop = While.Evaluate
+            evaluate = lambda st: loop(node, st)
+        kind = node_kind(node)
+        if kind == "FUNC_CALL":
+            frame = node.name
+        elif kind in PROFILE_FRAMES:
+            frame = f"{PROFILE_FRAMES[kind]} (linha {line})"
+        else:
+            frame = None
+        line_stats = self.lines.setdefault(line, [0, 0.0, 0.0])
+        kind_stats = self.kinds.setdefault(kind, [0, 0.0, 0.0])
+        kind_key = ("tipo", kind)
+        active, inner, path, stacks, clock = self.active, self.inner, self.path, self.stacks, self.clock
+
+        def profiled(st):
+            kind_stats[0] += 1
+            active[kind_key] = active.get(kind_key, 0) + 1
+            if statement:
+                line_stats[0] += 1
+                active[line] = active.get(line, 0) + 1
+            if frame is not None:
+                path.append(path[-1] + (frame,))
+            inner.append(0.0)
+            start = clock()
+            try:
+                return evaluate(st)
+            finally:
+                elapsed = clock() - start
+                own = elapsed - inner.pop()
+                inner[-1] += elapsed
+                kind_stats[2] += own
+                line_stats[2] += own
+                key = path[-1]
+                stacks[key] = stacks.get(key, 0.0) + own
+                if frame is not None:
+                    path.pop()
+                active[kind_key] -= 1
+                if not active[kind_key]:
+                    kind_stats[1] += elapsed
+                if statement:
+                    active[line] -= 1
+                    if not active[line]:
+                        line_stats[1] += elapsed
+        return profiled
+
+    def run(self, ast, **options):
+        # o perfil mede o Evaluate de cada nó, e o execute() trocaria o tree pelo
+        # stack numa AST funda demais
+        if nesting(ast) > DEPTH_LIMITS["tree"]:
+            raise Exception("Programa aninhado demais para o --profile.")
+        self.instrument(ast)
+        start = self.clock()
+        try:
+            execute(ast, "tree", analyzed=True, **options)
+        finally:
+            self.total += self.clock() - start
+            self.restore(ast)
+
+    def report(self, top=20):
+        # relatório ordenado pelo tempo próprio
+        out = [f"perfil: {self.total:.3f}s no total",
+               f"{'linha':>7} {'execuções':>12} {'cumulativo':>11} {'próprio':>11}  código"]
+        lines = sorted(((line, stats) for line, stats in self.lines.items() if line and stats[2]),
+                       key=lambda item: -item[1][2])
+        for line, (count, cumulative, own) in lines[:top]:
+            code = self.source_map.text(line).strip()
+            out.append(f"{line:>7} {count:>12} {cumulative:>10.4f}s {own:>10.4f}s  {code[:60]}")
+        if len(lines) > top:
+            out.append(f"{'':>7} (+{len(lines) - top} linha(s))")
+        out.append(f"{'tipo':>10} {'execuções':>12} {'cumulativo':>11} {'próprio':>11}")
+        kinds = sorted(((kind, stats) for kind, stats in self.kinds.items() if stats[0]),
+                       key=lambda item: -item[1][2])
+        for kind, (count, cumulative, own) in kinds:
+            out.append(f"{kind:>10} {count:>12} {cumulative:>10.4f}s {own:>10.4f}s")
+        return "\n".join(out)
+
+    def write_collapsed(self, path):
+        # formato "pilha;de;quadros microssegundos" do flamegraph.pl / speedscope
+        with open(path, "w", encoding="utf-8") as f:
+            for stack, own in sorted(self.stacks.items()):
+                micros = round(own * 1_000_000)
+                if micros:
+                    f.write(f"{';'.join(stack)} {micros}\n")
+
+
+class Interpreter:
+    # API para embutir o interpretador. A instância guarda só a configuração;
+    # cada run() cria a própria entrada/saída e tabela de símbolos, então a mesma
+    # instância (e a mesma AST compilada) pode ser usada por várias threads
+    def __init__(self, engine="tree", optimize=True):
+        if engine not in ENGINES:
+            raise Exception(f"Motor desconhecido: {engine}")
+        self.engine = engine
+        self.optimize = optimize
+
+    def parse(self, source):
+        return Parser.run(source)
+
+    def compile(self, source):
+        # AST pronta para run(): parse + análise + otimização
+        ast = self.parse(source)
+        prepare(ast, self.optimize)
+        return ast
+
+    def run(self, program, stdin=None, stdout=None):
+        # program: código-fonte ou AST devolvida por compile()
+        ast = self.compile(program) if isinstance(program, str) else program
+        execute(ast, self.engine, analyzed=True, output=stdout, stdin=stdin)
+
+    async def run_async(self, program, reader=None, writer=None):
+        # execute_async com a configuração da instância (o motor não vale aqui)
+        ast = self.compile(program) if isinstance(program, str) else program
+        await execute_async(ast, reader, writer, analyzed=True)
+
+    def run_capture(self, program, stdin=()):
+        # roda sem tocar no stdin/stdout do processo; devolve (saída, erro ou None)
+        out = io.StringIO()
+        try:
+            self.run(program, stdin=list(stdin), stdout=out)
+        except Exception as e:
+            return out.getvalue(), str(e)
+        return out.getvalue(), None
+
+def run_job(job):
+    source, engine, optimize = job
+    return Interpreter(engine, optimize).run_capture(source)
+
+def run_many(programs, workers=None, engine="tree", optimize=True, processes=False):
+    # roda programas independentes (código-fonte) num pool de threads ou de
+    # processos; devolve (saída, erro ou None) de cada um, na ordem de entrada.
+    # Com o GIL, só o pool de processos roda código Python em paralelo
+    jobs = [(source, engine, optimize) for source in programs]
+    if processes:
+        workers = workers or os.cpu_count() or 1
+        chunksize = max(1, len(jobs) // (workers * 4))
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            return list(pool.map(run_job, jobs, chunksize=chunksize))
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        return list(pool.map(run_job, jobs))
+
+def batch_files(directory):
+    # todos os .jao da árvore, em ordem estável (o cache fica de fora)
+    paths = []
+    for root, dirs, files in os.walk(directory):
+        dirs[:] = sorted(d for d in dirs if d != CACHE_DIR_NAME)
+        paths.extend(os.path.join(root, name) for name in sorted(files) if name.endswith(".jao"))
+    return paths
+
+def run_file(job):
+    # um item do modo --batch: carrega, roda com estado isolado e devolve o
+    # registro do resumo. Saída e erro ficam só deste programa
+    path, name, engine, optimize, hoist, use_cache, input_path, out_dir = job
+    out = io.StringIO()
+    error = None
+    start = time.perf_counter()
+    try:
+        ast, _ = load_program(path, use_cache, optimize, hoist)
+        stdin = InputSource.from_path(input_path) if input_path else ()
+        execute(ast, engine, analyzed=True, output=out, stdin=stdin)
+    except Exception as e:
+        error = str(e)
+    seconds = time.perf_counter() - start
+    record = {"file": name, "status": "ok" if error is None else "error",
+              "seconds": round(seconds, 6), "error": error}
+    if out_dir is None:
+        record["stdout"] = out.getvalue()
+    else:
+        # grava aqui mesmo, no worker, para a saída não voltar pelo pipe do pool
+        target = os.path.join(out_dir, name)
+        os.makedirs(os.path.dirname(target), exist_ok=True)
+        with open(target + ".out", "w", encoding="utf-8") as f:
+            f.write(out.getvalue())
+        if error is not None:
+            with open(target + ".err", "w", encoding="utf-8") as f:
+                f.write(error + "\n")
+    return record
+
+def run_batch(directory, workers=None, engine="tree", optimize=True, use_cache=True,
+              input_path=None, out_dir=None, summary=None, hoist=True):
+    # roda todos os .jao de directory num pool de processos que ficam vivos
+    # durante o lote inteiro: a inicialização do Python e o import deste módulo
+    # são pagos uma vez por worker, não uma vez por programa. Escreve uma linha
+    # JSON por arquivo em summary (padrão: stdout) e devolve (arquivos, erros)
+    paths = batch_files(directory)
+    jobs = [(path, os.path.relpath(path, directory), engine, optimize, hoist, use_cache,
+             input_path, out_dir) for path in paths]
+    summary = summary or sys.stdout
+    workers = workers or os.cpu_count() or 1
+    errors = 0
+
+    def report(records):
+        nonlocal errors
+        for record in records:
+            errors += record["status"] != "ok"
+            summary.write(json.dumps(record, ensure_ascii=False) + "\n")
+
+    if workers == 1:
+        report(map(run_file, jobs))
+    else:
+        chunksize = max(1, min(64, len(jobs) // (workers * 4)))
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            report(pool.map(run_file, jobs, chunksize=chunksize))
+    summary.flush()
+    return len(jobs), errors
+
+
+def main():
+    argp = argparse.ArgumentParser(description="Interpretador da JaoLang")
+    argp.add_argument("arquivo", nargs="?", help="programa .jao a executar")
+    argp.add_argument("--batch", metavar="DIR",
+                      help="roda todos os .jao de DIR num pool de processos e escreve "
+                           "um resumo em JSON lines (um registro por arquivo)")
+    argp.add_argument("-j", "--jobs", type=int, default=None,
+                      help="número de workers do --batch (padrão: número de CPUs)")
+    argp.add_argument("--batch-out", metavar="DIR",
+                      help="no --batch, grava a saída de cada programa em DIR/<arquivo>.out "
+                           "(e o erro em .err) em vez de incluí-la no resumo")
+    argp.add_argument("--summary", metavar="ARQUIVO",
+                      help="no --batch, grava o resumo em ARQUIVO em vez do stdout")
+    argp.add_argument("--engine", choices=ENGINES, default="tree",
+                      help="tree: avalia a AST direto (padrão); "
+                           "closure: compila a AST para closures antes de rodar; "
+                           "vm: compila para bytecode e roda na máquina de pilha; "
+                           "python: traduz para código Python e roda com exec; "
+                           "stack: avalia a AST com uma pilha explícita, sem recursão "
+                           "(usado automaticamente quando a AST é funda demais)")
+    argp.add_argument("--transpile", action="store_true",
+                      help="atalho para --engine python")
+    argp.add_argument("--emit-py", metavar="SAIDA",
+                      help="grava o código Python gerado em SAIDA em vez de executar")
+    argp.add_argument("--stream", action="store_true",
+                      help="executa cada comando do programa assim que ele é lido, sem "
+                           "montar a AST inteira (memória proporcional ao maior comando; "
+                           "motores tree e stack, sem cache)")
+    argp.add_argument("--no-cache", action="store_true",
+                      help=f"não lê nem grava a AST analisada em {CACHE_DIR_NAME}/")
+    argp.add_argument("--output", metavar="ARQUIVO",
+                      help="grava a saída do programa em ARQUIVO em vez do stdout")
+    argp.add_argument("--input", metavar="ARQUIVO",
+                      help="lê escuta_ae_jao() de ARQUIVO (mapeado em memória) em vez do stdin")
+    argp.add_argument("--no-opt", action="store_true",
+                      help="desliga o otimizador (dobra de constantes e ramos mortos)")
+    argp.add_argument("--no-hoist", action="store_true",
+                      help="não tira dos laços as expressões invariantes nem reaproveita "
+                           "subexpressões repetidas (o resto do otimizador continua)")
+    argp.add_argument("--opt-stats", action="store_true",
+                      help="informa no stderr quantos nós o otimizador removeu")
+    argp.add_argument("--memo", metavar="NOMES",
+                      help="marca como lembra_ae as funções listadas (separadas por vírgula)")
+    argp.add_argument("--memo-size", type=int, default=None, metavar="N",
+                      help=f"entradas do cache de cada função lembra_ae (padrão: {MEMO_SIZE})")
+    argp.add_argument("--profile", action="store_true",
+                      help="roda no motor tree medindo execuções e tempo por linha e por "
+                           "tipo de nó; o relatório sai no stderr")
+    argp.add_argument("--profile-out", metavar="ARQUIVO",
+                      help="com --profile, grava as pilhas no formato collapsed do flamegraph")
+    args = argp.parse_args()
+
+    if args.batch:
+        engine = "python" if args.transpile else args.engine
+        summary = open(args.summary, "w", encoding="utf-8") if args.summary else None
+        start = time.perf_counter()
+        try:
+            total, errors = run_batch(args.batch, args.jobs, engine, not args.no_opt,
+                                      not args.no_cache, args.input, args.batch_out, summary,
+                                      hoist=not args.no_hoist)
+        finally:
+            if summary:
+                summary.close()
+        print(f"{total} arquivo(s), {errors} com erro, {time.perf_counter() - start:.2f}s",
+              file=sys.stderr)
+        sys.exit(1 if errors else 0)
+    if args.arquivo is None:
+        argp.error("informe o programa .jao ou use --batch DIR")
+
+    engine = "python" if args.transpile else args.engine
+    if args.stream:
+        if (args.profile or args.profile_out or args.emit_py or args.memo
+                or args.memo_size is not None or args.opt_stats):
+            argp.error("--stream não combina com --profile, --emit-py, --memo, "
+                       "--memo-size nem --opt-stats")
+        if engine not in STREAM_ENGINES:
+            print(f"--stream usa o motor tree (ignorando --engine {engine})", file=sys.stderr)
+            engine = "tree"
+    else:
+        names = [name.strip() for name in (args.memo or "").split(",") if name.strip()]
+        ast, removed = load_program(args.arquivo, use_cache=not args.no_cache,
+                                    optimize=not args.no_opt, hoist=not args.no_hoist,
+                                    memo=names, memo_size=args.memo_size)
+        if args.opt_stats:
+            print(f"otimizador: {removed} nó(s) removido(s)", file=sys.stderr)
+        if args.emit_py:
+            with open(args.emit_py, "w", encoding="utf-8") as f:
+                f.write(transpile(ast))
+            return
+    stdin = InputSource.from_path(args.input) if args.input else None
+    memos = {}
+    if args.stream:
+        profiler = None
+
+        def run(**options):
+            with open(args.arquivo, encoding="utf-8") as f:
+                execute_stream(f, engine, not args.no_opt, hoist=not args.no_hoist, **options)
+    elif args.profile or args.profile_out:
+        if engine != "tree":
+            print(f"--profile usa o motor tree (ignorando --engine {engine})", file=sys.stderr)
+        with open(args.arquivo, encoding="utf-8") as f:
+            profiler = Profiler(f.read())
+        run = lambda **options: profiler.run(ast, **options)
+    else:
+        profiler = None
+        run = lambda **options: execute(ast, engine, analyzed=True, **options)
+    try:
+        if args.output:
+            with open(args.output, "w", encoding="utf-8") as out:
+                run(output=out, stdin=stdin, memos=memos)
+        else:
+            run(stdin=stdin, memos=memos)
+    finally:
+        if profiler is not None:
+            print(profiler.report(), file=sys.stderr)
+            if args.profile_out:
+                profiler.write_collapsed(args.profile_out)
+        # estatísticas dos caches lembra_ae, mesmo se o programa parou com erro
+        for cache in memos.values():
+            if cache.hits or cache.misses:
+                print(cache.report(), file=sys.stderr)
 
 
 if __name__ == "__main__":